@@ -0,0 +1,203 @@
+import argparse
+import atexit
+import glob
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+"""
+Audit logging, every button press/file open/upload goes to the 'audit' logger
+WindowMaker and every CRUDWindow used to add their own FileHandler to it, so after opening the CRUD window a few times
+each event was written once per handler, all on the tk thread and with a disk write per handler
+now the 'audit' logger is set up once (setup() does nothing the second time) with a single QueueHandler, logging an
+event only puts it on a queue and one QueueListener thread writes it to audit.log:
+- the file is fsynced once every FSYNC_EVERY events or FSYNC_INTERVAL seconds rather than per event, and when the app
+  exits (in between the events are flushed to the os, they are only at risk if the machine itself goes down)
+- audit.log rotates at MAX_BYTES to audit.log.1, .2 ... keeping BACKUP_COUNT old files
+- json_lines=True writes one JSON object per line ({"time", "level", "message", "thread"} plus any extra fields passed
+  with logger.info(..., extra={"audit": {...}})) rather than the "time - message" text lines
+read_events() reads the events back (either format, oldest first across the rotated files) and filters them, e.g.
+    python audit.py --since 2024-03-01 --contains uploaded
+"""
+
+AUDIT_FILE = "audit.log"
+AUDIT_FORMAT = "%(asctime)s - %(message)s"
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 5
+FSYNC_EVERY = 100
+FSYNC_INTERVAL = 1.0
+
+# the listener writing the audit file, None until setup() is called
+_listener = None
+_lock = threading.Lock()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    # one JSON object per event, the time first so a line can be filtered without parsing the rest of it
+    def format(self, record):
+        event = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        event.update(getattr(record, "audit", None) or {})
+        return json.dumps(event, default=str)
+
+
+class AuditFileHandler(logging.handlers.RotatingFileHandler):
+    # a rotating file handler that fsyncs in batches, it only ever runs on the listener thread
+    def __init__(self, path, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT, fsync_every=FSYNC_EVERY,
+                 fsync_interval=FSYNC_INTERVAL):
+        super().__init__(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def emit(self, record):
+        super().emit(record)
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        if self.stream is not None and self.unsynced:
+            self.stream.flush()
+            os.fsync(self.stream.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def doRollover(self):
+        # whatever is in the old file is synced before it is renamed
+        self.sync()
+        super().doRollover()
+
+    def close(self):
+        self.acquire()
+        try:
+            self.sync()
+        finally:
+            self.release()
+        super().close()
+
+
+def setup(path=AUDIT_FILE, json_lines=False, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT,
+          fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL):
+    # set up the 'audit' logger and start its writer thread, only the first call does anything so every window can
+    # call it, returns the logger
+    global _listener
+    audit_logger = logging.getLogger("audit")
+    with _lock:
+        if _listener is not None:
+            return audit_logger
+        file_handler = AuditFileHandler(path, max_bytes, backup_count, fsync_every, fsync_interval)
+        file_handler.setFormatter(JsonLinesFormatter() if json_lines else logging.Formatter(AUDIT_FORMAT))
+        events = queue.SimpleQueue()
+        audit_logger.setLevel(logging.INFO)
+        audit_logger.addHandler(logging.handlers.QueueHandler(events))
+        # the audit file is its own record, the events dont also go to the app's log
+        audit_logger.propagate = False
+        _listener = logging.handlers.QueueListener(events, file_handler)
+        _listener.start()
+    return audit_logger
+
+
+def shutdown():
+    # write out anything still queued, fsync and close the file, setup() can be called again afterwards
+    global _listener
+    audit_logger = logging.getLogger("audit")
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        for handler in list(audit_logger.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                audit_logger.removeHandler(handler)
+        _listener = None
+
+
+atexit.register(shutdown)
+
+
+def audit_files(path=AUDIT_FILE):
+    # the audit file and its rotated copies, oldest first (audit.log.5 ... audit.log.1, audit.log)
+    rotated = [name for name in glob.glob(glob.escape(path) + ".*") if name.rsplit(".", 1)[1].isdigit()]
+    rotated.sort(key=lambda name: int(name.rsplit(".", 1)[1]), reverse=True)
+    return rotated + ([path] if os.path.exists(path) else [])
+
+
+def parse_line(line):
+    # an event as a dict from either format, None for a blank line
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        try:
+            return json.loads(line)
+        except ValueError:
+            pass
+    # "2024-03-01 12:00:00,123 - message", logging's asctime uses a comma before the milliseconds
+    timestamp, _, message = line.partition(" - ")
+    return {"time": timestamp.replace(",", "."), "message": message}
+
+
+def _iso(value):
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    return str(value).replace("T", " ") if value else value
+
+
+def read_events(path=AUDIT_FILE, since=None, until=None, contains=None):
+    # yield the events oldest first, since/until are datetimes or ISO strings, contains is text the message must include
+    # both formats have ISO times (with a space or a T between the date and time) so they compare as text
+    since = _iso(since)
+    until = _iso(until)
+    for name in audit_files(path):
+        # a rotated file that was last written before since cant have anything newer in it
+        if since and datetime.fromtimestamp(os.path.getmtime(name)).isoformat(" ") < since:
+            continue
+        with open(name, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                event = parse_line(line)
+                if event is None:
+                    continue
+                event_time = _iso(event.get("time", ""))
+                if since and event_time < since:
+                    continue
+                if until and event_time > until:
+                    continue
+                if contains and contains not in str(event.get("message", "")):
+                    continue
+                yield event
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search the audit log.")
+    parser.add_argument("--file", default=AUDIT_FILE, help="audit file (its rotated copies are read too)")
+    parser.add_argument("--since", help="only events at or after this time (ISO format, e.g. 2024-03-01 or "
+                                        "2024-03-01T12:00)")
+    parser.add_argument("--until", help="only events at or before this time")
+    parser.add_argument("--contains", help="only events whose message contains this text")
+    args = parser.parse_args(argv)
+
+    count = 0
+    for event in read_events(args.file, args.since, args.until, args.contains):
+        print(json.dumps(event, default=str))
+        count += 1
+    print(f"{count} events", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
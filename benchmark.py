@@ -0,0 +1,431 @@
+import argparse
+import glob
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.neural_network import MLPRegressor
+from sklearn.preprocessing import MinMaxScaler
+from sqlalchemy import text
+
+# export_charts forces the Agg backend so the charts render without a display
+import export_charts
+from data_loader import load_csv
+from database import DatabaseHandler
+from dataset_cache import DatasetCache
+from schema_inference import compact_dtypes
+import synthetic_data
+
+logger = logging.getLogger(__name__)
+
+"""
+Benchmarks, timeit_ml_speed.py only ever compared the models and the tests only check nothing crashes, so there was no
+way to tell whether a change made the app faster or slower
+this runs the same operations the app does, headless, on the bundled files (banana_quality.csv, vgsales.csv) and on
+synthetic banana_quality shaped files of 1M and 10M rows (see synthetic_data.py):
+- csv_load_cold/csv_load_cached: load_csv without the cache and out of a warm Arrow cache
+- dtype_inference: compact_dtypes on the freshly parsed file
+- db_bulk_insert/db_resync: DatabaseHandler.sync_bananas into an empty banana_quality and again with nothing changed
+  (sqlite in a temp folder unless --database-url points at a postgres to use instead, banana shaped files only)
+- aggregate_scripts: the CRUD window's scripts (count, average, max, min, top 100) on the synced table
+- chart_*: each GraphTheory chart built and rendered to PNG with Agg
+- model_fit_predict: the MLPRegressor from prediction.py fitted and predicting (capped at MODEL_ROWS rows and
+  MODEL_MAX_ITER iterations so a run finishes)
+each one is timed pytest-benchmark style (a warm up call, then rounds until --rounds or MAX_SECONDS) and the results are
+saved to benchmark_results/ with the commit they were run on, compare tells you what got faster or slower between two runs
+examples:
+    python benchmark.py run
+    python benchmark.py run --datasets banana_quality 1m --cases csv_load_cold dtype_inference
+    python benchmark.py compare              (the latest two runs)
+    python benchmark.py compare a1b2c3 d4e5f6 (the latest runs of two commits)
+"""
+
+BENCHMARK_DIR = "benchmark_results"
+DATASETS = {"banana_quality": "banana_quality.csv", "vgsales": "vgsales.csv"}
+# synthetic banana_quality shaped datasets, generated once into BENCHMARK_DIR/data
+SCALES = {"1m": 1_000_000, "10m": 10_000_000}
+DEFAULT_DATASETS = ["banana_quality", "vgsales"]
+ROUNDS = 5
+# a benchmark stops taking rounds after this long, the slow ones on 10M rows only run once
+MAX_SECONDS = 10.0
+MODEL_ROWS = 100_000
+MODEL_MAX_ITER = 20
+# the pair plot draws every pair of columns point by point, past this many rows it would take hours
+PAIRPLOT_MAX_ROWS = 1_000_000
+
+
+class Skip(Exception):
+    # raised by a benchmark that doesnt apply to a dataset
+    pass
+
+
+class Bench:
+    # times a function pytest-benchmark style, bench(function, *args) runs it and returns its result
+    def __init__(self, rounds=ROUNDS, max_seconds=MAX_SECONDS, warmup=True):
+        self.rounds = rounds
+        self.max_seconds = max_seconds
+        self.warmup = warmup
+        self.times = []
+
+    def __call__(self, function, *args, setup=None, **kwargs):
+        # setup is called (untimed) before every call, e.g. to empty a table
+        if self.warmup:
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            # something that takes most of the budget isnt warmed up again, the warm up counts as its only round
+            if time.perf_counter() - start > self.max_seconds / 2:
+                self.times.append(time.perf_counter() - start)
+                return result
+        started = time.perf_counter()
+        while len(self.times) < self.rounds:
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            self.times.append(time.perf_counter() - start)
+            if time.perf_counter() - started > self.max_seconds:
+                break
+        return result
+
+    def stats(self):
+        times = self.times
+        return {
+            "rounds": len(times),
+            "min": min(times),
+            "max": max(times),
+            "mean": statistics.fmean(times),
+            "median": statistics.median(times),
+            "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        }
+
+
+class Dataset:
+    # a file to benchmark on, the parsed frame and the database are made the first time a benchmark asks for them
+    def __init__(self, name, path, folder, database_url=None):
+        self.name = name
+        self.path = path
+        self.folder = folder
+        self.database_url = database_url
+        self._frame = None
+        self._db_handler = None
+
+    @property
+    def frame(self):
+        if self._frame is None:
+            self._frame = load_csv(self.path)
+        return self._frame
+
+    @property
+    def is_banana(self):
+        return {"Size", "Weight", "Quality", "banana_id"}.issubset(self.frame.columns)
+
+    @property
+    def numeric_columns(self):
+        return [column for column in self.frame.columns
+                if pd.api.types.is_numeric_dtype(self.frame[column]) and column != "banana_id"]
+
+    @property
+    def db_handler(self):
+        if self._db_handler is None:
+            url = self.database_url or f"sqlite:///{os.path.join(self.folder, f'{self.name}.db')}"
+            self._db_handler = DatabaseHandler(url)
+            # the statement log would be most of what is being timed
+            self._db_handler.engine.echo = False
+        return self._db_handler
+
+    def clear_table(self):
+        with self.db_handler.engine.begin() as conn:
+            conn.execute(text("DELETE FROM banana_quality"))
+
+
+# name -> function(bench, dataset)
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def decorator(function):
+        BENCHMARKS[name] = function
+        return function
+    return decorator
+
+
+@benchmark("csv_load_cold")
+def csv_load_cold(bench, dataset):
+    bench(load_csv, dataset.path)
+
+
+@benchmark("csv_load_cached")
+def csv_load_cached(bench, dataset):
+    cache = DatasetCache(os.path.join(dataset.folder, "cache"))
+    load_csv(dataset.path, cache)
+    bench(load_csv, dataset.path, cache)
+
+
+@benchmark("dtype_inference")
+def dtype_inference(bench, dataset):
+    raw = pd.read_csv(dataset.path)
+    bench(compact_dtypes, raw)
+
+
+@benchmark("db_bulk_insert")
+def db_bulk_insert(bench, dataset):
+    if not dataset.is_banana:
+        raise Skip("not banana_quality shaped")
+    bench(dataset.db_handler.sync_bananas, dataset.frame, setup=dataset.clear_table)
+
+
+@benchmark("db_resync")
+def db_resync(bench, dataset):
+    if not dataset.is_banana:
+        raise Skip("not banana_quality shaped")
+    dataset.db_handler.sync_bananas(dataset.frame)
+    bench(dataset.db_handler.sync_bananas, dataset.frame)
+
+
+def run_scripts(db_handler):
+    # what the CRUD window's scripts run
+    db_handler.count_records()
+    db_handler.calculate_average("sweetness")
+    db_handler.find_max_value("weight")
+    db_handler.find_min_value("weight")
+    db_handler.show_top_100("banana_quality")
+    db_handler.show_bottom_100("banana_quality")
+
+
+@benchmark("aggregate_scripts")
+def aggregate_scripts(bench, dataset):
+    if not dataset.is_banana:
+        raise Skip("not banana_quality shaped")
+    dataset.db_handler.sync_bananas(dataset.frame)
+    bench(run_scripts, dataset.db_handler)
+
+
+def render_chart(data, chart_type, columns):
+    # what RenderPipeline does on its workers, build the figure and rasterise it to PNG
+    fig = export_charts.build_figure(data, chart_type, columns)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def chart_benchmark(chart_type):
+    def run(bench, dataset):
+        columns = dataset.numeric_columns
+        if chart_type in ("histogram", "box plot"):
+            columns = columns[:1]
+        elif chart_type in ("line plot", "scatter plot"):
+            columns = columns[:2]
+        elif chart_type == "pair plot":
+            if len(dataset.frame) > PAIRPLOT_MAX_ROWS:
+                raise Skip(f"more than {PAIRPLOT_MAX_ROWS} rows")
+            columns = columns[:4]
+        if not columns:
+            raise Skip("no numeric columns")
+        bench(render_chart, dataset.frame, chart_type, columns)
+    return run
+
+
+for _chart_type in export_charts.CHART_TYPES:
+    benchmark("chart_" + _chart_type.replace(" ", "_"))(chart_benchmark(_chart_type))
+
+
+def fit_predict(X_train, X_test, y_train):
+    # the network from PredictionAlgorithm.evaluate_models with fewer iterations
+    model = MLPRegressor(hidden_layer_sizes=(150, 75, 25), activation='relu', solver='adam', alpha=0.01,
+                         learning_rate='adaptive', max_iter=MODEL_MAX_ITER, random_state=42, tol=0.00001,
+                         batch_size='auto')
+    model.fit(X_train, y_train)
+    return model.predict(X_test)
+
+
+@benchmark("model_fit_predict")
+def model_fit_predict(bench, dataset):
+    columns = dataset.numeric_columns
+    if len(columns) < 2:
+        raise Skip("fewer than 2 numeric columns")
+    data = dataset.frame[columns].dropna()
+    if len(data) > MODEL_ROWS:
+        data = data.sample(MODEL_ROWS, random_state=42)
+    # Size like evaluate_models for banana_quality, the first numeric column for anything else
+    target = "Size" if "Size" in columns else columns[0]
+    X = MinMaxScaler().fit_transform(data[columns].astype(np.float64))
+    X_train, X_test, y_train, _ = train_test_split(X, data[target], test_size=0.25, random_state=30, shuffle=True)
+    # fitting the same data over and over wouldnt tell us any more, one round is enough
+    bench.rounds = 1
+    bench.warmup = False
+    bench(fit_predict, X_train, X_test, y_train)
+
+
+def synthetic_bananas(rows, path, template=synthetic_data.BANANA_TEMPLATE, seed=42,
+                      chunk_rows=synthetic_data.CHUNK_ROWS):
+    # a banana_quality shaped csv of rows rows fitted to the template (see synthetic_data.py), written a chunk at a time
+    # so 10M rows doesnt need 10M rows of memory
+    profile = synthetic_data.banana_profile(template)
+    synthetic_data.write_csv(synthetic_data.generate_bananas(rows, profile, seed=seed, chunk_rows=chunk_rows), path)
+    return path
+
+
+def dataset_path(name, folder=BENCHMARK_DIR):
+    # the bundled file for a name, or the synthetic file for a scale (generated the first time)
+    if name in DATASETS:
+        return DATASETS[name]
+    if name in SCALES:
+        path = os.path.join(folder, "data", f"synthetic_{name}.csv")
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            logger.info(f"Generating {SCALES[name]} synthetic rows into {path}")
+            synthetic_bananas(SCALES[name], path)
+        return path
+    raise ValueError(f"Unknown dataset: {name}")
+
+
+def run(datasets=None, names=None, rounds=ROUNDS, max_seconds=MAX_SECONDS, database_url=None, folder=BENCHMARK_DIR):
+    # run the benchmarks, returns a list of results (a dict per benchmark and dataset, with a "skipped" reason or the
+    # timing stats)
+    results = []
+    for dataset_name in datasets or DEFAULT_DATASETS:
+        work = tempfile.mkdtemp(prefix="benchmark-")
+        try:
+            dataset = Dataset(dataset_name, dataset_path(dataset_name, folder), work, database_url)
+            for name in names or BENCHMARKS:
+                result = {"benchmark": name, "dataset": dataset_name}
+                bench = Bench(rounds, max_seconds)
+                try:
+                    BENCHMARKS[name](bench, dataset)
+                    result.update(bench.stats())
+                    result["rows"] = len(dataset.frame)
+                    logger.info(f"{name} on {dataset_name}: median {result['median'] * 1000:.1f} ms "
+                                f"({result['rounds']} rounds)")
+                except Skip as e:
+                    result["skipped"] = str(e)
+                except Exception as e:
+                    # one broken benchmark shouldnt lose the rest of the run
+                    result["error"] = str(e)
+                    logger.error(f"An error occurred while running {name} on {dataset_name}: {str(e)}")
+                results.append(result)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+    return results
+
+
+def git_commit():
+    # (commit, whether the tree has uncommitted changes), (None, False) outside a git checkout
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                                    text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+
+def save(results, folder=BENCHMARK_DIR):
+    # write a run to folder/<time>_<commit>.json, returns the path
+    commit, dirty = git_commit()
+    run_time = datetime.now()
+    data = {
+        "time": run_time.isoformat(timespec="seconds"),
+        "commit": commit,
+        "dirty": dirty,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.processor(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{run_time.strftime('%Y%m%d_%H%M%S')}_{(commit or 'nocommit')[:12]}.json")
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+    return path
+
+
+def load_run(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def find_run(ref, folder=BENCHMARK_DIR):
+    # a run file, or the latest run of a commit (any prefix of its hash)
+    if os.path.exists(ref):
+        return ref
+    matches = [path for path in sorted(glob.glob(os.path.join(folder, "*.json")))
+               if (load_run(path).get("commit") or "").startswith(ref)]
+    if not matches:
+        raise FileNotFoundError(f"No benchmark run found for {ref}")
+    return matches[-1]
+
+
+def compare(old, new):
+    # [(benchmark, dataset, old median, new median, change %)] for everything timed in both runs, biggest slowdown first
+    def medians(data):
+        return {(result["benchmark"], result["dataset"]): result["median"] for result in data["results"]
+                if "median" in result}
+    old_medians, new_medians = medians(old), medians(new)
+    rows = []
+    for key in old_medians.keys() & new_medians.keys():
+        before, after = old_medians[key], new_medians[key]
+        rows.append((key[0], key[1], before, after, (after - before) / before * 100 if before else 0.0))
+    rows.sort(key=lambda row: row[4], reverse=True)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's operations and compare runs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="run the benchmarks and save the results")
+    run_parser.add_argument("--datasets", nargs="+", default=DEFAULT_DATASETS,
+                            choices=list(DATASETS) + list(SCALES), help="datasets to run on")
+    run_parser.add_argument("--cases", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run (default all)")
+    run_parser.add_argument("--rounds", type=int, default=ROUNDS, help="timed rounds per benchmark")
+    run_parser.add_argument("--max-seconds", type=float, default=MAX_SECONDS, help="time budget per benchmark")
+    run_parser.add_argument("--database-url", help="database for the db benchmarks (default a temp sqlite file), "
+                                                   "its banana_quality table is emptied")
+    run_parser.add_argument("--output", default=BENCHMARK_DIR, help="where the results are saved")
+    compare_parser = subparsers.add_parser("compare", help="compare two runs (default the latest two)")
+    compare_parser.add_argument("runs", nargs="*", help="two run files or commits, old then new")
+    compare_parser.add_argument("--output", default=BENCHMARK_DIR, help="where the results are saved")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "run":
+        results = run(args.datasets, args.cases, args.rounds, args.max_seconds, args.database_url, args.output)
+        for result in results:
+            if "median" in result:
+                print(f"{result['benchmark']:<24} {result['dataset']:<16} median {result['median'] * 1000:10.1f} ms  "
+                      f"min {result['min'] * 1000:10.1f} ms  ({result['rounds']} rounds)")
+            else:
+                print(f"{result['benchmark']:<24} {result['dataset']:<16} "
+                      f"{'skipped: ' + result['skipped'] if 'skipped' in result else 'error: ' + result['error']}")
+        print(f"Saved to {save(results, args.output)}")
+        return 0 if all("error" not in result for result in results) else 1
+
+    if len(args.runs) == 2:
+        paths = [find_run(ref, args.output) for ref in args.runs]
+    elif not args.runs:
+        paths = sorted(glob.glob(os.path.join(args.output, "*.json")))[-2:]
+        if len(paths) < 2:
+            parser.error("need at least two saved runs to compare")
+    else:
+        parser.error("give two runs to compare, or none for the latest two")
+    old, new = load_run(paths[0]), load_run(paths[1])
+    print(f"{paths[0]} ({(old['commit'] or '')[:12]}) -> {paths[1]} ({(new['commit'] or '')[:12]})")
+    for name, dataset_name, before, after, change in compare(old, new):
+        print(f"{name:<24} {dataset_name:<16} {before * 1000:10.1f} ms -> {after * 1000:10.1f} ms  {change:+7.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+"""
+Hardware calibration, the old hardware tests ran stress-ng/memtester/smartctl/ping which mostly arent installed, need the
+internet and said nothing about how fast this app would be on the machine, these are small benchmarks of what it does:
+- GEMM throughput (numpy matrix multiply, what the neural network spends its time on) in GFLOP/s
+- memory bandwidth (copying a big array) in GB/s
+- how well numpy work spreads over threads (sorting separate arrays on 1, 2, 4... threads)
+- csv parsing with pandas in rows/s
+- sequential write/read and random 4 KB reads of a file in the data folder (reads may come from the OS cache, which is
+  also what happens when a file is opened twice)
+- database round trip (SELECT 1) on the app's database or a temporary sqlite one
+the whole thing takes a couple of seconds and is cached in .calibration.json for the machine (redone after a month, or
+with python calibration.py --force), tune() turns the results into the settings the app uses:
+- csv_chunk_rows, the rows pandas parses per piece so the progress bar moves about 4 times a second
+- workers, the threads/processes after which adding more stops helping (chart rendering, the headless chart export)
+- mlp_batch_size(), the neural network's batch size so one training step is a couple of milliseconds of GEMM
+setting(name, default) reads a tuned setting, the default is used until the machine has been calibrated
+"""
+
+CALIBRATION_FILE = ".calibration.json"
+MAX_AGE = timedelta(days=30)
+
+GEMM_SIZE = 512
+COPY_MB = 64
+SORT_ELEMENTS = 1_000_000
+CSV_ROWS = 100_000
+FILE_MB = 32
+RANDOM_READS = 2000
+RANDOM_READ_BYTES = 4096
+DB_ROUND_TRIPS = 200
+REPEATS = 3
+
+# how often the progress bar should move while a csv is parsed a piece at a time
+CHUNK_SECONDS = 0.25
+MIN_CHUNK_ROWS = 10_000
+MAX_CHUNK_ROWS = 1_000_000
+# a worker count is enough once it gets this share of the best throughput
+SCALING_SHARE = 0.9
+MAX_WORKERS = 16
+# the GEMM time one training step of the neural network should take
+MLP_STEP_SECONDS = 0.002
+MIN_BATCH_SIZE = 32
+MAX_BATCH_SIZE = 1024
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def _best(function, repeats=REPEATS):
+    # the fastest of a few runs in seconds, the slower ones are other things getting in the way
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def gemm_gflops(size=GEMM_SIZE):
+    rng = np.random.default_rng(0)
+    a = rng.random((size, size))
+    b = rng.random((size, size))
+    a @ b
+    return 2 * size ** 3 / _best(lambda: a @ b) / 1e9
+
+
+def memory_bandwidth(megabytes=COPY_MB):
+    # GB/s moved copying an array, a copy reads and writes every byte
+    source = np.ones(megabytes * 1024 * 1024 // 8)
+    target = np.empty_like(source)
+    np.copyto(target, source)
+    return 2 * source.nbytes / _best(lambda: np.copyto(target, source)) / 1e9
+
+
+def thread_scaling(max_threads=None, elements=SORT_ELEMENTS):
+    # {threads: elements sorted per second}, numpy lets go of the GIL while sorting so this is how the cores scale
+    max_threads = min(max_threads or os.cpu_count() or 1, MAX_WORKERS)
+    counts = sorted({1, max_threads} | {2 ** power for power in range(1, max_threads.bit_length())
+                                        if 2 ** power <= max_threads})
+    rng = np.random.default_rng(0)
+    arrays = [rng.random(elements) for _ in range(max_threads)]
+    rates = {}
+    for count in counts:
+        def sort_all():
+            threads = [threading.Thread(target=np.sort, args=(arrays[i],)) for i in range(count)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        rates[count] = count * elements / _best(sort_all)
+    return rates
+
+
+def csv_parse_rate(rows=CSV_ROWS):
+    # rows/s pandas parses of a banana_quality shaped csv (7 float columns, a label and an id)
+    import pandas as pd
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.normal(size=(rows, 7)), columns=["Size", "Weight", "Sweetness", "Softness",
+                                                             "HarvestTime", "Ripeness", "Acidity"])
+    frame["Quality"] = np.where(rng.random(rows) < 0.5, "Good", "Bad")
+    frame["banana_id"] = np.arange(rows)
+    data = frame.to_csv(index=False).encode()
+    return rows / _best(lambda: pd.read_csv(io.BytesIO(data)))
+
+
+def file_io(folder, megabytes=FILE_MB, reads=RANDOM_READS, read_bytes=RANDOM_READ_BYTES):
+    # {"write_mb_s", "read_mb_s", "random_reads_s"} for a temporary file in folder
+    block = os.urandom(1024 * 1024)
+    os.makedirs(folder, exist_ok=True)
+    handle, path = tempfile.mkstemp(prefix="calibration_", dir=folder)
+    try:
+        start = time.perf_counter()
+        with os.fdopen(handle, "wb") as f:
+            for _ in range(megabytes):
+                f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+        write_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(path, "rb", buffering=0) as f:
+            while f.read(1024 * 1024):
+                pass
+        read_seconds = time.perf_counter() - start
+
+        offsets = np.random.default_rng(0).integers(0, megabytes * 1024 * 1024 - read_bytes, reads)
+        start = time.perf_counter()
+        with open(path, "rb", buffering=0) as f:
+            for offset in offsets:
+                f.seek(int(offset))
+                f.read(read_bytes)
+        random_seconds = time.perf_counter() - start
+    finally:
+        os.remove(path)
+    return {"write_mb_s": megabytes / write_seconds, "read_mb_s": megabytes / read_seconds,
+            "random_reads_s": reads / random_seconds}
+
+
+def db_round_trip(engine=None, trips=DB_ROUND_TRIPS):
+    # median seconds of a SELECT 1, on engine or a temporary sqlite database
+    from sqlalchemy import create_engine, text
+    folder = None
+    if engine is None:
+        folder = tempfile.mkdtemp()
+        engine = create_engine(f"sqlite:///{os.path.join(folder, 'calibration.db')}")
+    try:
+        times = []
+        with engine.connect() as conn:
+            # the statement log would be 200 lines of SELECT 1
+            conn = conn.execution_options(query_trace_skip=True)
+            conn.execute(text("SELECT 1")).scalar()
+            for _ in range(trips):
+                start = time.perf_counter()
+                conn.execute(text("SELECT 1")).scalar()
+                times.append(time.perf_counter() - start)
+        return float(np.median(times))
+    finally:
+        if folder is not None:
+            engine.dispose()
+            os.remove(os.path.join(folder, "calibration.db"))
+            os.rmdir(folder)
+
+
+def run(folder=".", engine=None):
+    # every benchmark, a failed one is logged and left out
+    benchmarks = [
+        ("gemm_gflops", gemm_gflops),
+        ("memory_gb_s", memory_bandwidth),
+        ("thread_scaling", thread_scaling),
+        ("csv_rows_s", csv_parse_rate),
+        ("file_io", lambda: file_io(folder)),
+        ("db_round_trip_s", lambda: db_round_trip(engine)),
+    ]
+    results = {}
+    for name, benchmark in benchmarks:
+        start = time.perf_counter()
+        try:
+            results[name] = benchmark()
+        except Exception as e:
+            logger.error(f"Calibration benchmark {name} failed: {str(e)}")
+            continue
+        logger.info(f"Calibration benchmark {name} took {time.perf_counter() - start:.2f}s")
+    return results
+
+
+def tune(results):
+    # the settings the app uses for the benchmark results, anything not measured is left out
+    settings = {}
+    if "csv_rows_s" in results:
+        rows = int(results["csv_rows_s"] * CHUNK_SECONDS) // 10_000 * 10_000
+        settings["csv_chunk_rows"] = min(max(rows, MIN_CHUNK_ROWS), MAX_CHUNK_ROWS)
+    if "thread_scaling" in results:
+        rates = {int(count): rate for count, rate in results["thread_scaling"].items()}
+        best = max(rates.values())
+        settings["workers"] = min(count for count, rate in rates.items() if rate >= best * SCALING_SHARE)
+    if "gemm_gflops" in results:
+        settings["gemm_gflops"] = results["gemm_gflops"]
+    return settings
+
+
+def fingerprint():
+    # what the calibration is only good for, a new machine/cpu count/numpy means calibrating again
+    return {"machine": platform.node(), "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(), "numpy": np.__version__}
+
+
+def load(path=CALIBRATION_FILE):
+    # the cached calibration, None if there isnt one for this machine or it is too old
+    try:
+        with open(path) as f:
+            calibration = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if calibration.get("fingerprint") != fingerprint():
+        return None
+    if datetime.now() - datetime.fromisoformat(calibration["time"]) > MAX_AGE:
+        return None
+    return calibration
+
+
+def save(calibration, path=CALIBRATION_FILE):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(calibration, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def calibrate(folder=".", engine=None, force=False, path=CALIBRATION_FILE):
+    # the cached calibration, or run the benchmarks and cache them, the settings are used from then on
+    global _settings
+    calibration = None if force else load(path)
+    if calibration is None:
+        results = run(folder, engine)
+        calibration = {"fingerprint": fingerprint(), "time": datetime.now().isoformat(timespec="seconds"),
+                       "results": results, "settings": tune(results)}
+        try:
+            save(calibration, path)
+        except OSError as e:
+            logger.error(f"An error occurred while saving the calibration: {str(e)}")
+    with _settings_lock:
+        _settings = calibration["settings"]
+    return calibration
+
+
+def setting(name, default=None):
+    # a tuned setting, read from the cached calibration the first time one is asked for
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            calibration = load()
+            _settings = calibration["settings"] if calibration else {}
+        return _settings.get(name, default)
+
+
+def mlp_batch_size(n_features, hidden_layer_sizes, n_samples, default="auto"):
+    # a batch big enough that numpy's matrix multiplies run at speed but small enough for a few ms per step,
+    # a training step is about 3 matrix multiplies per layer (forward, and the two for the gradients)
+    gflops = setting("gemm_gflops")
+    if not gflops:
+        return default
+    layers = [n_features] + list(hidden_layer_sizes) + [1]
+    flops_per_sample = 3 * 2 * sum(inputs * outputs for inputs, outputs in zip(layers, layers[1:]))
+    batch_size = MLP_STEP_SECONDS * gflops * 1e9 / flops_per_sample
+    # a power of two, between the limits and no bigger than the training data
+    batch_size = 2 ** int(np.log2(max(batch_size, 1)))
+    return int(min(max(batch_size, MIN_BATCH_SIZE), MAX_BATCH_SIZE, n_samples))
+
+
+def describe(calibration):
+    # the calibration as lines of text, for the log and the calibration window
+    results = calibration["results"]
+    lines = [f"Calibrated {calibration['time']} on {calibration['fingerprint']['machine']} "
+             f"({calibration['fingerprint']['cpus']} cpus)"]
+    if "gemm_gflops" in results:
+        lines.append(f"  Matrix multiply: {results['gemm_gflops']:.1f} GFLOP/s")
+    if "memory_gb_s" in results:
+        lines.append(f"  Memory bandwidth: {results['memory_gb_s']:.1f} GB/s")
+    if "thread_scaling" in results:
+        lines.append("  Thread scaling: " + ", ".join(f"{count} threads {rate / 1e6:.0f}M/s"
+                                                     for count, rate in results["thread_scaling"].items()))
+    if "csv_rows_s" in results:
+        lines.append(f"  CSV parsing: {results['csv_rows_s']:,.0f} rows/s")
+    if "file_io" in results:
+        file_results = results["file_io"]
+        lines.append(f"  Disk: write {file_results['write_mb_s']:.0f} MB/s, read {file_results['read_mb_s']:.0f} MB/s, "
+                     f"{file_results['random_reads_s']:,.0f} random 4 KB reads/s")
+    if "db_round_trip_s" in results:
+        lines.append(f"  Database round trip: {results['db_round_trip_s'] * 1000:.2f} ms")
+    lines.append("  Settings: " + ", ".join(f"{name} {value:.1f}" if isinstance(value, float) else f"{name} {value}"
+                                            for name, value in calibration["settings"].items()))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark this machine and tune the app's settings for it.")
+    parser.add_argument("--force", action="store_true", help="calibrate again even if there is a cached calibration")
+    parser.add_argument("--folder", default=".", help="the data folder whose disk is benchmarked")
+    parser.add_argument("--database-url", help="time round trips to this database (default a temporary sqlite one)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    engine = None
+    if args.database_url:
+        from sqlalchemy import create_engine
+        engine = create_engine(args.database_url)
+    print("\n".join(describe(calibrate(args.folder, engine, force=args.force))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
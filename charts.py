@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib import rcParams
+from matplotlib.figure import Figure
+
+"""
+These are the chart builders that GraphTheory uses, they only ever touch a matplotlib Figure so there is no tkinter in
+here at all, this means the same chart can be shown in a tk window, saved by the headless exporter (export_charts.py) or
+rendered on a server without a display
+every function takes the DataFrame and the column(s) and hands back the Figure, the caller decides what to do with it
+(pack it into a FigureCanvasTkAgg, savefig it, etc.)
+max_labels caps how many points get a "(x, y)" text label, None keeps the old behaviour of labelling every point
+fig is optional, pass in a pooled figure (see figure_pool.py) and it is drawn into instead of making a new one
+"""
+
+
+def _new_figure(fig, figsize, dpi):
+    # hand back the figure to draw on, a pooled figure is wiped (and its spacing reset) first
+    if fig is None:
+        return Figure(figsize=figsize, dpi=dpi)
+    fig.clear()
+    fig.subplots_adjust(**{key: rcParams[f'figure.subplot.{key}']
+                           for key in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')})
+    return fig
+
+
+def _single_axes(fig, figsize, dpi):
+    # reuse the axes of a pooled figure if it only has the one, otherwise start again with a single subplot
+    if fig is not None and len(fig.axes) == 1:
+        ax = fig.axes[0]
+        ax.clear()
+        return fig, ax
+    fig = _new_figure(fig, figsize, dpi)
+    return fig, fig.add_subplot(111)
+
+
+def _label_points(ax, xs, ys, max_labels):
+    # Add value labels to data points
+    if max_labels is None or len(xs) <= max_labels:
+        for x, y in zip(xs, ys):
+            ax.text(x, y, f'({x:.2f}, {y:.2f})', fontsize=8, ha='left', va='bottom')
+
+
+def histogram_figure(data, column, fig=None):
+    # Create a Figure object, set to large size but open to change for user preference
+    fig, ax = _single_axes(fig, (6, 4), 100)
+    fig._chart_kind = 'histogram'
+
+    # Convert the data to a DataFrame
+    data = pd.DataFrame(data[column], columns=[column])
+
+    # create hisogram with seaborn, set some specifics but once again, open to user preference
+    sns.histplot(data=data, x=column, ax=ax, kde=True, color='skyblue', bins=20, edgecolor='black', alpha=0.7)
+    ax.set_xlabel(column)
+    ax.set_ylabel('Frequency')
+    ax.set_title(f'Histogram of {column}')
+    ax.legend([column])
+
+    # Add mean and median vertical lines
+    mean = data[column].mean()
+    median = data[column].median()
+    ax.axvline(mean, color='red', linestyle='--', label=f'Mean: {mean:.2f}')
+    ax.axvline(median, color='green', linestyle='--', label=f'Median: {median:.2f}')
+    ax.legend()
+    return fig
+
+
+def line_plot_figure(data, x_column, y_column, max_labels=None, fig=None):
+    fig, ax = _single_axes(fig, (6, 4), 100)
+    fig._chart_kind = 'line plot'
+
+    data = pd.DataFrame(data[[x_column, y_column]])
+
+    sns.lineplot(x=x_column, y=y_column, data=data, ax=ax, color='blue', linewidth=2, marker='o', markersize=6)
+    ax.set_xlabel(x_column)
+    ax.set_ylabel(y_column)
+    ax.set_title(f'Line Plot of {y_column} against {x_column}')
+
+    _label_points(ax, data[x_column], data[y_column], max_labels)
+
+    # Add grid lines
+    ax.grid(True, linestyle='--', alpha=0.7)
+    return fig
+
+
+def scatter_plot_figure(data, x_column, y_column, hue_column=None, max_labels=None, fig=None):
+    fig, ax = _single_axes(fig, (10, 8), 150)
+    fig._chart_kind = 'scatter plot'
+
+    if hue_column is None:
+        data = pd.DataFrame(data[[x_column, y_column]])
+        sns.scatterplot(x=x_column, y=y_column, data=data, ax=ax, color='darkblue', s=60, alpha=0.7)
+    else:
+        data = pd.DataFrame(data[[x_column, y_column, hue_column]])
+        sns.scatterplot(x=x_column, y=y_column, hue=hue_column, data=data, ax=ax, palette='viridis', s=60,
+                        alpha=0.7)
+        ax.legend(title=hue_column, loc='upper right')
+
+    ax.set_xlabel(x_column)
+    ax.set_ylabel(y_column)
+    ax.set_title(f'Scatter Plot of {y_column} against {x_column}')
+
+    # zip over the two columns instead of iterrows, iterrows builds a Series per row which is painfully slow
+    _label_points(ax, data[x_column], data[y_column], max_labels)
+    return fig
+
+
+def box_plot_figure(data, column, fig=None):
+    fig, ax = _single_axes(fig, (8, 6), 100)
+    fig._chart_kind = 'box plot'
+
+    data = pd.DataFrame(data[column], columns=[column])
+
+    sns.boxplot(x=column, data=data, ax=ax, color='skyblue', linewidth=1.5, fliersize=3)
+    ax.set_xlabel(column)
+    ax.set_ylabel('Value')
+    ax.set_title(f'Box Plot of {column}')
+
+    # Add data points as scatter points
+    sns.stripplot(x=column, data=data, ax=ax, color='darkblue', size=4, alpha=0.5)
+
+    # Display statistical summary
+    quartiles = data[column].quantile([0.25, 0.5, 0.75])
+    q1, median, q3 = quartiles[0.25], quartiles[0.5], quartiles[0.75]
+    iqr = q3 - q1
+    ax.text(0.95, 0.95, f'Median: {median:.2f}\nQ1: {q1:.2f}, Q3: {q3:.2f}\nIQR: {iqr:.2f}',
+            transform=ax.transAxes, fontsize=10, ha='right', va='top', bbox=dict(facecolor='white', alpha=0.8))
+    return fig
+
+
+def pairplot_figure(data, fig=None):
+    # sns.pairplot makes its own figure through pyplot which drags in a gui backend and isnt safe off the main
+    # thread, so the grid is built by hand on a plain Figure with the same look (kde on the diagonal)
+    columns = list(data.select_dtypes(include='number').columns)
+    n = len(columns)
+    fig = _new_figure(fig, (3 * 1.5 * n, 3 * n), 100)
+    fig._chart_kind = 'pair plot'
+    axes = fig.subplots(n, n, squeeze=False)
+
+    for row, y_column in enumerate(columns):
+        for col, x_column in enumerate(columns):
+            ax = axes[row][col]
+            if row == col:
+                sns.kdeplot(data=data, x=x_column, ax=ax, fill=True)
+            else:
+                sns.scatterplot(x=x_column, y=y_column, data=data, ax=ax, s=10, alpha=0.7)
+            # only the outer edge keeps its labels, like the seaborn grid
+            ax.set_xlabel(x_column if row == n - 1 else '')
+            ax.set_ylabel(y_column if col == 0 else '')
+
+    fig.suptitle("Pair Plot", fontsize=16)
+    fig.subplots_adjust(top=0.95)
+    return fig
+
+
+def correlation_heatmap_figure(data, fig=None):
+    # the colorbar adds a second axes so a heatmap always starts from a clean figure
+    fig = _new_figure(fig, (8, 6), 100)
+    fig._chart_kind = 'heatmap'
+    ax = fig.add_subplot(111)
+
+    corr_matrix = data.corr(numeric_only=True)
+    sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', ax=ax, fmt='.2f', linewidths=0.5,
+                annot_kws={"fontsize": 10})
+    ax.set_title('Correlation Heatmap')
+
+    # Add a color bar
+    cbar = ax.collections[0].colorbar
+    cbar.ax.tick_params(labelsize=10)
+    return fig
+
+
+def update_xy_figure(fig, data, x_column, y_column, max_labels=None):
+    # swap the columns shown by an existing line/scatter figure by moving the artists data instead of re-plotting,
+    # returns False when the figure cant be updated in place and has to be redrawn
+    kind = getattr(fig, '_chart_kind', None)
+    if kind not in ('line plot', 'scatter plot') or len(fig.axes) != 1:
+        return False
+    ax = fig.axes[0]
+    xs = data[x_column].to_numpy()
+    ys = data[y_column].to_numpy()
+
+    if kind == 'line plot':
+        # seaborn averages repeated x values and draws a confidence band around them, only the simple case (every x
+        # is unique so the line is just the sorted points) is done in place
+        if len(ax.lines) != 1 or not data[x_column].is_unique:
+            return False
+        order = np.argsort(xs, kind='stable')
+        ax.lines[0].set_data(xs[order], ys[order])
+        # the band is empty when every x is unique
+        for collection in list(ax.collections):
+            collection.remove()
+        ax.relim()
+        title = f'Line Plot of {y_column} against {x_column}'
+    else:
+        # a hue legend means the points are split over several colours, that needs a full redraw
+        if len(ax.collections) != 1 or ax.get_legend() is not None:
+            return False
+        offsets = np.column_stack([xs, ys])
+        ax.collections[0].set_offsets(offsets)
+        # relim ignores collections so the data limits are rebuilt from the new offsets
+        ax.ignore_existing_data_limits = True
+        ax.update_datalim(offsets)
+        title = f'Scatter Plot of {y_column} against {x_column}'
+
+    for text in list(ax.texts):
+        text.remove()
+    _label_points(ax, xs, ys, max_labels)
+    ax.set_xlabel(x_column)
+    ax.set_ylabel(y_column)
+    ax.set_title(title)
+    ax.autoscale_view()
+    return True
+
+
+def progressive_figure(x_column, y_column, kind, fig=None):
+    # an empty line/scatter figure with the usual labels, progressive_plot.ProgressiveRenderer fills in the points
+    fig, ax = _single_axes(fig, (6, 4) if kind == 'line' else (10, 8), 100 if kind == 'line' else 150)
+    fig._chart_kind = f'progressive {kind}'
+    ax.set_xlabel(x_column)
+    ax.set_ylabel(y_column)
+    if kind == 'line':
+        ax.set_title(f'Line Plot of {y_column} against {x_column}')
+        ax.grid(True, linestyle='--', alpha=0.7)
+    else:
+        ax.set_title(f'Scatter Plot of {y_column} against {x_column}')
+    return fig, ax
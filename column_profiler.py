@@ -0,0 +1,232 @@
+import numpy as np
+import pandas as pd
+
+"""
+This is the profiling engine behind the graph suggestions, the old suggestions were the same few sentences based on how
+many headers were picked, these are worked out from the actual data
+for every selected column it works out the null ratio, cardinality, skew, outlier count and whether the column is really
+categorical or numeric, plus the pairwise correlation between the numeric ones, then recommend() turns those numbers
+into chart suggestions
+to keep it fast on big files (1M+ rows) the cheap reductions (nulls, mean, skew, min/max, outlier counts) are exact
+numpy passes over the whole column, everything that needs a sort or a hash table (quartiles, cardinality, correlation)
+is done on a random sample
+results are cached per column so picking one more header only profiles the new one, the cache is tied to the
+DataFrame so loading a new file starts fresh
+"""
+
+# columns with this few distinct values are treated as categories even if they are stored as numbers
+CATEGORICAL_MAX_UNIQUE = 20
+# how strong a correlation has to be before it is worth pointing out
+STRONG_CORRELATION = 0.7
+MODERATE_CORRELATION = 0.3
+# |skew| above this is a noticeably lopsided distribution
+SKEWED = 1.0
+# null ratio worth warning about
+HIGH_NULL_RATIO = 0.05
+
+
+class ColumnProfiler:
+    def __init__(self, sample_size=100_000, random_state=42):
+        self.sample_size = sample_size
+        self.random_state = random_state
+        # column name -> (data token, profile)
+        self._cache = {}
+        # (rows, sample index) of the last sample, profile() and correlations() use the same one
+        self._sample = (None, None)
+
+    def invalidate(self, columns=None):
+        # forget the cached profiles, either for some columns or all of them
+        if columns is None:
+            self._cache.clear()
+        else:
+            for column in columns:
+                self._cache.pop(column, None)
+
+    def profile(self, data, columns):
+        # profile the columns, returns {column: profile dict}, only the columns not already cached are worked out
+        token = (id(data), len(data))
+        missing = [column for column in columns if self._cache.get(column, (None,))[0] != token]
+        if missing:
+            sample_index = self._sample_index(len(data))
+            numeric = [column for column in missing if pd.api.types.is_numeric_dtype(data[column].dtype)
+                       and not pd.api.types.is_bool_dtype(data[column].dtype)]
+            other = [column for column in missing if column not in numeric]
+            if numeric:
+                for column, profile in self._profile_numeric(data, numeric, sample_index).items():
+                    self._cache[column] = (token, profile)
+            for column in other:
+                self._cache[column] = (token, self._profile_categorical(data[column], sample_index))
+        return {column: self._cache[column][1] for column in columns}
+
+    def correlations(self, data, columns):
+        # pairwise pearson correlation of the numeric columns on the sample, rows with a missing value are dropped
+        if len(columns) < 2:
+            return pd.DataFrame(index=columns, columns=columns, dtype=float)
+        # only the sampled rows are copied out of the frame
+        sample_index = self._sample_index(len(data))
+        values = np.column_stack([data[column].to_numpy(dtype=np.float64)[sample_index] for column in columns])
+        values = values[~np.isnan(values).any(axis=1)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            matrix = np.corrcoef(values, rowvar=False) if len(values) > 1 else np.full((len(columns),) * 2, np.nan)
+        return pd.DataFrame(matrix, index=columns, columns=columns)
+
+    def _sample_index(self, n):
+        # a slice of everything for small data, otherwise each row is kept with the same chance so the sample is about
+        # sample_size rows and comes out in order (choice without replacement shuffles all n rows, 10x slower at 1M)
+        if n <= self.sample_size:
+            return slice(None)
+        if self._sample[0] != n:
+            rng = np.random.default_rng(self.random_state)
+            self._sample = (n, np.flatnonzero(rng.random(n) < self.sample_size / n))
+        return self._sample[1]
+
+    def _profile_numeric(self, data, columns, sample_index):
+        # each column is reduced on its own as a contiguous 1d array (pandas keeps a float column contiguous so this is
+        # usually a view, not a copy), reducing a row-major 2d block along axis 0 strides through memory and was 3x
+        # slower
+        return {column: self._profile_numeric_column(data[column].to_numpy(dtype=np.float64), sample_index)
+                for column in columns}
+
+    @staticmethod
+    def _profile_numeric_column(values, sample_index):
+        n = len(values)
+        missing = np.isnan(values)
+        nulls = int(np.count_nonzero(missing))
+        valid = values[~missing] if nulls else values
+        count = len(valid)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = valid.sum() / count if count else np.nan
+            centred = valid - mean
+            squares = centred * centred
+            m2 = squares.sum() / count if count else np.nan
+            # dot product reads both arrays once without writing a third
+            m3 = np.dot(squares, centred) / count if count else np.nan
+            skew = m3 / m2 ** 1.5
+        del centred, squares
+
+        # quartiles and cardinality on the sample (one sort for both), then an exact count of everything outside the
+        # 1.5 * IQR fences (comparisons with NaN are False so missing values are never outliers)
+        sample = values[sample_index]
+        sample = np.sort(sample[~np.isnan(sample)])
+        if len(sample):
+            q1, q3 = np.percentile(sample, [25, 75])
+            iqr = q3 - q1
+            outliers = np.count_nonzero(values < q1 - 1.5 * iqr) + np.count_nonzero(values > q3 + 1.5 * iqr)
+            unique = 1 + int(np.count_nonzero(sample[1:] != sample[:-1]))
+        else:
+            outliers = 0
+            unique = 0
+
+        # monotonic columns (ids, dates, running totals) are what a line plot wants on its x axis
+        increasing = n > 1 and bool(np.all(values[1:] >= values[:-1]))
+
+        return {
+            'kind': 'categorical' if 0 < unique <= CATEGORICAL_MAX_UNIQUE else 'numeric',
+            'rows': n,
+            'null_ratio': nulls / n if n else 0.0,
+            'unique': unique,
+            'unique_is_estimate': len(sample) < count,
+            'mean': float(mean),
+            'std': float(np.sqrt(m2)),
+            'min': float(valid.min()) if count else float('inf'),
+            'max': float(valid.max()) if count else float('-inf'),
+            'skew': float(skew) if np.isfinite(skew) else 0.0,
+            'outliers': int(outliers),
+            'increasing': increasing,
+        }
+
+    def _profile_categorical(self, series, sample_index):
+        n = len(series)
+        nulls = int(series.isna().sum())
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # the categories are already known, no need to hash anything
+            counts = series.value_counts(dropna=True)
+            unique_is_estimate = False
+        else:
+            counts = series.iloc[sample_index].value_counts(dropna=True)
+            unique_is_estimate = n > self.sample_size
+        counts = counts[counts > 0]
+        unique = len(counts)
+        return {
+            'kind': 'categorical' if unique <= CATEGORICAL_MAX_UNIQUE or unique < 0.5 * max(counts.sum(), 1)
+            else 'text',
+            'rows': n,
+            'null_ratio': nulls / n if n else 0.0,
+            'unique': unique,
+            'unique_is_estimate': unique_is_estimate,
+            'top': counts.index[0] if unique else None,
+            'top_share': float(counts.iloc[0] / counts.sum()) if unique else 0.0,
+        }
+
+    def recommend(self, data, columns):
+        # turns the profiles into (recommended graph types, suggestion sentences), the graph types use the same names
+        # as GraphSelectionWindow
+        profiles = self.profile(data, columns)
+        numeric = [column for column in columns if profiles[column]['kind'] == 'numeric']
+        categorical = [column for column in columns if profiles[column]['kind'] == 'categorical']
+        charts = []
+        suggestions = []
+
+        def add_chart(chart):
+            if chart not in charts:
+                charts.append(chart)
+
+        for column in columns:
+            profile = profiles[column]
+            if profile['null_ratio'] > HIGH_NULL_RATIO:
+                suggestions.append(f"{column} is {profile['null_ratio']:.0%} empty, missing values are left out of "
+                                   f"the charts.")
+            if profile['kind'] == 'numeric':
+                add_chart("histogram")
+                if abs(profile['skew']) > SKEWED:
+                    side = "right" if profile['skew'] > 0 else "left"
+                    suggestions.append(f"{column} is {side}-skewed (skew {profile['skew']:.2f}), a histogram shows "
+                                       f"the long tail better than summary statistics.")
+                if profile['outliers']:
+                    add_chart("box plot")
+                    suggestions.append(f"{column} has {profile['outliers']:,} outliers outside 1.5 x IQR, a box plot "
+                                       f"will show them.")
+            elif profile['kind'] == 'categorical':
+                suggestions.append(f"{column} looks categorical ({profile['unique']} distinct values), a bar/count "
+                                   f"plot or grouping the other columns by it suits it better than a histogram.")
+            else:
+                suggestions.append(f"{column} is free text with ~{profile['unique']:,} distinct values, it cant be "
+                                   f"plotted directly.")
+
+        if len(numeric) >= 2:
+            corr = self.correlations(data, numeric)
+            pairs = []
+            for i, first in enumerate(numeric):
+                for second in numeric[i + 1:]:
+                    r = corr.loc[first, second]
+                    if np.isfinite(r) and abs(r) >= MODERATE_CORRELATION:
+                        pairs.append((abs(r), r, first, second))
+            for _, r, first, second in sorted(pairs, reverse=True)[:5]:
+                strength = "strong" if abs(r) >= STRONG_CORRELATION else "moderate"
+                direction = "positive" if r > 0 else "negative"
+                suggestions.append(f"{first} and {second} have a {strength} {direction} correlation (r = {r:.2f}), "
+                                   f"a scatter plot will show it.")
+            if pairs:
+                add_chart("scatter plot")
+            elif len(numeric) == 2:
+                suggestions.append(f"{numeric[0]} and {numeric[1]} are barely correlated, a scatter plot will "
+                                   f"mostly show noise.")
+            if len(numeric) == 2 and profiles[numeric[0]]['increasing']:
+                add_chart("line plot")
+                suggestions.append(f"{numeric[0]} only ever increases so it works as the x axis of a line plot.")
+            if len(numeric) > 2:
+                add_chart("heatmap")
+                if len(numeric) <= 6:
+                    add_chart("pair plot")
+                else:
+                    suggestions.append("A pair plot of more than 6 columns gets too small to read, the heatmap "
+                                       "gives the overview instead.")
+
+        if categorical and numeric:
+            suggestions.append(f"Comparing {', '.join(numeric[:3])} across the {categorical[0]} groups with a box "
+                               f"plot per group can reveal patterns.")
+
+        if not suggestions:
+            suggestions.append("Nothing stands out in the selected columns.")
+        return charts, suggestions
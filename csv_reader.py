@@ -0,0 +1,186 @@
+import io
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+import calibration
+
+logger = logging.getLogger(__name__)
+
+"""
+Multithreaded csv parsing for big files
+pd.read_csv parses on one core, pyarrow's csv reader splits the file into blocks at line boundaries and parses the
+blocks on every core at once, then the columns are handed to pandas without going back through python objects
+the frame has to look like the one read_csv would give (load_data and GraphTheory depend on the dtypes), so:
+- dates and times arent parsed (pandas leaves them as text), the first block is looked at to find those columns and
+  they are read as strings
+- empty strings are missing values (NaN) like in pandas and a column with nothing in it is float64 NaN
+- anything arrow cant read the way pandas would (quoted newlines, duplicate column names, a value that doesnt fit the
+  type worked out from the first block) falls back to pd.read_csv
+small files go straight to pd.read_csv as starting the threads costs more than it saves
+read_csv_chunked gives the same frame but reads the file a piece at a time (arrow record batches for big files, pandas
+chunks for small ones) so the gui can show progress and a preview of the first rows and cancel the load in between
+size stops either of them at that many bytes, for a file that is still being appended to the rows written while it is
+parsed are left for the append watcher (see file_watcher.py) rather than being read twice
+"""
+
+# files smaller than this are read with pandas
+PARALLEL_THRESHOLD = 32 * 1024 * 1024
+# how much of the file each thread parses at a time
+BLOCK_SIZE = 8 * 1024 * 1024
+# rows per piece when pandas reads a file a piece at a time
+CHUNK_ROWS = 50_000
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+class _FilePrefix(io.RawIOBase):
+    # the first size bytes of a file, whatever gets written after them
+    def __init__(self, path, size):
+        self.file = open(path, 'rb')
+        self.size = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self.file.readinto(memoryview(buffer)[:max(self.size - self.file.tell(), 0)])
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+def _open(path, size=None):
+    if size is None:
+        return open(path, 'rb')
+    return io.BufferedReader(_FilePrefix(path, size))
+
+
+def _read_options(encoding, block_size):
+    # arrow reads utf8 natively, anything else is transcoded as it is read
+    if encoding is None or encoding.lower().replace("-", "") in ("utf8", "ascii"):
+        return pacsv.ReadOptions(use_threads=True, block_size=block_size)
+    return pacsv.ReadOptions(use_threads=True, block_size=block_size, encoding=encoding)
+
+
+def _text_columns(path, read_options):
+    # columns the first block makes arrow think are dates or times, pandas would leave those as text
+    with pacsv.open_csv(path, read_options=read_options) as reader:
+        schema = reader.schema
+    return {field.name: pa.string() for field in schema if pa.types.is_temporal(field.type)}
+
+
+def _convert_options(path, read_options):
+    return pacsv.ConvertOptions(column_types=_text_columns(path, read_options), strings_can_be_null=True)
+
+
+def _null_to_float(table):
+    # a column with nothing in it comes back as the null type, pandas makes those float64
+    fields = [pa.field(field.name, pa.float64()) if pa.types.is_null(field.type) else field for field in table.schema]
+    return table.cast(pa.schema(fields))
+
+
+def read_arrow_csv(path, encoding=None, block_size=BLOCK_SIZE, size=None):
+    # parse the whole file on every core, returns a pyarrow Table
+    read_options = _read_options(encoding, block_size)
+    convert_options = _convert_options(path, read_options)
+    if size is None:
+        # arrow reads the file itself, a python file in between is only needed to stop part way
+        return _null_to_float(pacsv.read_csv(path, read_options=read_options, convert_options=convert_options))
+    with _open(path, size) as f:
+        return _null_to_float(pacsv.read_csv(f, read_options=read_options, convert_options=convert_options))
+
+
+def _table_to_pandas(table):
+    # split_blocks keeps every column in its own block so the columns arent copied again to consolidate them
+    df = table.to_pandas(split_blocks=True)
+    # missing text comes out as None, pandas uses NaN
+    for name in table.column_names:
+        if pa.types.is_string(table.schema.field(name).type) and table.column(name).null_count:
+            df[name] = df[name].fillna(np.nan)
+    return df
+
+
+def _read_arrow_batches(path, encoding, block_size, total, progress, cancel, size=None):
+    read_options = _read_options(encoding, block_size)
+    with _open(path, size) as f:
+        reader = pacsv.open_csv(f, read_options=read_options, convert_options=_convert_options(path, read_options))
+        if len(set(reader.schema.names)) != len(reader.schema.names):
+            return None
+        batches = []
+        rows = 0
+        for batch in reader:
+            if cancel is not None and cancel.is_set():
+                raise LoadCancelled()
+            batches.append(batch)
+            rows += batch.num_rows
+            if progress is not None:
+                preview = _table_to_pandas(pa.Table.from_batches([batch])) if len(batches) == 1 else None
+                progress(min(f.tell(), total), total, rows, preview)
+        table = pa.Table.from_batches(batches, schema=reader.schema)
+    return _table_to_pandas(_null_to_float(table))
+
+
+def _read_pandas_chunks(path, encoding, chunk_rows, total, progress, cancel, size=None):
+    chunks = []
+    rows = 0
+    with _open(path, size) as f:
+        for chunk in pd.read_csv(f, encoding=encoding, chunksize=chunk_rows):
+            if cancel is not None and cancel.is_set():
+                raise LoadCancelled()
+            chunks.append(chunk)
+            rows += len(chunk)
+            if progress is not None:
+                progress(min(f.tell(), total), total, rows, chunk if len(chunks) == 1 else None)
+    if not chunks:
+        # just a header
+        with _open(path, size) as f:
+            return pd.read_csv(f, encoding=encoding)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_csv_chunked(path, encoding=None, progress=None, cancel=None, threshold=PARALLEL_THRESHOLD,
+                     block_size=BLOCK_SIZE, chunk_rows=None, size=None):
+    # read_csv a piece at a time, progress(bytes read, total bytes, rows parsed, preview) is called after each piece
+    # with the first piece as the preview (None after that), setting the cancel event raises LoadCancelled
+    total = size if size is not None else os.path.getsize(path)
+    if total >= threshold:
+        try:
+            df = _read_arrow_batches(path, encoding, block_size, total, progress, cancel, size)
+            if df is not None:
+                return df
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            logger.warning(f"Could not parse {path} on multiple threads, using pandas instead: {str(e)}")
+    # the rows per piece are tuned to the machine by calibration.py
+    chunk_rows = chunk_rows or calibration.setting("csv_chunk_rows", CHUNK_ROWS)
+    return _read_pandas_chunks(path, encoding, chunk_rows, total, progress, cancel, size)
+
+
+def _read_pandas(path, encoding, size=None):
+    with _open(path, size) as f:
+        return pd.read_csv(f, encoding=encoding)
+
+
+def read_csv(path, encoding=None, threshold=PARALLEL_THRESHOLD, block_size=BLOCK_SIZE, size=None):
+    # read a csv into a DataFrame with the same dtypes pd.read_csv would give, big files are parsed on every core
+    if (size if size is not None else os.path.getsize(path)) < threshold:
+        return _read_pandas(path, encoding, size)
+    try:
+        table = read_arrow_csv(path, encoding, block_size, size)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        logger.warning(f"Could not parse {path} on multiple threads, using pandas instead: {str(e)}")
+        return _read_pandas(path, encoding, size)
+    if len(set(table.column_names)) != len(table.column_names):
+        # pandas renames duplicate columns (x, x.1), easier to just let it
+        return _read_pandas(path, encoding, size)
+    return _table_to_pandas(table)
@@ -0,0 +1,52 @@
+import logging
+
+from csv_reader import read_csv, read_csv_chunked
+from encoding_detection import encoding_detector
+from schema_inference import compact_dtypes, log_report
+
+logger = logging.getLogger(__name__)
+
+"""
+This is where files get turned into DataFrames, the gui (WindowMaker.parse_csv), the chart exporter and anything else
+that needs a dataset goes through here so they all get the same dtypes and all share the Arrow cache
+if a cache is passed in and it has the file, the file isnt even opened, otherwise it is decoded and parsed as before,
+shrunk to compact dtypes (see schema_inference.py) and the result is cached for next time
+a file that is being appended to is loaded as of a fingerprint taken first (see dataset_cache.file_fingerprint), only the
+bytes it had then are parsed so whoever watches the file for appends knows exactly where the data stops
+"""
+
+
+def detect_encoding(path):
+    # only samples of the file are looked at and the answer is remembered (see encoding_detection.py)
+    return encoding_detector.detect(path)
+
+
+def load_csv(path, cache=None, columns=None, progress=None, cancel=None, fingerprint=None):
+    # load a csv file, columns limits it to just those columns (only they are read from the cache)
+    # progress and cancel are for loading in the background, the file is then parsed a piece at a time with progress
+    # called after each piece and the load stopped (LoadCancelled) once the cancel event is set, see load_jobs.py
+    # fingerprint is the file_fingerprint() to load the file as, anything written after its size is left out
+    size = fingerprint[1] if fingerprint is not None else None
+    if cache is not None:
+        df = cache.get(path, columns=columns, fingerprint=fingerprint)
+        if df is not None:
+            logger.info(f"Loaded {path} from the dataset cache")
+            return df
+
+    # Read the CSV file using detected encoding, big files are parsed on every core (see csv_reader.py)
+    def read(encoding):
+        if progress is None and cancel is None:
+            return read_csv(path, encoding=encoding, size=size)
+        return read_csv_chunked(path, encoding=encoding, progress=progress, cancel=cancel, size=size)
+
+    try:
+        df = read(detect_encoding(path))
+    except UnicodeDecodeError as e:
+        # the samples looked fine but somewhere else in the file isnt, check the whole file instead
+        logger.warning(f"{path} failed to decode ({str(e)}), detecting the encoding from the whole file")
+        df = read(encoding_detector.detect(path, full=True))
+    df, report = compact_dtypes(df)
+    log_report(report, path)
+    if cache is not None:
+        cache.put(path, df, fingerprint=fingerprint)
+    return df[columns] if columns is not None else df
@@ -1,14 +1,31 @@
 import datetime
+import io
+import logging
 import os
 import subprocess
 
 from sqlalchemy import create_engine, func, text, inspect, column, alias, MetaData, Table, select
 from sqlalchemy.orm import Session
-from sqlalchemy.ext.declarative import declarative_base
+from base import Base
+from latency import instrument_engine, timed
+from query_trace import trace_engine
 from models import Banana
 from models import RDM
 
-Base = declarative_base()
+logger = logging.getLogger(__name__)
+
+# the csv column for each banana_quality column
+BANANA_CSV_COLUMNS = {
+    "banana_id": "banana_id",
+    "size": "Size",
+    "weight": "Weight",
+    "sweetness": "Sweetness",
+    "softness": "Softness",
+    "harvest_time": "HarvestTime",
+    "ripeness": "Ripeness",
+    "acidity": "Acidity",
+    "quality": "Quality",
+}
 
 """ this is where all the crud happens, i initialise the db with the url, i then have the option to call on the CRUD
 with main.py from models
@@ -27,9 +44,14 @@ class DatabaseHandler:
     def __init__(self, db_url):
         # init the database handler with the url in windowmaker
         self.engine = create_engine(db_url, echo=True)
+        # every statement is timed too, see latency.py
+        instrument_engine(self.engine)
+        # and counted per statement shape, with the slow ones kept, see query_trace.py
+        self.query_tracer = trace_engine(self.engine)
         self.Session = Session
         Base.metadata.create_all(self.engine)
 
+    @timed("db.create_banana", rows=lambda banana_id: 1)
     def create_banana(self, size, weight, sweetness, softness, harvest_time, ripeness, acidity, quality):
         with self.Session(self.engine) as session:
             #  Create a session context manager using the engine
@@ -48,12 +70,14 @@ class DatabaseHandler:
             session.refresh(banana)  # Refresh the object to get the generated banana_id
             return banana.banana_id
 
+    @timed("db.read_banana", rows=lambda banana: 1)
     def read_banana(self, banana_id):
         # Method to retrieve a Banana record from the database by its banana_id
         # Create a session context manager using the engine
         with self.Session(self.engine) as session:
             return session.get(Banana, banana_id)
 
+    @timed("db.update_banana", rows=lambda banana: 1)
     def update_banana(self, banana_id, **kwargs):
         with self.Session(self.engine) as session:
             banana = session.get(Banana, banana_id)
@@ -65,6 +89,7 @@ class DatabaseHandler:
                 session.commit()
             return banana
 
+    @timed("db.delete_banana", rows=int)
     def delete_banana(self, banana_id):
         with self.Session(self.engine) as session:
             banana = session.get(Banana, banana_id)
@@ -74,6 +99,97 @@ class DatabaseHandler:
                 return True
             return False
 
+    """
+    Syncing a csv into banana_quality, upload_to_postgresql makes a new table every time so the same rows were copied
+    over and over, this makes banana_quality match the file instead and only writes rows that actually changed
+    the rows are staged in a temp table (COPY on postgres, executemany on anything else), then in the same transaction
+    an INSERT ... ON CONFLICT (banana_id) DO UPDATE adds new rows and updates the ones whose values are different (the
+    WHERE on the update skips identical rows so they arent rewritten) and rows that arent in the file are deleted
+    a resync of a file that has hardly changed stages everything but writes next to nothing
+    apply_banana_diff does the same with a dataset_diff.DatasetDiff so only the changed rows are even sent
+    """
+
+    @timed("db.sync_bananas", rows=sum)
+    def sync_bananas(self, df, delete_missing=True):
+        # make banana_quality match the rows of the DataFrame, returns (rows inserted or updated, rows deleted)
+        with self.engine.begin() as conn:
+            self._stage_bananas(conn, df)
+            written = self._upsert_staged(conn)
+            deleted = 0
+            if delete_missing:
+                deleted = conn.execute(text(
+                    "DELETE FROM banana_quality WHERE NOT EXISTS "
+                    "(SELECT 1 FROM banana_staging WHERE banana_staging.banana_id = banana_quality.banana_id)"
+                )).rowcount
+            self._finish_sync(conn)
+        logger.info(f"Synced banana_quality: {written} rows inserted or updated, {deleted} deleted")
+        return written, deleted
+
+    @timed("db.apply_banana_diff", rows=sum)
+    def apply_banana_diff(self, diff):
+        # apply the inserted/modified/deleted rows of a DatasetDiff, returns (rows inserted or updated, rows deleted)
+        with self.engine.begin() as conn:
+            self._stage_bananas(conn, diff.upserts())
+            written = self._upsert_staged(conn)
+            deleted = 0
+            keys = [int(key) for key in diff.deleted_keys]
+            if keys:
+                deleted = conn.execute(Banana.__table__.delete().where(Banana.__table__.c.banana_id.in_(keys))).rowcount
+            self._finish_sync(conn)
+        logger.info(f"Applied the diff to banana_quality: {written} rows inserted or updated, {deleted} deleted")
+        return written, deleted
+
+    def _stage_bananas(self, conn, df):
+        # copy the rows into a temp table shaped like banana_quality, dropped when the transaction ends
+        missing = [csv_column for csv_column in BANANA_CSV_COLUMNS.values() if csv_column not in df.columns]
+        if missing:
+            raise ValueError(f"The data is missing the banana_quality columns: {', '.join(missing)}")
+        rows = df[list(BANANA_CSV_COLUMNS.values())]
+        rows.columns = list(BANANA_CSV_COLUMNS)
+        columns = ', '.join(BANANA_CSV_COLUMNS)
+
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("CREATE TEMP TABLE banana_staging (LIKE banana_quality) ON COMMIT DROP"))
+            # COPY straight from an in memory csv, by far the quickest way to get rows into postgres
+            buffer = io.StringIO(rows.to_csv(index=False, header=False))
+            with conn.connection.cursor() as cur:
+                cur.copy_expert(f"COPY banana_staging ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+            # LIKE doesnt copy the primary key, without an index the anti join in sync_bananas is a nested loop, and temp
+            # tables are never analyzed by autovacuum so the planner has to be told how big it is
+            conn.execute(text("CREATE INDEX ON banana_staging (banana_id)"))
+            conn.execute(text("ANALYZE banana_staging"))
+        else:
+            conn.execute(text("DROP TABLE IF EXISTS temp.banana_staging"))
+            conn.execute(text("CREATE TEMP TABLE banana_staging AS SELECT * FROM banana_quality WHERE 1 = 0"))
+            records = rows.astype(object).where(rows.notna(), None).to_dict("records")
+            if records:
+                conn.execute(text(f"INSERT INTO banana_staging ({columns}) "
+                                  f"VALUES ({', '.join(':' + column for column in BANANA_CSV_COLUMNS)})"), records)
+            # CREATE TABLE AS doesnt copy the primary key either, the index is built after the rows are in as that is
+            # quicker than keeping it up to date row by row (16k rows took 9s to resync without it)
+            conn.execute(text("CREATE INDEX temp.banana_staging_id ON banana_staging (banana_id)"))
+
+    def _upsert_staged(self, conn):
+        # insert the staged rows, updating existing ones only where a value differs, returns the rows written
+        values = [column for column in BANANA_CSV_COLUMNS if column != "banana_id"]
+        # postgres spells a null safe comparison IS DISTINCT FROM, sqlite spells it IS NOT
+        distinct = "IS DISTINCT FROM" if conn.dialect.name == "postgresql" else "IS NOT"
+        columns = ', '.join(BANANA_CSV_COLUMNS)
+        return conn.execute(text(
+            f"INSERT INTO banana_quality ({columns}) SELECT {columns} FROM banana_staging WHERE true "
+            f"ON CONFLICT (banana_id) DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in values)} "
+            f"WHERE {' OR '.join(f'banana_quality.{column} {distinct} excluded.{column}' for column in values)}"
+        )).rowcount
+
+    def _finish_sync(self, conn):
+        if conn.dialect.name == "postgresql":
+            # the ids came from the file, move the id sequence past them so create_banana doesnt hand out a used one
+            conn.execute(text("SELECT setval(pg_get_serial_sequence('banana_quality', 'banana_id'), "
+                              "COALESCE(MAX(banana_id), 1)) FROM banana_quality"))
+        else:
+            conn.execute(text("DROP TABLE IF EXISTS temp.banana_staging"))
+
+    @timed("db.get_table_names")
     def get_table_names(self):
         with self.Session(self.engine) as session:
             inspector = inspect(self.engine)
@@ -81,47 +197,55 @@ class DatabaseHandler:
             table_names = inspector.get_table_names()
             return table_names
 
+    @timed("db.get_column_names")
     def get_column_names(self, table_name):
         with self.Session(self.engine) as session:
             inspector = inspect(self.engine)
             column_names = [column['name'] for column in inspector.get_columns(table_name)]
             return column_names
 
+    @timed("db.show_bottom_100", rows=len)
     def show_bottom_100(self, table_name):
         with self.Session(self.engine) as session:
             query = session.query(Banana).order_by(Banana.banana_id.desc()).limit(100)
             result = query.all()
             return result
 
+    @timed("db.show_top_100", rows=len)
     def show_top_100(self, table_name):
         with self.Session(self.engine) as session:
             query = session.query(Banana).order_by(Banana.banana_id).limit(100)
             result = query.all()
             return result
 
+    @timed("db.count_records")
     def count_records(self):
         with self.Session(self.engine) as session:
             count = session.query(Banana).count()
             return count
 
+    @timed("db.calculate_average")
     def calculate_average(self, column_name):
         with self.Session(self.engine) as session:
             column_attr = getattr(Banana, column_name)
             avg = session.query(func.avg(column_attr)).scalar()
             return avg
 
+    @timed("db.find_max_value")
     def find_max_value(self, column_name):
         with self.Session(self.engine) as session:
             column_attr = getattr(Banana, column_name)
             max_row = session.query(Banana).order_by(column_attr.desc()).first()
             return max_row
 
+    @timed("db.find_min_value")
     def find_min_value(self, column_name):
         with self.Session(self.engine) as session:
             column_attr = getattr(Banana, column_name)
             min_row = session.query(Banana).order_by(column_attr.asc()).first()
             return min_row
 
+    @timed("db.setup_replication")
     def setup_replication(self):
         # high availability
         try:
@@ -144,6 +268,7 @@ class DatabaseHandler:
         except Exception as e:
             print(f"Error setting up database replication: {str(e)}")
 
+    @timed("db.perform_backup")
     def perform_backup(self):
         try:
             # Execute pg_dump command to create a dump of the dissertation database
@@ -180,6 +305,7 @@ class DatabaseHandler:
         except Exception as e:
             print(f"Error performing database backup: {str(e)}")
 
+    @timed("db.create_rdm")
     def create_rdm(self, service_name, ip_address, port, service_type, resource_availability):
         with self.Session() as session:
             rdm = RDM(
@@ -193,14 +319,17 @@ class DatabaseHandler:
             session.commit()
             return rdm.id
 
+    @timed("db.get_rdm_by_id")
     def get_rdm_by_id(self, rdm_id):
         with self.Session() as session:
             return session.query(RDM).filter_by(id=rdm_id).first()
 
+    @timed("db.get_all_rdms", rows=len)
     def get_all_rdms(self):
         with self.Session() as session:
             return session.query(RDM).all()
 
+    @timed("db.update_rdm", rows=int)
     def update_rdm(self, rdm_id, **kwargs):
         with self.Session() as session:
             rdm = session.query(RDM).filter_by(id=rdm_id).first()
@@ -212,6 +341,7 @@ class DatabaseHandler:
                 return True
             return False
 
+    @timed("db.delete_rdm", rows=int)
     def delete_rdm(self, rdm_id):
         with self.Session() as session:
             rdm = session.query(RDM).filter_by(id=rdm_id).first()
@@ -219,4 +349,18 @@ class DatabaseHandler:
                 session.delete(rdm)
                 session.commit()
                 return True
-            return False
\ No newline at end of file
+            return False
+
+    @timed("db.bulk_insert_rdms", rows=int)
+    def bulk_insert_rdms(self, df):
+        # insert a DataFrame of rdm rows in one go (COPY on postgres, executemany otherwise), returns the rows inserted
+        columns = ["service_name", "ip_address", "port", "service_type", "resource_availability"]
+        rows = df[columns]
+        with self.engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                buffer = io.StringIO(rows.to_csv(index=False, header=False))
+                with conn.connection.cursor() as cur:
+                    cur.copy_expert(f"COPY rdm ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            elif len(rows):
+                conn.execute(RDM.__table__.insert(), rows.astype(object).to_dict("records"))
+        return len(rows)
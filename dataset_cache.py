@@ -0,0 +1,171 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+logger = logging.getLogger(__name__)
+
+"""
+Columnar cache for loaded datasets
+the first time a file is loaded the DataFrame is written to an uncompressed Arrow (feather v2) file, after that opening
+the same file memory maps the Arrow file instead of decoding and parsing the csv again, which is close to instant
+the cache key is built from the file's full path, size, modification time and a hash of its first and last MB, so if
+the file changes in any way the old entry is ignored (and deleted when the new one is written)
+get() can read just some of the columns, with a memory mapped Arrow file the other columns are never touched
+rows appended to a file (see file_watcher.py) dont mean writing everything again, append() writes just those rows to an
+Arrow file of their own and the entry for the grown file is a small .parts list of the files that make it up, get()
+memory maps them all and puts them together, once as many rows have been appended as there were to begin with the
+pieces are written back into one file so a file that keeps growing isnt read from hundreds of them
+anything that goes wrong with the cache (read only folder, a column Arrow cant store, etc.) is logged and the caller just
+loads the file normally
+"""
+
+DEFAULT_CACHE_DIR = ".dataset_cache"
+# how much of the start and end of the file goes into the hash
+HASH_SAMPLE_BYTES = 1024 * 1024
+
+
+def file_fingerprint(path):
+    # (full path, size, mtime, hash of the head and tail), cheap to work out no matter how big the file is
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        digest.update(f.read(HASH_SAMPLE_BYTES))
+        if stat.st_size > HASH_SAMPLE_BYTES:
+            f.seek(max(stat.st_size - HASH_SAMPLE_BYTES, HASH_SAMPLE_BYTES))
+            digest.update(f.read())
+    return path, stat.st_size, stat.st_mtime_ns, digest.hexdigest()
+
+
+class DatasetCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _prefix(self, path, variant=""):
+        # every cache file for the same source starts with the same prefix so stale ones can be found and removed,
+        # variant separates several datasets that come from one file (e.g. the sheets of a workbook)
+        source = os.path.abspath(path) + ("::" + variant if variant else "")
+        name = os.path.splitext(os.path.basename(path))[0]
+        return f"{name}-{hashlib.blake2b(source.encode(), digest_size=8).hexdigest()}"
+
+    def cache_path(self, path, variant="", fingerprint=None):
+        if fingerprint is None:
+            fingerprint = file_fingerprint(path)
+        key = hashlib.blake2b(repr((fingerprint, variant)).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, f"{self._prefix(path, variant)}-{key}.arrow")
+
+    def contains(self, path, variant=""):
+        try:
+            return self._parts(self.cache_path(path, variant)) is not None
+        except (OSError, ValueError):
+            return False
+
+    def _parts(self, cached):
+        # [(file name, rows)] making up the entry at cached, or None if there isnt one
+        if os.path.exists(cached):
+            return [(os.path.basename(cached), None)]
+        try:
+            with open(os.path.splitext(cached)[0] + ".parts") as f:
+                return [tuple(part) for part in json.load(f)]
+        except FileNotFoundError:
+            return None
+
+    def _read(self, parts, columns=None):
+        tables = [feather.read_table(os.path.join(self.cache_dir, name), columns=columns, memory_map=True)
+                  for name, _ in parts]
+        return tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+
+    def get(self, path, columns=None, variant="", fingerprint=None):
+        # the cached DataFrame for the file (only the given columns if columns is set) or None if it isnt cached,
+        # fingerprint is the version of the file wanted if it isnt the one on disk now
+        try:
+            parts = self._parts(self.cache_path(path, variant, fingerprint))
+            if parts is None:
+                return None
+            return self._read(parts, columns).to_pandas()
+        except (OSError, ValueError, pa.ArrowException, KeyError) as e:
+            logger.warning(f"Could not read the cached copy of {path}: {str(e)}")
+            return None
+
+    def put(self, path, df, variant="", fingerprint=None):
+        # write the DataFrame for the file, returns True if it was cached, fingerprint is the file_fingerprint() of the
+        # version of the file df came from when the file could have changed since it was read
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cached = self.cache_path(path, variant, fingerprint)
+            self._write(pa.Table.from_pandas(df, preserve_index=False), cached)
+        except (OSError, pa.ArrowException) as e:
+            logger.warning(f"Could not cache {path}: {str(e)}")
+            return False
+
+        # anything else cached for this file is now out of date
+        self._remove_stale(path, variant, {cached})
+        return True
+
+    def append(self, path, frames, since, fingerprint, variant=""):
+        # add the rows appended to the file (a list of DataFrames, in order) to its cached copy without writing the
+        # rest of it again, since is the file_fingerprint() the cached copy is for and fingerprint the file's now,
+        # returns True if the grown file is cached, False if there was nothing cached for since or the rows dont fit
+        # the cached columns (a column had to change type), the file is then parsed again the next time it is loaded
+        try:
+            parts = self._parts(self.cache_path(path, variant, since))
+            if parts is None:
+                return False
+            first = feather.read_table(os.path.join(self.cache_dir, parts[0][0]), memory_map=True)
+            if parts[0][1] is None:
+                parts[0] = (parts[0][0], first.num_rows)
+            tables = [pa.Table.from_pandas(df, preserve_index=False) for df in frames]
+            if not all(table.schema.equals(first.schema, check_metadata=False) for table in tables):
+                logger.info(f"The rows appended to {path} dont fit its cached copy, it will be parsed again")
+                return False
+            # each piece can have its own categories so their dictionaries are merged before writing
+            table = pa.concat_tables([table.replace_schema_metadata(first.schema.metadata) for table in tables])
+            table = table.unify_dictionaries()
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cached = self.cache_path(path, variant, fingerprint)
+            entry = os.path.splitext(cached)[0]
+            if sum(rows for _, rows in parts[1:]) + table.num_rows >= parts[0][1]:
+                # the appended rows have caught up with the rest, put it all back in one file, that only happens each
+                # time the file doubles so every row is written about twice however it was appended
+                table = pa.concat_tables([self._read(parts), table]).unify_dictionaries()
+                self._write(table, cached)
+                keep = {cached}
+            else:
+                name = os.path.basename(entry) + ".rows.arrow"
+                self._write(table, os.path.join(self.cache_dir, name))
+                parts.append((name, table.num_rows))
+                with open(entry + ".parts.tmp", "w") as f:
+                    json.dump(parts, f)
+                os.replace(entry + ".parts.tmp", entry + ".parts")
+                keep = {entry + ".parts"} | {os.path.join(self.cache_dir, name) for name, _ in parts}
+        except (OSError, ValueError, pa.ArrowException) as e:
+            logger.warning(f"Could not cache the rows appended to {path}: {str(e)}")
+            return False
+        self._remove_stale(path, variant, keep)
+        return True
+
+    @staticmethod
+    def _write(table, cached):
+        # written to a temp file and renamed so a half written file is never read
+        temp = cached + ".tmp"
+        feather.write_feather(table, temp, compression="uncompressed")
+        os.replace(temp, cached)
+
+    def _remove_stale(self, path, variant, keep):
+        prefix = os.path.join(self.cache_dir, glob.escape(self._prefix(path, variant)))
+        for stale in glob.glob(prefix + "-*.arrow") + glob.glob(prefix + "-*.parts"):
+            if stale not in keep:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+    def invalidate(self, path, variant=""):
+        # drop every cached copy of the file
+        self._remove_stale(path, variant, set())
@@ -0,0 +1,102 @@
+import logging
+import os
+from collections import OrderedDict
+
+import pandas as pd
+
+from data_loader import load_csv
+from dataset_cache import DatasetCache
+
+logger = logging.getLogger(__name__)
+
+"""
+Catalog of every csv opened this session so several can be worked on side by side
+registering a file doesnt load it, it is loaded the first time it is asked for and then kept in memory, the loaded ones
+are kept in least recently used order and once together they go over the memory budget the coldest are dropped
+a dropped dataset isnt lost, load_csv wrote it to the Arrow cache when it was first parsed so asking for it again just
+memory maps that instead of parsing the file
+the dataset being asked for is always kept even if it is bigger than the whole budget on its own
+"""
+
+# how much memory the loaded datasets can take up together before the least recently used are dropped
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+
+
+class DatasetCatalog:
+    def __init__(self, cache=None, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.cache = cache if cache is not None else DatasetCache()
+        self.memory_budget = memory_budget
+        # registered files in the order they were added, full path -> display name
+        self.paths = OrderedDict()
+        # loaded datasets, least recently used first, full path -> DataFrame
+        self.resident = OrderedDict()
+        # memory used by each loaded dataset, worked out once when it is stored
+        self.sizes = {}
+
+    def register(self, path):
+        # add a file to the catalog without loading it, returns the full path it is known by
+        path = os.path.abspath(path)
+        if path not in self.paths:
+            self.paths[path] = os.path.basename(path)
+            # two files with the same name are told apart by their folder
+            names = list(self.paths.values())
+            for other in self.paths:
+                if names.count(os.path.basename(other)) > 1:
+                    self.paths[other] = os.path.join(os.path.basename(os.path.dirname(other)), os.path.basename(other))
+        return path
+
+    def names(self):
+        return list(self.paths.values())
+
+    def is_resident(self, path):
+        return os.path.abspath(path) in self.resident
+
+    def get(self, path):
+        # the dataset for a registered file, loading it if it isnt in memory
+        path = self.register(path)
+        if path in self.resident:
+            self.resident.move_to_end(path)
+            return self.resident[path]
+        df = load_csv(path, self.cache)
+        self.store(path, df)
+        return df
+
+    def store(self, path, df, size=None):
+        # put a (new version of a) dataset in memory as the most recently used one, size is its memory use if that is
+        # already known (measuring it goes over every string in the object columns)
+        path = self.register(path)
+        self.resident[path] = df
+        self.resident.move_to_end(path)
+        self.sizes[path] = size if size is not None else int(df.memory_usage(deep=True).sum())
+        self._evict()
+
+    def grow(self, path, rows):
+        # rows are being added to a dataset in memory (see AppendedRows in schema_inference.py), only they are
+        # measured and added to its size, the grown DataFrame is stored with that size once it is put together
+        path = os.path.abspath(path)
+        if path not in self.sizes:
+            return
+        for column in rows.columns:
+            values = rows[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # the categories were counted with the rest, each new row only adds its code
+                self.sizes[path] += int(values.cat.codes.nbytes)
+            else:
+                self.sizes[path] += int(values.memory_usage(deep=True, index=False))
+        self._evict()
+
+    def invalidate(self, path):
+        # drop a dataset from memory, e.g. when its file has been rewritten
+        path = os.path.abspath(path)
+        self.resident.pop(path, None)
+        self.sizes.pop(path, None)
+
+    def memory_usage(self):
+        return sum(self.sizes.values())
+
+    def _evict(self):
+        while len(self.resident) > 1 and self.memory_usage() > self.memory_budget:
+            path, _ = self.resident.popitem(last=False)
+            size = self.sizes.pop(path)
+            logger.info(f"Dropped {self.paths[path]} from memory ({size / 1024 / 1024:.1f} MB), it will be reloaded "
+                        f"from the dataset cache")
@@ -0,0 +1,190 @@
+import argparse
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from data_loader import detect_encoding
+
+logger = logging.getLogger(__name__)
+
+"""
+Diff two versions of a dataset (old-banana_quality.csv against banana_quality.csv) keyed on banana_id
+rather than loading both files and comparing frames, each file is read in chunks and every row is boiled down to its
+key and a 64 bit hash of the rest of the row, so only 16 bytes a row are held whatever the width of the file
+the (key, hash) pairs are hash partitioned on the key and each partition of the old file is compared with the same
+partition of the new one in a few vectorised numpy calls, keys only in the new file are inserted, keys only in the old
+file are deleted and keys in both with a different hash are modified
+then the new file is read once more in chunks to pull out just the inserted and modified rows (and the old file for the
+deleted ones), so memory stays at the key/hash arrays plus the rows that actually changed
+a file without the key column (old-banana_quality.csv has no banana_id) is keyed on its 1 based row number, which is
+what banana_id was generated from
+the result has the rows an upsert needs (upserts()) and the keys to delete (deleted_keys), see
+DatabaseHandler.sync_bananas
+
+example:
+    python dataset_diff.py old-banana_quality.csv banana_quality.csv --output diff
+"""
+
+KEY_COLUMN = "banana_id"
+CHUNK_ROWS = 200_000
+PARTITIONS = 16
+
+
+class DatasetDiff:
+    def __init__(self, key, columns, inserted, deleted, modified):
+        self.key = key
+        # the columns that were compared, besides the key
+        self.columns = columns
+        # rows only in the new file, rows only in the old file and the new version of rows in both that changed
+        self.inserted = inserted
+        self.deleted = deleted
+        self.modified = modified
+
+    @property
+    def deleted_keys(self):
+        return self.deleted[self.key].to_numpy()
+
+    def upserts(self):
+        # every row the new file adds or changes, ready to be written with an insert ... on conflict update
+        return pd.concat([self.inserted, self.modified], ignore_index=True)
+
+    def is_empty(self):
+        return self.inserted.empty and self.deleted.empty and self.modified.empty
+
+    def summary(self):
+        return f"{len(self.inserted)} inserted, {len(self.deleted)} deleted, {len(self.modified)} modified"
+
+
+def _read_chunks(path, chunk_rows):
+    return pd.read_csv(path, encoding=detect_encoding(path), chunksize=chunk_rows)
+
+
+def _chunk_keys(chunk, key, start):
+    # the key of every row in a chunk, the row number if the file has no key column
+    if key in chunk.columns:
+        return chunk[key].to_numpy(dtype=np.int64)
+    return np.arange(start + 1, start + len(chunk) + 1, dtype=np.int64)
+
+
+def _normalise(chunk, columns):
+    # the same value has to hash the same whatever dtype read_csv guessed for its chunk, so each column becomes a float64
+    # part (1 and 1.0 are the same) and a text part for whatever isnt a number
+    normalised = {}
+    for column in columns:
+        values = chunk[column] if column in chunk.columns else pd.Series(None, index=chunk.index, dtype=object)
+        if pd.api.types.is_numeric_dtype(values):
+            normalised[column] = values.astype(np.float64)
+            normalised[column + " (text)"] = pd.Series(None, index=chunk.index, dtype=object)
+        else:
+            numbers = pd.to_numeric(values, errors="coerce")
+            normalised[column] = numbers.astype(np.float64)
+            normalised[column + " (text)"] = values.astype(str).where(numbers.isna() & values.notna(), None)
+    return pd.DataFrame(normalised, index=chunk.index)
+
+
+def _header(path):
+    return list(pd.read_csv(path, encoding=detect_encoding(path), nrows=0).columns)
+
+
+def hash_file(path, key, columns, chunk_rows=CHUNK_ROWS):
+    # (keys, row hashes) for a whole file, read chunk by chunk
+    keys, hashes = [], []
+    start = 0
+    for chunk in _read_chunks(path, chunk_rows):
+        keys.append(_chunk_keys(chunk, key, start))
+        hashes.append(pd.util.hash_pandas_object(_normalise(chunk, columns), index=False).to_numpy())
+        start += len(chunk)
+    keys = np.concatenate(keys) if keys else np.empty(0, dtype=np.int64)
+    hashes = np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64)
+    if len(np.unique(keys)) != len(keys):
+        raise ValueError(f"{path} has duplicate values in {key}, it cant be used as the key")
+    return keys, hashes
+
+
+def _partitions(keys, partitions):
+    # the indices of the keys in each hash partition
+    partition = pd.util.hash_array(keys) % np.uint64(partitions)
+    order = np.argsort(partition, kind="stable")
+    bounds = np.searchsorted(partition[order], np.arange(partitions + 1, dtype=np.uint64))
+    return [order[bounds[i]:bounds[i + 1]] for i in range(partitions)]
+
+
+def compare_hashes(old_keys, old_hashes, new_keys, new_hashes, partitions=PARTITIONS):
+    # (inserted keys, deleted keys, modified keys) from the key/hash arrays of two files
+    inserted, deleted, modified = [], [], []
+    for old_index, new_index in zip(_partitions(old_keys, partitions), _partitions(new_keys, partitions)):
+        old_part, new_part = old_keys[old_index], new_keys[new_index]
+        _, in_old, in_new = np.intersect1d(old_part, new_part, assume_unique=True, return_indices=True)
+        changed = old_hashes[old_index][in_old] != new_hashes[new_index][in_new]
+        modified.append(old_part[in_old][changed])
+        inserted.append(np.setdiff1d(new_part, old_part, assume_unique=True))
+        deleted.append(np.setdiff1d(old_part, new_part, assume_unique=True))
+    return tuple(np.sort(np.concatenate(keys)) for keys in (inserted, deleted, modified))
+
+
+def _select_rows(path, key, wanted, chunk_rows):
+    # the rows of a file whose key is in wanted, with the key column filled in for a file that doesnt have one
+    rows = []
+    start = 0
+    for chunk in _read_chunks(path, chunk_rows):
+        keys = _chunk_keys(chunk, key, start)
+        start += len(chunk)
+        mask = np.isin(keys, wanted)
+        if mask.any():
+            selected = chunk[mask]
+            if key not in selected.columns:
+                selected = selected.assign(**{key: keys[mask]})
+            rows.append(selected)
+    return pd.concat(rows, ignore_index=True) if rows else pd.DataFrame()
+
+
+def diff_files(old_path, new_path, key=KEY_COLUMN, chunk_rows=CHUNK_ROWS, partitions=PARTITIONS):
+    old_header, new_header = _header(old_path), _header(new_path)
+    columns = [column for column in new_header if column != key and column in old_header]
+    added = [column for column in new_header if column != key and column not in old_header]
+    removed = [column for column in old_header if column != key and column not in new_header]
+    if added or removed:
+        logger.warning(f"Columns differ between the files, added: {added}, removed: {removed}, only the shared "
+                       f"columns are compared")
+
+    old_keys, old_hashes = hash_file(old_path, key, columns, chunk_rows)
+    new_keys, new_hashes = hash_file(new_path, key, columns, chunk_rows)
+    inserted, deleted, modified = compare_hashes(old_keys, old_hashes, new_keys, new_hashes, partitions)
+
+    upsert_keys = np.union1d(inserted, modified)
+    changed = _select_rows(new_path, key, upsert_keys, chunk_rows) if len(upsert_keys) else None
+    deleted_rows = _select_rows(old_path, key, deleted, chunk_rows) if len(deleted) else None
+
+    def frame(rows, keys, header):
+        if rows is None:
+            return pd.DataFrame(columns=[column for column in header if column != key] + [key])
+        return rows[rows[key].isin(keys)].reset_index(drop=True)
+
+    return DatasetDiff(key, columns, frame(changed, inserted, new_header), frame(deleted_rows, deleted, old_header),
+                       frame(changed, modified, new_header))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the rows inserted, deleted and modified between two csv files.")
+    parser.add_argument("old", help="the old version of the file")
+    parser.add_argument("new", help="the new version of the file")
+    parser.add_argument("--key", default=KEY_COLUMN, help="column that identifies a row (default: banana_id)")
+    parser.add_argument("--output", default=None, help="directory to write inserted/deleted/modified csv files to")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    diff = diff_files(args.old, args.new, key=args.key)
+    print(diff.summary())
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        for name in ("inserted", "deleted", "modified"):
+            getattr(diff, name).to_csv(os.path.join(args.output, f"{name}.csv"), index=False)
+        print(f"Written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
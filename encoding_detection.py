@@ -0,0 +1,101 @@
+import codecs
+import logging
+
+from dataset_cache import file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+"""
+Working out a file's encoding without reading all of it
+chardet over the whole file is pure python and often took longer than parsing the csv, so instead:
+- a byte order mark settles it straight away
+- otherwise a sample from the start, middle and end of the file is checked for valid UTF-8, which is a quick C level
+  decode and is what nearly all of our files are (plain ascii is valid UTF-8 too)
+- only if that fails does chardet run, on the same samples rather than the file
+the samples are a fixed size so this takes the same time whatever the size of the file, the answer is remembered per
+file fingerprint so the same version of a file is never checked twice
+a file could still have a bad byte somewhere the samples didnt look, load_csv catches the decode error and calls
+detect(full=True) which does the old whole file chardet and replaces the remembered answer
+"""
+
+SAMPLE_BYTES = 64 * 1024
+# utf-32 first as the utf-32-le mark starts with the utf-16-le one
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+def _is_utf8(sample, starts_mid_file):
+    # a sample cut out of the middle of the file can start or end part way through a character, those bytes are skipped
+    if starts_mid_file:
+        skip = 0
+        while skip < min(3, len(sample)) and 0x80 <= sample[skip] <= 0xBF:
+            skip += 1
+        sample = sample[skip:]
+    try:
+        # final=False lets the last character be incomplete
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def read_samples(path, sample_bytes=SAMPLE_BYTES):
+    # [(bytes, starts mid file)] for the start, middle and end of the file, just the whole file if it is small
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        size = f.tell()
+        f.seek(0)
+        if size <= 3 * sample_bytes:
+            return [(f.read(), False)]
+        samples = [(f.read(sample_bytes), False)]
+        for offset in ((size - sample_bytes) // 2, size - sample_bytes):
+            f.seek(offset)
+            samples.append((f.read(sample_bytes), True))
+        return samples
+
+
+class EncodingDetector:
+    def __init__(self, sample_bytes=SAMPLE_BYTES):
+        self.sample_bytes = sample_bytes
+        # file fingerprint -> encoding
+        self.known = {}
+
+    def detect(self, path, full=False):
+        # the encoding to read the file with, full=True reads the whole file with chardet like load_csv used to
+        fingerprint = file_fingerprint(path)
+        if not full and fingerprint in self.known:
+            return self.known[fingerprint]
+
+        if full:
+            # chardet is only imported when it is actually needed, most files never get this far
+            import chardet
+            with open(path, 'rb') as f:
+                encoding = chardet.detect(f.read())['encoding']
+        else:
+            encoding = self._detect_sampled(path)
+        # chardet gives up (None) on some binary looking files, latin-1 can at least decode any byte
+        encoding = encoding or "latin-1"
+        self.known[fingerprint] = encoding
+        logger.info(f"{path} is {encoding}{' (whole file checked)' if full else ''}")
+        return encoding
+
+    def _detect_sampled(self, path):
+        samples = read_samples(path, self.sample_bytes)
+        head = samples[0][0]
+        for bom, encoding in BOMS:
+            if head.startswith(bom):
+                return encoding
+        if all(_is_utf8(sample, mid_file) for sample, mid_file in samples):
+            # utf-8 rather than ascii even if the samples are all ascii, the rest of the file might not be
+            return "utf-8"
+        import chardet
+        return chardet.detect(b"".join(sample for sample, _ in samples))['encoding']
+
+
+# shared by everything that loads files so a file is only checked once per session
+encoding_detector = EncodingDetector()
@@ -0,0 +1,78 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import openpyxl
+import pandas as pd
+
+from schema_inference import compact_dtypes, log_report
+
+logger = logging.getLogger(__name__)
+
+"""
+Excel ingestion, pd.read_excel (and pd.ExcelFile.parse per sheet click like the old select_sheet did) parses the whole
+workbook every time which takes ages on a couple of MB of xlsx
+here the workbook is opened once in openpyxl's read only (streaming) mode, which only reads the sheet list up front,
+each sheet is then read lazily the first time it is asked for on a background thread and written to the Arrow dataset
+cache, so going back to a sheet (or reopening the workbook later) never parses it again
+openpyxl isnt thread safe so every read goes through the same single worker thread, the tk side just waits on the future
+old .xls files cant be read by openpyxl, those go through pd.ExcelFile which is also only opened once
+"""
+
+
+class ExcelWorkbook:
+    def __init__(self, path, cache=None):
+        self.path = path
+        self.cache = cache
+        if path.lower().endswith(".xls"):
+            self.workbook = pd.ExcelFile(path)
+            self.sheet_names = list(self.workbook.sheet_names)
+        else:
+            self.workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+            self.sheet_names = list(self.workbook.sheetnames)
+        # sheets that have been loaded, sheet name -> DataFrame
+        self.sheets = {}
+        # sheet name -> the future of a load that has been started
+        self.futures = {}
+        # one thread owns the workbook
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="excel-loader")
+
+    def load_sheet(self, name):
+        # start loading a sheet in the background (if it isnt already), returns a future for the DataFrame
+        if name not in self.futures:
+            self.futures[name] = self.executor.submit(self.read_sheet, name)
+        return self.futures[name]
+
+    def read_sheet(self, name):
+        # read a sheet straight away, from memory or the Arrow cache if it has been read before
+        if name in self.sheets:
+            return self.sheets[name]
+        variant = f"sheet:{name}"
+        df = self.cache.get(self.path, variant=variant) if self.cache is not None else None
+        if df is None:
+            df, report = compact_dtypes(self._parse_sheet(name))
+            log_report(report, f"{self.path} [{name}]")
+            if self.cache is not None:
+                self.cache.put(self.path, df, variant=variant)
+        self.sheets[name] = df
+        return df
+
+    def _parse_sheet(self, name):
+        if isinstance(self.workbook, pd.ExcelFile):
+            return self.workbook.parse(name)
+
+        rows = self.workbook[name].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        # the first row is the header like read_excel, blank header cells get the same names pandas gives them
+        columns = [str(value) if value is not None else f"Unnamed: {i}" for i, value in enumerate(header)]
+        df = pd.DataFrame.from_records(list(rows), columns=columns)
+        # read only mode can report rows past the real data as empty, those are dropped
+        return df.dropna(how="all").reset_index(drop=True).infer_objects()
+
+    def close(self):
+        # drop any loads that havent started and close the workbook on its own thread once the current one finishes
+        for future in self.futures.values():
+            future.cancel()
+        self.executor.submit(self.workbook.close)
+        self.executor.shutdown(wait=False)
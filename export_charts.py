@@ -0,0 +1,146 @@
+import argparse
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+
+# force the Agg backend before anything else touches matplotlib so this runs on a server without a display
+matplotlib.use("Agg")
+
+import calibration
+import charts
+from data_loader import load_csv
+from dataset_cache import DatasetCache
+
+logger = logging.getLogger(__name__)
+
+"""
+Headless chart export, this is the batch version of clicking through GraphSelectionWindow
+it takes a file, the columns and the chart types and writes every chart straight to PNG/SVG without opening a single
+tk window, so the nightly reports can be generated on a server
+the work is split into one job per chart and the jobs are spread over a process pool, each worker reads the file once
+(only the columns asked for, straight out of the Arrow cache) when it starts up and then just renders whatever jobs it
+is handed, the file is parsed and cached once up front so the workers never parse it themselves
+
+example:
+    python export_charts.py banana_quality.csv --columns Size Weight Sweetness --charts histogram "box plot" heatmap
+"""
+
+CHART_TYPES = ["histogram", "line plot", "scatter plot", "box plot", "pair plot", "heatmap"]
+
+# labelling every point is fine in the gui for a small file but makes a report unreadable (and slow) on a big one
+MAX_POINT_LABELS = 100
+
+# the dataset each worker process loaded in its initializer
+_worker_data = None
+
+
+def _load_worker_data(file_path, columns):
+    global _worker_data
+    _worker_data = load_csv(file_path, DatasetCache(), columns=columns)
+
+
+def build_jobs(columns, chart_types):
+    # turn the columns/chart types into (chart type, columns) jobs, one per output chart
+    # per-column charts get one job per column, line/scatter plot the first column against each of the others and the
+    # pair plot/heatmap are a single chart over every column
+    jobs = []
+    for chart_type in chart_types:
+        if chart_type in ("histogram", "box plot"):
+            jobs.extend((chart_type, [column]) for column in columns)
+        elif chart_type in ("line plot", "scatter plot"):
+            jobs.extend((chart_type, [columns[0], column]) for column in columns[1:])
+        else:
+            jobs.append((chart_type, list(columns)))
+    return jobs
+
+
+def build_figure(data, chart_type, columns):
+    if chart_type == "histogram":
+        return charts.histogram_figure(data, columns[0])
+    if chart_type == "line plot":
+        return charts.line_plot_figure(data, columns[0], columns[1], max_labels=MAX_POINT_LABELS)
+    if chart_type == "scatter plot":
+        return charts.scatter_plot_figure(data, columns[0], columns[1], max_labels=MAX_POINT_LABELS)
+    if chart_type == "box plot":
+        return charts.box_plot_figure(data, columns[0])
+    if chart_type == "pair plot":
+        return charts.pairplot_figure(data[columns])
+    if chart_type == "heatmap":
+        return charts.correlation_heatmap_figure(data[columns])
+    raise ValueError(f"Unknown chart type: {chart_type}")
+
+
+def output_name(dataset_name, chart_type, columns):
+    # e.g. banana_quality_scatter_plot_Size_vs_Weight, anything that isnt safe in a file name becomes an underscore
+    name = f"{dataset_name}_{chart_type}_{'_vs_'.join(columns)}"
+    return re.sub(r'[^a-zA-Z0-9_.-]', '_', name)
+
+
+def render_job(chart_type, columns, output_dir, dataset_name, formats):
+    # runs inside a worker process, renders one chart and saves it once per format
+    fig = build_figure(_worker_data, chart_type, columns)
+    base_name = output_name(dataset_name, chart_type, columns)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(output_dir, f"{base_name}.{fmt}")
+        fig.savefig(path, format=fmt, bbox_inches="tight")
+        paths.append(path)
+    return paths
+
+
+def export_charts(file_path, columns, chart_types, output_dir, formats=("png",), workers=None):
+    # export every requested chart, returns the list of files written, a chart that fails is logged and skipped so
+    # one bad column doesnt lose the rest of the report
+    os.makedirs(output_dir, exist_ok=True)
+    dataset_name = os.path.splitext(os.path.basename(file_path))[0]
+    jobs = build_jobs(columns, chart_types)
+
+    # parse (and cache) the file here so the workers only ever memory map the cached copy
+    cache = DatasetCache()
+    if not cache.contains(file_path):
+        load_csv(file_path, cache)
+
+    written = []
+    # default to the worker count calibrated for this machine, or one per core before it has been calibrated
+    workers = workers or calibration.setting("workers")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_load_worker_data,
+                             initargs=(file_path, list(columns))) as pool:
+        futures = {pool.submit(render_job, chart_type, job_columns, output_dir, dataset_name, tuple(formats)):
+                   (chart_type, job_columns) for chart_type, job_columns in jobs}
+        for future in as_completed(futures):
+            chart_type, job_columns = futures[future]
+            try:
+                written.extend(future.result())
+            except Exception as e:
+                logger.error(f"An error occurred while exporting the {chart_type} of {', '.join(job_columns)}: {str(e)}")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export charts from a CSV file without opening the GUI.")
+    parser.add_argument("file", help="CSV file to read")
+    parser.add_argument("--columns", nargs="+", required=True, help="columns to chart")
+    parser.add_argument("--charts", nargs="+", default=["histogram"], choices=CHART_TYPES, help="chart types")
+    parser.add_argument("--format", nargs="+", default=["png"], choices=["png", "svg"], dest="formats",
+                        help="output formats")
+    parser.add_argument("--output", default="charts", help="directory the charts are written to")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: the calibrated count, or one per core)")
+    args = parser.parse_args(argv)
+
+    if len(args.columns) < 2 and any(chart in ("line plot", "scatter plot") for chart in args.charts):
+        parser.error("line and scatter plots need at least 2 columns")
+
+    logging.basicConfig(level=logging.INFO)
+    written = export_charts(args.file, args.columns, args.charts, args.output, args.formats, args.workers)
+    for path in written:
+        print(path)
+    print(f"Exported {len(written)} files to {args.output}")
+    return 0 if written else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.figure import Figure
+
+"""
+Figure/canvas pool for the graph windows
+before this every chart built a brand new Figure and FigureCanvasTkAgg and nothing was ever closed, so memory went up
+every single time a chart was opened, after a few hundred charts that adds up
+how it works:
+- every graph window gets a list of "slots" (a figure, the canvas it is drawn on and the pan/zoom toolbar under it),
+  when the same window is drawn into again the slots are handed back in order so the canvases and axes are reused
+  instead of rebuilt
+- when a graph window is closed its figures are cleared (single-axes figures keep their axes) and put on the idle list
+  so the next window can reuse them, only max_idle figures are kept, anything past that is just dropped
+usage is begin(window), acquire(window, ...) once per chart, end(window)
+"""
+
+
+class FigurePool:
+    def __init__(self, max_idle=8):
+        self.max_idle = max_idle
+        # figures that arent on screen, cleared and ready to be reused
+        self.idle = []
+        # graph window -> list of [figure, canvas, toolbar] slots
+        self.slots = {}
+        # graph window -> how many slots have been handed out since begin()
+        self.cursor = {}
+
+    def begin(self, graph_window):
+        # start (re)drawing a window, the window's existing slots will be handed out again in order
+        if graph_window not in self.slots:
+            self.slots[graph_window] = []
+            # <Destroy> also fires for every child widget so the handler checks it is the window itself
+            graph_window.bind("<Destroy>", lambda event, window=graph_window: self._on_destroy(event, window),
+                              add="+")
+        self.cursor[graph_window] = 0
+
+    def acquire(self, graph_window, figsize, dpi):
+        # get a figure and canvas for the next chart in the window, returns (figure, canvas, reused) where reused means
+        # the figure is the same one this slot showed last time (so the caller can try to update it in place)
+        if graph_window not in self.slots:
+            self.begin(graph_window)
+        index = self.cursor[graph_window]
+        self.cursor[graph_window] = index + 1
+        window_slots = self.slots[graph_window]
+
+        if index < len(window_slots):
+            fig, canvas, _ = window_slots[index]
+            if tuple(fig.get_size_inches()) != tuple(figsize) or fig.dpi != dpi:
+                fig.set_size_inches(figsize)
+                fig.set_dpi(dpi)
+                # the tk widget keeps the size it was made with so it has to be told about the new one
+                canvas.get_tk_widget().configure(width=int(fig.bbox.width), height=int(fig.bbox.height))
+            return fig, canvas, True
+
+        fig = self._take_idle(figsize, dpi)
+        canvas = FigureCanvasTkAgg(fig, master=graph_window)
+        canvas.get_tk_widget().pack()
+        # the toolbar gives every chart pan/zoom, the progressive plots re-query their data when it is used
+        toolbar = NavigationToolbar2Tk(canvas, graph_window, pack_toolbar=False)
+        toolbar.update()
+        toolbar.pack()
+        window_slots.append([fig, canvas, toolbar])
+        return fig, canvas, False
+
+    def end(self, graph_window):
+        # anything the window showed last time but not this time goes back to the pool
+        index = self.cursor.pop(graph_window, 0)
+        window_slots = self.slots.get(graph_window, [])
+        for fig, canvas, toolbar in window_slots[index:]:
+            self._recycle(fig, canvas, toolbar)
+        del window_slots[index:]
+
+    def release(self, graph_window):
+        # give back every figure in the window, called automatically when the window is destroyed
+        self.cursor.pop(graph_window, None)
+        for fig, canvas, toolbar in self.slots.pop(graph_window, []):
+            self._recycle(fig, canvas, toolbar)
+
+    def _on_destroy(self, event, graph_window):
+        if event.widget is graph_window:
+            self.release(graph_window)
+
+    def _take_idle(self, figsize, dpi):
+        if self.idle:
+            fig = self.idle.pop()
+            fig.set_size_inches(figsize)
+            fig.set_dpi(dpi)
+            return fig
+        return Figure(figsize=figsize, dpi=dpi)
+
+    def _recycle(self, fig, canvas, toolbar):
+        # a progressive plot keeps listening for zooms until it is disconnected
+        renderer = getattr(fig, '_renderer', None)
+        if renderer is not None:
+            renderer.disconnect()
+            fig._renderer = None
+        for widget in (toolbar, canvas.get_tk_widget()):
+            try:
+                widget.destroy()
+            except Exception:
+                # the widget has already gone with its window
+                pass
+        # keep the axes on single-axes figures as that is most charts, anything else (pair plot, heatmap colorbar)
+        # is wiped so the next chart starts clean
+        if len(fig.axes) == 1:
+            fig.axes[0].clear()
+        else:
+            fig.clear()
+        fig._chart_kind = None
+        if len(self.idle) < self.max_idle:
+            self.idle.append(fig)
+
+    def __len__(self):
+        # figures currently owned by the pool, on screen or idle
+        return len(self.idle) + sum(len(window_slots) for window_slots in self.slots.values())
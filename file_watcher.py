@@ -0,0 +1,91 @@
+import hashlib
+import io
+import logging
+import os
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+"""
+Watches the open csv for rows being appended so they show up without reopening the file
+our exports only ever grow at the end, so rather than reparsing everything the watcher remembers how far into the file
+it has read (always a line boundary) plus a checksum of the first and last few KB before that point
+check() is just a stat while nothing changes, if the file got bigger and both checksums still match then rows were
+appended and read_appended() parses only the bytes after the old end, anything else (shrunk, the head or tail bytes
+changed) means the file was rewritten and the caller should reload it
+a half written last line is left where it is until the writer finishes it
+"""
+
+UNCHANGED = "unchanged"
+APPENDED = "appended"
+REPLACED = "replaced"
+
+# how much of the start and of the end of the read part goes into the checksums
+CHECK_BYTES = 4096
+# how often the gui checks the file
+POLL_MS = 1000
+
+
+class AppendWatcher:
+    def __init__(self, path, columns, encoding="utf-8", offset=None):
+        # offset is how much of the file the data already loaded was read from (see data_loader.load_csv), anything
+        # appended while it was being parsed is then picked up on the first check, by default it is the file's size
+        self.path = path
+        self.columns = list(columns)
+        self.encoding = encoding
+        stat = os.stat(path)
+        # everything before offset has been read
+        self.offset = stat.st_size if offset is None else offset
+        self.mtime = stat.st_mtime_ns
+        with open(path, 'rb') as f:
+            self.checksums = self._checksums(f, self.offset)
+
+    @staticmethod
+    def _checksums(f, offset):
+        # hash of the first and last CHECK_BYTES before offset
+        f.seek(0)
+        head = hashlib.blake2b(f.read(min(CHECK_BYTES, offset)), digest_size=16).digest()
+        f.seek(max(offset - CHECK_BYTES, 0))
+        tail = hashlib.blake2b(f.read(offset - f.tell()), digest_size=16).digest()
+        return head, tail
+
+    def check(self):
+        # what happened to the file since it was last read: UNCHANGED, APPENDED or REPLACED
+        try:
+            stat = os.stat(self.path)
+            if stat.st_size == self.offset and stat.st_mtime_ns == self.mtime:
+                return UNCHANGED
+            if stat.st_size < self.offset:
+                return REPLACED
+            with open(self.path, 'rb') as f:
+                if self._checksums(f, self.offset) != self.checksums:
+                    return REPLACED
+        except OSError as e:
+            # the file can be missing for a moment while something saves over it
+            logger.warning(f"Could not check {self.path}: {str(e)}")
+            return UNCHANGED
+        if stat.st_size == self.offset:
+            # touched but the same size and ends
+            self.mtime = stat.st_mtime_ns
+            return UNCHANGED
+        return APPENDED
+
+    def read_appended(self):
+        # parse the complete lines added after offset and move offset past them, returns an empty DataFrame if the
+        # only new data is a line that is still being written
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read()
+            end = chunk.rfind(b"\n") + 1
+            if end == 0:
+                return pd.DataFrame(columns=self.columns)
+            self.offset += end
+            self.mtime = os.fstat(f.fileno()).st_mtime_ns
+            self.checksums = self._checksums(f, self.offset)
+        if not chunk[:end].strip():
+            # just blank lines, read_csv would fail on them
+            return pd.DataFrame(columns=self.columns)
+        # the header is only at the top of the file so the names come from the data already loaded
+        return pd.read_csv(io.BytesIO(chunk[:end]), header=None, names=self.columns, encoding=self.encoding,
+                           encoding_errors="replace")
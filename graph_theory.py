@@ -0,0 +1,178 @@
+import logging
+from functools import partial
+from tkinter import messagebox
+
+import pandas as pd
+
+import charts
+from figure_pool import FigurePool
+from profiling import profiled
+from progressive_plot import ProgressiveRenderer, PROGRESSIVE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+"""
+This class is where i use seaborn and matplotlib to make different graphs based of different inputs
+i could add alot more however too many graphs may be counter intuitive 
+I also set it to a min of 2 so that the user can compare different graphs based of different inputs as opposed to just 
+visualsing one graph and having less data (as the aim of this app is to show relationships between different columns in 
+a database/file
+once again i tried to make the error messages professional and added a logger so that once again, if there is a tech
+they can see what is going wrong or if not a tech then a user
+"""
+
+
+class GraphTheory:
+    def __init__(self):
+        self.data = None
+        # the columns the pair plot/heatmap use, None means all of them, this saves copying self.data[columns] for
+        # every chart as the other charts only ever read the columns they are given
+        self.columns = None
+        # figures and canvases are reused between charts and windows rather than rebuilt every time
+        self.figure_pool = FigurePool()
+        # when set the static charts (histogram, box plot, pair plot, heatmap) are built on worker threads and shown as
+        # images, otherwise they are drawn straight onto a canvas
+        self.render_pipeline = None
+
+    def selected_data(self):
+        return self.data if self.columns is None else self.data[self.columns]
+
+    def build_selected(self, build_figure):
+        # takes a snapshot of data/columns now so a new selection made while the chart renders doesnt affect it
+        data, columns = self.data, self.columns
+        return lambda: build_figure(data if columns is None else data[columns])
+
+    def is_progressive(self, x_column, y_column):
+        # big numeric x/y plots are drawn progressively (downsampled to the visible range) instead of every point
+        return (len(self.data) > PROGRESSIVE_THRESHOLD and pd.api.types.is_numeric_dtype(self.data[x_column])
+                and pd.api.types.is_numeric_dtype(self.data[y_column]))
+
+    def progressive_plot(self, kind, x_column, y_column, graph_window, figsize, dpi):
+        fig, canvas, _ = self.figure_pool.acquire(graph_window, figsize, dpi)
+        old_renderer = getattr(fig, '_renderer', None)
+        if old_renderer is not None:
+            old_renderer.disconnect()
+        fig, ax = charts.progressive_figure(x_column, y_column, kind, fig=fig)
+        # matplotlib only keeps weak references to callbacks so the figure holds on to its renderer
+        fig._renderer = ProgressiveRenderer(ax, canvas, self.data[x_column].to_numpy(),
+                                            self.data[y_column].to_numpy(), kind)
+        fig._renderer.render()
+        canvas.draw()
+
+    @profiled()
+    def visualize_histogram(self, column, graph_window):
+        # Visualize histogram for a given column
+        try:
+            if self.data is not None:
+                if self.render_pipeline is not None:
+                    self.render_pipeline.submit(graph_window, partial(charts.histogram_figure, self.data, column),
+                                                f"histogram of {column}")
+                    return
+                fig, canvas, _ = self.figure_pool.acquire(graph_window, (6, 4), 100)
+                charts.histogram_figure(self.data, column, fig=fig)
+                canvas.draw()
+            else:
+                print("DataFrame is empty. Please load data first.")
+                logger.warning("DataFrame is empty. Please load data first.")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while creating the histogram: {str(e)}")
+            logger.error(f"An error occurred while creating the histogram: {str(e)}")
+
+    @profiled()
+    def visualize_line_plot(self, x_column, y_column, graph_window):
+        # Visualize line plot for given x and y columns
+        try:
+            if self.data is not None:
+                if self.is_progressive(x_column, y_column):
+                    self.progressive_plot("line", x_column, y_column, graph_window, (6, 4), 100)
+                    return
+                fig, canvas, reused = self.figure_pool.acquire(graph_window, (6, 4), 100)
+                # if this window already shows a line plot just move the line to the new columns
+                if not (reused and charts.update_xy_figure(fig, self.data, x_column, y_column)):
+                    charts.line_plot_figure(self.data, x_column, y_column, fig=fig)
+                canvas.draw()
+            else:
+                print("DataFrame is empty. Please load data first.")
+                logger.warning("DataFrame is empty. Please load data first.")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while creating the line plot: {str(e)}")
+            logger.error(f"An error occurred while creating the line plot: {str(e)}")
+
+    @profiled()
+    def visualize_scatter_plot(self, x_column, y_column, graph_window, hue_column=None):
+        # Visualize scatter plot for given x and y columns
+        try:
+            if self.data is not None:
+                if hue_column is None and self.is_progressive(x_column, y_column):
+                    self.progressive_plot("scatter", x_column, y_column, graph_window, (10, 8), 150)
+                    return
+                fig, canvas, reused = self.figure_pool.acquire(graph_window, (10, 8), 150)
+                if not (reused and hue_column is None and charts.update_xy_figure(fig, self.data, x_column,
+                                                                                    y_column)):
+                    charts.scatter_plot_figure(self.data, x_column, y_column, hue_column, fig=fig)
+                canvas.draw()
+            else:
+                print("DataFrame is empty. Please load data first.")
+                logger.warning("DataFrame is empty. Please load data first.")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while creating the scatter plot: {str(e)}")
+            logger.error(f"An error occurred while creating the scatter plot: {str(e)}")
+
+    @profiled()
+    def visualize_box_plot(self, column, graph_window):
+        # Visualize box plot for a given column
+        try:
+            if self.data is not None:
+                if self.render_pipeline is not None:
+                    self.render_pipeline.submit(graph_window, partial(charts.box_plot_figure, self.data, column),
+                                                f"box plot of {column}")
+                    return
+                fig, canvas, _ = self.figure_pool.acquire(graph_window, (8, 6), 100)
+                charts.box_plot_figure(self.data, column, fig=fig)
+                canvas.draw()
+            else:
+                print("DataFrame is empty. Please load data first.")
+                logger.warning("DataFrame is empty. Please load data first.")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while creating the box plot: {str(e)}")
+            logger.error(f"An error occurred while creating the box plot: {str(e)}")
+
+    @profiled()
+    def visualize_pairplot(self, graph_window):
+        # Visualize pair plot
+        try:
+            if self.data is not None:
+                if self.render_pipeline is not None:
+                    # the column selection is done on the worker too, it copies the data
+                    self.render_pipeline.submit(graph_window, self.build_selected(charts.pairplot_figure), "pair plot")
+                    return
+                data = self.selected_data()
+                n = len(data.select_dtypes(include='number').columns)
+                fig, canvas, _ = self.figure_pool.acquire(graph_window, (3 * 1.5 * n, 3 * n), 100)
+                charts.pairplot_figure(data, fig=fig)
+                canvas.draw()
+            else:
+                print("DataFrame is empty. Please load data first.")
+                logger.warning("DataFrame is empty. Please load data first.")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while creating the pair plot: {str(e)}")
+            logger.error(f"An error occurred while creating the pair plot: {str(e)}")
+
+    @profiled()
+    def visualize_correlation_heatmap(self, graph_window):
+        # Visualize correlation heatmap
+        try:
+            if self.data is not None:
+                if self.render_pipeline is not None:
+                    self.render_pipeline.submit(graph_window, self.build_selected(charts.correlation_heatmap_figure),
+                                                "correlation heatmap")
+                    return
+                fig, canvas, _ = self.figure_pool.acquire(graph_window, (8, 6), 100)
+                charts.correlation_heatmap_figure(self.selected_data(), fig=fig)
+                canvas.draw()
+            else:
+                print("DataFrame is empty. Please load data first.")
+                logger.warning("DataFrame is empty. Please load data first.")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while creating the correlation heatmap: {str(e)}")
+            logger.error(f"An error occurred while creating the correlation heatmap: {str(e)}")
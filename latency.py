@@ -0,0 +1,302 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+"""
+Latency of every operation, until now the only way to see how long a database call took was reading the SQLAlchemy echo
+every operation (a DatabaseHandler call, a CRUD button, an upload, a file load, a chart) records how long it took into
+its own histogram, plus the rows it touched and bytes it read:
+- @timed("db.read_banana") on a function, or with measure("load.csv") as span: ... span.rows = len(df) inside one
+- instrument_engine(engine) adds SQLAlchemy event listeners that time every statement as sql.select/sql.insert/...
+the histograms are HDR style, values are kept in microseconds in buckets that are exact up to 128us and after that each
+power of two is split into 64 buckets, so any percentile is within about 1.5% of the real value whatever the range and
+recording is just an index calculation and an increment, no samples are kept
+snapshot() gives count/mean/p50/p95/p99/max per operation, write_json()/write_prometheus() write it out (the Prometheus
+file is the textfile collector format and is replaced atomically)
+SLOS are the latency targets, e.g. 99% of CRUD clicks under 250ms, slo_report() says how each one is doing
+"""
+
+# buckets below this many microseconds are 1us wide, each power of two above it is split into half this many buckets
+SUB_BUCKETS = 128
+# about 19 hours in microseconds, anything longer is counted as this
+HIGHEST_US = 2 ** 36
+
+# operation -> (seconds, percent of calls that should be at or under it)
+SLOS = {
+    "crud.create": (0.25, 99.0),
+    "crud.read": (0.25, 99.0),
+    "crud.update": (0.25, 99.0),
+    "crud.delete": (0.25, 99.0),
+    "upload.postgresql": (30.0, 95.0),
+    "upload.rows": (5.0, 95.0),
+    "upload.sync": (30.0, 95.0),
+}
+
+PERCENTILES = (50, 95, 99)
+# how often the app writes the snapshot when it is given somewhere to write it
+EXPORT_MS = 60_000
+
+_SHIFT_BITS = SUB_BUCKETS.bit_length() - 1
+_HALF = SUB_BUCKETS // 2
+
+
+def bucket_index(value_us):
+    if value_us < SUB_BUCKETS:
+        return value_us
+    shift = value_us.bit_length() - _SHIFT_BITS
+    return shift * _HALF + (value_us >> shift)
+
+
+def bucket_range(index):
+    # (lowest, highest) microseconds counted in a bucket
+    if index < SUB_BUCKETS:
+        return index, index
+    shift = index // _HALF - 1
+    sub_bucket = index - shift * _HALF
+    return sub_bucket << shift, ((sub_bucket + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    def __init__(self, name):
+        self.name = name
+        self.counts = [0] * (bucket_index(HIGHEST_US) + 1)
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+        self.rows = 0
+        self.bytes = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds, rows=0, nbytes=0, error=False):
+        value_us = min(max(int(seconds * 1_000_000), 0), HIGHEST_US)
+        with self.lock:
+            self.counts[bucket_index(value_us)] += 1
+            self.count += 1
+            self.total_us += value_us
+            self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+            self.max_us = max(self.max_us, value_us)
+            self.rows += rows or 0
+            self.bytes += nbytes or 0
+            self.errors += bool(error)
+
+    def percentile(self, percent):
+        # seconds that percent of the calls were at or under, None if nothing has been recorded
+        with self.lock:
+            if not self.count:
+                return None
+            # the rank of the value wanted, e.g. the 95th of 100 calls
+            rank = max(1, -(-self.count * percent // 100))
+            seen = 0
+            for index, bucket_count in enumerate(self.counts):
+                seen += bucket_count
+                if seen >= rank:
+                    # the top of the bucket (never past the largest call) so the answer errs on the slow side
+                    return min(bucket_range(index)[1], self.max_us) / 1_000_000
+        return self.max_us / 1_000_000
+
+    def fraction_within(self, seconds):
+        # share of the calls that took at most seconds, counted by bucket so a bucket straddling it counts as over
+        limit_us = int(seconds * 1_000_000)
+        with self.lock:
+            if not self.count:
+                return None
+            within = sum(bucket_count for index, bucket_count in enumerate(self.counts)
+                         if bucket_count and bucket_range(index)[1] <= limit_us)
+            return within / self.count
+
+    def summary(self):
+        with self.lock:
+            count, total_us, min_us, max_us = self.count, self.total_us, self.min_us, self.max_us
+            rows, nbytes, errors = self.rows, self.bytes, self.errors
+        result = {
+            "count": count,
+            "errors": errors,
+            "rows": rows,
+            "bytes": nbytes,
+            "sum": total_us / 1_000_000,
+            "mean": total_us / count / 1_000_000 if count else None,
+            "min": min_us / 1_000_000 if min_us is not None else None,
+            "max": max_us / 1_000_000,
+        }
+        for percent in PERCENTILES:
+            result[f"p{percent}"] = self.percentile(percent)
+        return result
+
+
+# operation name -> its histogram
+_histograms = {}
+_lock = threading.Lock()
+
+
+def histogram(name):
+    with _lock:
+        if name not in _histograms:
+            _histograms[name] = LatencyHistogram(name)
+        return _histograms[name]
+
+
+def record(name, seconds, rows=0, nbytes=0, error=False):
+    histogram(name).record(seconds, rows, nbytes, error)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+class Span:
+    # what measure() yields, set rows/bytes on it for the operation being timed
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+
+
+@contextmanager
+def measure(name):
+    span = Span()
+    start = time.perf_counter()
+    error = False
+    try:
+        yield span
+    except BaseException:
+        error = True
+        raise
+    finally:
+        record(name, time.perf_counter() - start, span.rows, span.bytes, error)
+
+
+def timed(name, rows=None):
+    # decorator timing every call of a function as name, rows is an optional function of the return value giving the
+    # rows it touched (e.g. len)
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with measure(name) as span:
+                result = function(*args, **kwargs)
+                if rows is not None and result is not None:
+                    span.rows = rows(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def instrument_engine(engine, prefix="sql"):
+    # time every statement run on a SQLAlchemy engine, recorded as prefix.select, prefix.insert etc. with its rowcount
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("latency_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["latency_start"].pop()
+        verb = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "other"
+        record(f"{prefix}.{verb}", time.perf_counter() - start, rows=max(cursor.rowcount, 0))
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("latency_start") if context.connection is not None else None
+        if starts:
+            verb = (context.statement or "other").lstrip().split(None, 1)[0].lower()
+            record(f"{prefix}.{verb}", time.perf_counter() - starts.pop(), error=True)
+
+
+def set_slo(name, seconds, percent=99.0):
+    SLOS[name] = (seconds, percent)
+
+
+def slo_report():
+    # {operation: {"target", "percent", "within", "met"}} for every SLO with at least one call recorded
+    report = {}
+    for name, (seconds, percent) in SLOS.items():
+        with _lock:
+            operation_histogram = _histograms.get(name)
+        if operation_histogram is None or not operation_histogram.count:
+            continue
+        within = operation_histogram.fraction_within(seconds)
+        report[name] = {"target": seconds, "percent": percent, "within": within * 100,
+                        "met": within * 100 >= percent}
+    return report
+
+
+def log_slo_breaches():
+    for name, slo in slo_report().items():
+        if not slo["met"]:
+            logger.warning(f"SLO missed for {name}: {slo['within']:.1f}% of calls took at most {slo['target']}s, "
+                           f"the target is {slo['percent']}%")
+
+
+def snapshot():
+    with _lock:
+        histograms = dict(_histograms)
+    return {
+        "time": time.time(),
+        "operations": {name: histograms[name].summary() for name in sorted(histograms)},
+        "slos": slo_report(),
+    }
+
+
+def _write_atomic(path, text):
+    # written next to the target then renamed so a reader never sees half a file
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+def write_json(path):
+    _write_atomic(path, json.dumps(snapshot(), indent=2))
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(data=None):
+    # the snapshot in the Prometheus text exposition format
+    data = data or snapshot()
+    lines = ["# HELP app_operation_latency_seconds Latency of each app operation.",
+             "# TYPE app_operation_latency_seconds summary"]
+    for name, summary in data["operations"].items():
+        label = f'operation="{_label(name)}"'
+        for percent in PERCENTILES:
+            if summary[f"p{percent}"] is not None:
+                lines.append(f'app_operation_latency_seconds{{{label},quantile="{percent / 100}"}} '
+                             f'{summary[f"p{percent}"]}')
+        lines.append(f"app_operation_latency_seconds_sum{{{label}}} {summary['sum']}")
+        lines.append(f"app_operation_latency_seconds_count{{{label}}} {summary['count']}")
+    for metric, key, description in (("app_operation_rows_total", "rows", "Rows touched by each app operation."),
+                                     ("app_operation_bytes_total", "bytes", "Bytes read by each app operation."),
+                                     ("app_operation_errors_total", "errors", "Failed calls of each app operation.")):
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} counter")
+        for name, summary in data["operations"].items():
+            lines.append(f'{metric}{{operation="{_label(name)}"}} {summary[key]}')
+    lines.append("# HELP app_slo_within_ratio Share of calls within the latency SLO.")
+    lines.append("# TYPE app_slo_within_ratio gauge")
+    for name, slo in data["slos"].items():
+        lines.append(f'app_slo_within_ratio{{operation="{_label(name)}",target_seconds="{slo["target"]}"}} '
+                     f'{slo["within"] / 100}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    _write_atomic(path, prometheus_text())
+
+
+def export(folder):
+    # latency.json and latency.prom in folder
+    write_json(os.path.join(folder, "latency.json"))
+    write_prometheus(os.path.join(folder, "latency.prom"))
@@ -0,0 +1,61 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from csv_reader import LoadCancelled
+
+logger = logging.getLogger(__name__)
+
+"""
+Runs a file load in the background so the window never freezes while a big file is read, parsed and turned into text
+the job runs a load function on a worker thread and keeps track of how far it has got, the tk side polls it with after()
+(like the excel sheets and the render pipeline) to move the progress bar, show the preview of the first rows as soon as
+they are parsed and pick up the result, cancel() sets the event the loader checks between pieces of the file
+nothing in here touches tk
+"""
+
+# how often the gui checks on a load
+LOAD_POLL_MS = 100
+# rows shown while the rest of the file is still loading
+PREVIEW_ROWS = 200
+
+# one load at a time, opening another file cancels the one in progress
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-loader")
+
+
+class LoadJob:
+    def __init__(self, path, load):
+        # load(progress, cancel) does the work on the worker thread and returns the result
+        self.path = path
+        self.cancel_event = threading.Event()
+        # (bytes read, total bytes, rows parsed), written by the worker and read by tk
+        self.progress = (0, 0, 0)
+        # the first rows, until the tk side takes it
+        self.preview = None
+        self.future = _executor.submit(load, self.report, self.cancel_event)
+
+    def report(self, bytes_read, total_bytes, rows, preview=None):
+        # called by the loader after each piece of the file
+        self.progress = (bytes_read, total_bytes, rows)
+        if preview is not None:
+            self.preview = preview
+
+    def take_preview(self):
+        preview, self.preview = self.preview, None
+        return preview
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.future.cancel()
+
+    def done(self):
+        return self.future.done()
+
+    def cancelled(self):
+        # cancelled before it started or stopped part way
+        if self.future.cancelled():
+            return True
+        return self.future.done() and isinstance(self.future.exception(), LoadCancelled)
+
+    def result(self):
+        return self.future.result()
@@ -0,0 +1,231 @@
+import gc
+import logging
+import os
+import signal
+import sys
+import tkinter as tk
+import tracemalloc
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+"""
+Memory debugging for a session that has been open all day, when the app's memory keeps climbing this is how to find out
+what is holding it:
+- accounting() sizes up what the app keeps around: the DataFrames (current data, the dataset catalog, Excel sheets, the
+  model's copy), the matplotlib figures (the pooled ones and any pyplot ones), the open graph/CRUD windows and the
+  logging handlers, using the objects themselves so it works without tracing
+- tracemalloc snapshots, start() turns tracing on (it slows python down a bit so it is off until asked for, or
+  python main.py --trace-memory), every take() keeps a snapshot and growth() lists the lines whose allocations grew the
+  most between the last two, which is usually the leak
+report() puts all of that in one text, from the Debug menu it opens in a window, with kill -USR1 <pid> it is written to
+memory_reports/ (the signal only sets a flag, the tk loop writes the report on its next tick)
+"""
+
+TRACE_FRAMES = 10
+MAX_SNAPSHOTS = 5
+TOP_GROWTH = 15
+REPORT_DIR = "memory_reports"
+# a figure drawn with Agg keeps an RGBA buffer of its size in pixels
+FIGURE_BYTES_PER_PIXEL = 4
+
+
+def start(frames=TRACE_FRAMES):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        logger.info(f"Memory tracing started ({frames} frames per allocation)")
+
+
+def stop():
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        snapshots.clear()
+        logger.info("Memory tracing stopped")
+
+
+def is_tracing():
+    return tracemalloc.is_tracing()
+
+
+class MemorySnapshots:
+    # the last few tracemalloc snapshots, oldest first
+    def __init__(self, max_snapshots=MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        self.snapshots = []
+
+    def take(self, label=None):
+        # returns (label, snapshot), tracing is started if it wasnt (so the first snapshot only has what comes after)
+        start()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        label = label or datetime.now().strftime("%H:%M:%S")
+        self.snapshots.append((label, snapshot))
+        del self.snapshots[:-self.max_snapshots]
+        return label, snapshot
+
+    def clear(self):
+        self.snapshots.clear()
+
+    def growth(self, limit=TOP_GROWTH, key_type="lineno"):
+        # [(StatisticDiff)] of the biggest growth between the last two snapshots, empty with fewer than two
+        if len(self.snapshots) < 2:
+            return []
+        (_, old), (_, new) = self.snapshots[-2:]
+        return [diff for diff in new.compare_to(old, key_type) if diff.size_diff > 0][:limit]
+
+
+# shared by the Debug menu and the signal handler
+snapshots = MemorySnapshots()
+
+
+def frame_size(df):
+    if df is None:
+        return 0
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def figure_size(fig):
+    width, height = fig.get_size_inches()
+    return int(width * fig.dpi) * int(height * fig.dpi) * FIGURE_BYTES_PER_PIXEL
+
+
+def instance_counts(classes):
+    # {class name: live instances} found by walking every object the garbage collector tracks, only run on demand
+    counts = {cls.__name__: 0 for cls in classes}
+    for obj in gc.get_objects():
+        for cls in classes:
+            if isinstance(obj, cls):
+                counts[cls.__name__] += 1
+    return counts
+
+
+def log_handler_count():
+    loggers = [logging.getLogger()] + [item for item in logging.root.manager.loggerDict.values()
+                                       if isinstance(item, logging.Logger)]
+    return sum(len(item.handlers) for item in loggers)
+
+
+def accounting(app):
+    # [(subsystem, count, bytes)] of what a WindowMaker holds, bytes is None where it cant be measured
+    rows = [("current data", int(app.data is not None), frame_size(app.data))]
+
+    catalog = app.dataset_catalog
+    rows.append(("dataset catalog", len(catalog.resident), catalog.memory_usage()))
+
+    if app.workbook is not None:
+        sheets = list(app.workbook.sheets.values())
+        rows.append(("excel sheets", len(sheets), sum(frame_size(sheet) for sheet in sheets)))
+
+    # the lazy properties arent touched so this never imports matplotlib/sklearn just to say they are empty
+    visualise = app._visualise
+    if visualise is not None:
+        pool = visualise.figure_pool
+        figures = list(pool.idle) + [slot[0] for window_slots in pool.slots.values() for slot in window_slots]
+        rows.append(("pooled figures", len(figures), sum(figure_size(fig) for fig in figures)))
+        rows.append(("chart data", int(visualise.data is not None), 0 if visualise.data is app.data
+                     else frame_size(visualise.data)))
+    if "matplotlib.pyplot" in sys.modules:
+        pyplot = sys.modules["matplotlib.pyplot"]
+        figures = [pyplot.figure(number) for number in pyplot.get_fignums()]
+        rows.append(("pyplot figures", len(figures), sum(figure_size(fig) for fig in figures)))
+
+    model = app._neural_network
+    if model is not None:
+        rows.append(("model data", int(model.file is not None),
+                     0 if model.file is app.data else frame_size(model.file)))
+
+    rows.append(("graph windows", sum(window.winfo_exists() for window in app.graph_windows.values()), None))
+    toplevels = [child for child in app.window.winfo_children() if isinstance(child, tk.Toplevel)]
+    rows.append(("open windows", len(toplevels), None))
+    rows.append(("metrics buffer", len(app.metrics_sampler.buffer),
+                 app.metrics_sampler.buffer.values.nbytes + app.metrics_sampler.buffer.times.nbytes))
+    rows.append(("log handlers", log_handler_count(), None))
+    return rows
+
+
+def _size(value):
+    return "-" if value is None else f"{value / 1024 / 1024:10.2f} MB"
+
+
+def report(app=None, snapshot=True, limit=TOP_GROWTH):
+    # the memory report as text, snapshot=True takes a tracemalloc snapshot first if tracing is on
+    lines = [f"Memory report {datetime.now().isoformat(timespec='seconds')}, pid {os.getpid()}"]
+    try:
+        import psutil
+        lines.append(f"Resident memory: {psutil.Process().memory_info().rss / 1024 / 1024:.1f} MB")
+    except ImportError:
+        pass
+    gc_counts = gc.get_count()
+    lines.append(f"GC objects tracked: {len(gc.get_objects())}, pending per generation: {gc_counts}")
+
+    if app is not None:
+        lines.append("")
+        lines.append(f"{'subsystem':<20} {'count':>6} {'size':>13}")
+        for name, count, size in accounting(app):
+            lines.append(f"{name:<20} {count:>6} {_size(size):>13}")
+        classes = [tk.Toplevel]
+        for module_name, class_name in (("main", "CRUDWindow"), ("main", "GraphSelectionWindow"),
+                                        ("graph_theory", "GraphTheory"), ("prediction", "PredictionAlgorithm"),
+                                        ("matplotlib.figure", "Figure"), ("pandas", "DataFrame")):
+            module = sys.modules.get(module_name) or (sys.modules.get("__main__") if module_name == "main" else None)
+            if module is not None and hasattr(module, class_name):
+                classes.append(getattr(module, class_name))
+        lines.append("")
+        lines.append("Live instances: " + ", ".join(f"{name} {count}" for name, count in
+                                                     instance_counts(classes).items()))
+
+    lines.append("")
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        lines.append(f"Traced: {current / 1024 / 1024:.1f} MB now, {peak / 1024 / 1024:.1f} MB peak, "
+                     f"{len(snapshots.snapshots) + int(snapshot)} snapshots")
+        if snapshot:
+            snapshots.take()
+        growth = snapshots.growth(limit)
+        if growth:
+            (old_label, _), (new_label, _) = snapshots.snapshots[-2:]
+            lines.append(f"Top growth from {old_label} to {new_label}:")
+            for diff in growth:
+                frame = diff.traceback[0]
+                lines.append(f"  {diff.size_diff / 1024:+10.1f} KB {diff.count_diff:+8d} blocks  "
+                             f"{frame.filename}:{frame.lineno}")
+        else:
+            lines.append("Take another snapshot later to see what grew.")
+    else:
+        lines.append("Memory tracing is off, start it from the Debug menu (or --trace-memory) to see where memory "
+                     "is allocated and what grows.")
+    return "\n".join(lines)
+
+
+def write_report(text, folder=REPORT_DIR):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"memory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+def install_signal_handler(callback, signal_number=getattr(signal, "SIGUSR1", None)):
+    # call callback() on SIGUSR1 (not on Windows, which doesnt have it), returns whether it was installed
+    if signal_number is None:
+        return False
+    signal.signal(signal_number, lambda signum, frame: callback())
+    return True
+
+
+class MemoryReportWindow(tk.Toplevel):
+    def __init__(self, parent, text):
+        super().__init__(parent)
+        self.title("Memory report")
+        text_box = tk.Text(self, wrap=tk.NONE, width=110, height=40)
+        scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=text_box.yview)
+        text_box.config(yscrollcommand=scrollbar.set)
+        text_box.grid(row=0, column=0, sticky="nsew")
+        scrollbar.grid(row=0, column=1, sticky="ns")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        text_box.insert(tk.END, text)
+        text_box.config(state=tk.DISABLED)
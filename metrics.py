@@ -0,0 +1,261 @@
+import functools
+import logging
+import threading
+import time
+import tkinter as tk
+from contextlib import contextmanager
+
+import numpy as np
+import psutil
+
+logger = logging.getLogger(__name__)
+
+"""
+Resource metrics, display_stats used to print the CPU/memory/disk/network numbers every 10 seconds and forget them
+MetricsSampler samples them on its own thread every SAMPLE_INTERVAL seconds into a fixed size numpy ring buffer, so the
+last CAPACITY samples are always there without the memory growing, every sample is tagged with the operation running
+when it was taken (see operation()/tagged() below, e.g. "parsing", "training", "uploading", otherwise "idle")
+from that it can give the rate of the counters (bytes sent/received per second) and percentiles of any metric, for one
+operation or all of them, e.g. sampler.percentiles("process_rss", operation_name="training")
+MetricsPanel is the strip of sparklines at the bottom of the main window, it redraws from the buffer on the tk thread
+"""
+
+SAMPLE_INTERVAL = 1.0
+# 10 minutes at one sample a second
+CAPACITY = 600
+PANEL_REFRESH_MS = 1000
+
+# every metric sampled, the counters only ever go up so rates() is what is shown for them
+FIELDS = ("cpu", "memory", "process_rss", "disk", "bytes_sent", "bytes_received")
+COUNTERS = ("bytes_sent", "bytes_received")
+IDLE = "idle"
+
+# the operations that are running right now (the newest one wins), shared by every thread
+_active = []
+_active_lock = threading.Lock()
+
+
+@contextmanager
+def operation(name):
+    # tag every sample taken while the block runs with name
+    with _active_lock:
+        _active.append(name)
+    try:
+        yield
+    finally:
+        with _active_lock:
+            _active.remove(name)
+
+
+def tagged(name):
+    # decorator version of operation()
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with operation(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_operation():
+    with _active_lock:
+        return _active[-1] if _active else IDLE
+
+
+class RingBuffer:
+    # the last capacity rows of fields, with the time and the operation of each row
+    def __init__(self, fields, capacity=CAPACITY):
+        self.fields = list(fields)
+        self.capacity = capacity
+        self.values = np.zeros((capacity, len(self.fields)), dtype=np.float64)
+        self.times = np.zeros(capacity, dtype=np.float64)
+        # operation of each row as an index into self.operations
+        self.tags = np.zeros(capacity, dtype=np.int16)
+        self.operations = [IDLE]
+        # the row the next sample goes in and how many rows are filled
+        self.next = 0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, row, operation_name=IDLE):
+        with self.lock:
+            if operation_name not in self.operations:
+                self.operations.append(operation_name)
+            self.values[self.next] = row
+            self.times[self.next] = timestamp
+            self.tags[self.next] = self.operations.index(operation_name)
+            self.next = (self.next + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def _order(self):
+        # row indexes oldest first
+        if self.count < self.capacity:
+            return np.arange(self.count)
+        return (np.arange(self.capacity) + self.next) % self.capacity
+
+    def column(self, field, operation_name=None):
+        # (times, values) of one field oldest first, only the rows of operation_name if it is given
+        with self.lock:
+            order = self._order()
+            times = self.times[order]
+            values = self.values[order, self.fields.index(field)]
+            if operation_name is not None:
+                if operation_name not in self.operations:
+                    return times[:0], values[:0]
+                keep = self.tags[order] == self.operations.index(operation_name)
+                times, values = times[keep], values[keep]
+        return times, values
+
+    def operation_names(self):
+        # the operations that have a sample still in the buffer
+        with self.lock:
+            tags = np.unique(self.tags[self._order()])
+            return [self.operations[tag] for tag in tags]
+
+
+class MetricsSampler:
+    def __init__(self, interval=SAMPLE_INTERVAL, capacity=CAPACITY, disk_path="/"):
+        self.interval = interval
+        self.disk_path = disk_path
+        self.buffer = RingBuffer(FIELDS, capacity)
+        self.process = psutil.Process()
+        self.stop_event = threading.Event()
+        self.thread = None
+        # the first cpu_percent(None) call always returns 0, this one starts the measurement
+        psutil.cpu_percent(interval=None)
+
+    def sample(self):
+        # take one sample now
+        network = psutil.net_io_counters()
+        row = (
+            psutil.cpu_percent(interval=None),
+            psutil.virtual_memory().percent,
+            self.process.memory_info().rss / 1024 / 1024,
+            psutil.disk_usage(self.disk_path).percent,
+            network.bytes_sent,
+            network.bytes_recv,
+        )
+        self.buffer.append(time.time(), row, current_operation())
+        return dict(zip(FIELDS, row))
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                # a metric that cant be read this time (e.g. the disk went away) shouldnt stop the sampling
+                logger.warning(f"An error occurred while sampling the resource metrics: {str(e)}")
+            self.stop_event.wait(self.interval)
+
+    def start(self):
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name="metrics-sampler", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def latest(self):
+        # the newest value of every field, None before the first sample
+        if not len(self.buffer):
+            return None
+        return {field: float(self.buffer.column(field)[1][-1]) for field in FIELDS}
+
+    def series(self, field, operation_name=None):
+        # the values of a field oldest first, counters are turned into per second rates
+        if field in COUNTERS:
+            return self.rates(field, operation_name)[1]
+        return self.buffer.column(field, operation_name)[1]
+
+    def rates(self, field, operation_name=None):
+        # (times, per second change) of a counter between consecutive samples, a counter reset counts as 0
+        times, values = self.buffer.column(field)
+        if len(times) < 2:
+            return times[:0], values[:0]
+        elapsed = np.diff(times)
+        elapsed[elapsed <= 0] = np.nan
+        rates = np.clip(np.diff(values), 0, None) / elapsed
+        times = times[1:]
+        if operation_name is not None:
+            # a rate belongs to the operation of the sample it ends on
+            keep = np.isin(times, self.buffer.column(field, operation_name)[0])
+            times, rates = times[keep], rates[keep]
+        return times, np.nan_to_num(rates)
+
+    def percentiles(self, field, percentiles=(50, 95, 99), operation_name=None):
+        # {percentile: value} of a field (the rate for counters), None for each if there are no samples
+        values = self.series(field, operation_name)
+        if not len(values):
+            return {p: None for p in percentiles}
+        return dict(zip(percentiles, (float(value) for value in np.percentile(values, percentiles))))
+
+    def summary(self, field):
+        # {operation: (mean, p95, max)} of a field, to see which operation drives it
+        result = {}
+        for operation_name in self.buffer.operation_names():
+            values = self.series(field, operation_name)
+            if len(values):
+                result[operation_name] = (float(values.mean()), float(np.percentile(values, 95)),
+                                          float(values.max()))
+        return result
+
+
+class Sparkline(tk.Canvas):
+    # a small line of the recent values of one metric with its latest value written next to it
+    def __init__(self, parent, title, unit, width=160, height=36, maximum=None):
+        super().__init__(parent, width=width, height=height, background="white", highlightthickness=0)
+        self.title = title
+        self.unit = unit
+        self.width = width
+        self.height = height
+        # the top of the line, None scales it to the largest value shown
+        self.maximum = maximum
+
+    def draw(self, values, extra=""):
+        self.delete("all")
+        if len(values):
+            top = self.maximum or max(float(np.max(values)), 1e-9)
+            xs = np.linspace(0, self.width, len(values)) if len(values) > 1 else np.array([0.0])
+            ys = self.height - 2 - (np.clip(values, 0, top) / top) * (self.height - 14)
+            if len(values) > 1:
+                self.create_line(*np.column_stack([xs, ys]).ravel().tolist(), fill="steelblue")
+            label = f"{self.title}: {values[-1]:.1f}{self.unit}{extra}"
+        else:
+            label = f"{self.title}: -"
+        self.create_text(2, 2, text=label, anchor="nw", font=("TkDefaultFont", 8))
+
+
+class MetricsPanel(tk.Frame):
+    # sparklines for the main metrics and the operation that is running, refresh() is called by the tk loop
+    def __init__(self, parent, sampler):
+        super().__init__(parent)
+        self.sampler = sampler
+        self.sparklines = {
+            "cpu": Sparkline(self, "CPU", "%", maximum=100),
+            "memory": Sparkline(self, "Memory", "%", maximum=100),
+            "process_rss": Sparkline(self, "App memory", " MB"),
+            "bytes_sent": Sparkline(self, "Sent", " KB/s"),
+            "bytes_received": Sparkline(self, "Received", " KB/s"),
+        }
+        for i, sparkline in enumerate(self.sparklines.values()):
+            sparkline.grid(row=0, column=i, padx=2)
+        self.operation_label = tk.Label(self, text="", anchor="w")
+        self.operation_label.grid(row=0, column=len(self.sparklines), padx=5, sticky="w")
+
+    def refresh(self):
+        for field, sparkline in self.sparklines.items():
+            values = self.sampler.series(field)
+            if field in COUNTERS:
+                values = values / 1024
+            p95 = self.sampler.percentiles(field, (95,))[95]
+            extra = f" (p95 {p95 / 1024 if field in COUNTERS else p95:.0f})" if p95 is not None else ""
+            sparkline.draw(values, extra)
+        self.operation_label.config(text=current_operation())
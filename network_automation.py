@@ -0,0 +1,128 @@
+import logging
+import subprocess
+from tkinter import messagebox
+
+import netifaces
+from netmiko import ConnectHandler
+
+logger = logging.getLogger(__name__)
+
+"""
+This will not work unless needed, for example if the user were to use VLAN tagging on a network switch
+I've set it up so that the user could just change the dummy device metadata and adjust it for their device
+an error message will appear that shows ALL of the devices possible (both CLI and messagebox) so that the user knows
+which devices are compatible with VLAN tagging
+I have also set up a SSH command to connect to the "network switch" device
+I've also added a logger if the user does use this which is stored in "vlan_tagging.log" however this will most
+likely remain empty
+"""
+
+
+def configure_vlan_tagging():
+    # Netmiko configuration for VLAN tagging
+    try:
+        # Configure logger to write logs to a file
+        file_handler = logging.FileHandler('vlan_tagging.log')
+        file_handler.setLevel(logging.DEBUG)
+        # Define device parameters for your network switch
+        device = {
+            'device_type': 'some_type_of_device_maybe_cisco',
+            'host': 'switch_ip_address',
+            'username': 'network_manager_username/sysadmin_username/whatever_role_username',
+            'password': 'network_manager_password/sysadmin_password/whatever_role_password',
+            'secret': 'network_manager_password/sysadmin_password/whatever_role_password'
+        }
+
+        #  SSH command to connect to the "network" switch
+        # ssh_command = [
+        #     'ssh',
+        #     f"{device['username']}@{device['host']}",
+        #
+        #     # Disable strict host key checking
+        #     '-o', 'StrictHostKeyChecking=no',
+        #     # Disable known hosts file
+        #     '-o', 'UserKnownHostsFile=/dev/null',
+        #     # Enable password authentication
+        #     '-o', 'PasswordAuthentication=yes',
+        #     '-o', 'KexAlgorithms=+diffie-hellman-group1-sha1',
+        # ]
+        #
+        # # Send commands to the SSH process
+        # commands = [
+        #     'enable',  # Enter privileged exec mode
+        #     'configure terminal',  # Enter global configuration mode
+        #     'vlan 10',  # Create VLAN with ID 10
+        #     'name VLAN_10',  # Assign a name to the VLAN
+        #     'interface Ethernet1/1',  # Enter interface configuration mode for a specific interface
+        #     'switchport mode access',  # Set the interface to access mode
+        #     'switchport access vlan 10',  # Assign the VLAN to the interface
+        #     'no shutdown',  # Enable the interface
+        #     'end',  # Exit from global configuration mode
+        #     'write memory',  # Save the configuration
+        #     'exit',  # Exit from the SSH session
+        # ]
+
+        # Connect to the network switch
+        with ConnectHandler(**device) as net_connect:
+            # Enter privileged exec mode
+            net_connect.enable()
+
+            # Example configuration for VLAN tagging
+            # all of this is fake until actually put into a VLAN setup
+
+            vlan_id = '10'
+            interface = 'Ethernet1/1'
+            vlan_name = 'VLAN_10'
+
+            # Create VLAN
+            create_vlan_command = f'vlan {vlan_id}; name {vlan_name}'
+            output = net_connect.send_config_set(create_vlan_command)
+            logger.info(f"Create VLAN command output: {output}")
+
+            # Configure VLAN on the interface
+            interface_config_commands = [
+                f'interface {interface}',
+                'switchport mode access',
+                f'switchport access vlan {vlan_id}',
+                'no shutdown'
+            ]
+            output = net_connect.send_config_set(interface_config_commands)
+            logger.info(f"Interface configuration output: {output}")
+
+            # Save the configuration
+            save_command = 'write memory'
+            output = net_connect.send_command(save_command)
+            logger.info(f"Save configuration output: {output}")
+
+            messagebox.showinfo("Success", "VLAN configuration completed successfully.")
+            print(output)
+    except Exception as e:
+        # Handle any errors that occur during VLAN tagging configuration
+        error_message = f"Error occurred during VLAN tagging configuration: {str(e)}"
+        messagebox.showerror("Error", error_message)
+        logger.error(error_message)
+
+
+def setup_network_bonding():
+    # Configure network bonding for increased bandwidth and fault tolerance
+    interfaces = netifaces.interfaces()
+    bond_interface = "bond_example"
+
+    # Create bond interface
+    subprocess.run(["ip", "link", "add", bond_interface, "type", "bond"])
+
+    # Add network interfaces to the bond
+    for interface in interfaces:
+        if interface.startswith("eth"):
+            subprocess.run(["ip", "link", "set", interface, "master", bond_interface])
+
+    # Configure bond mode and other bonding options
+    subprocess.run(["ip", "link", "set", bond_interface, "type", "bond", "mode", "802.3ad"])
+
+    # Assign IP address to the bond interface
+    subprocess.run(["ip", "addr", "add", "192.168.0.100/x", "dev", bond_interface])
+
+    # Bring up the bond interface
+    subprocess.run(["ip", "link", "set", bond_interface, "up"])
+
+    print("Network bonding configured successfully.")
@@ -0,0 +1,224 @@
+import argparse
+import cProfile
+import functools
+import glob
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+"""
+Profiling mode, instead of running the whole app under cProfile by hand (that's where main.py.pstat came from) the slow
+operations are marked with @profiled and python main.py --profile writes a profile of every call to them
+each call gives a <operation>-<timestamp>.pstat (for pstats/snakeviz) and a .speedscope.json that opens straight in
+speedscope.app, everything goes in the profiles folder
+cProfile can only run one profile at a time, so an operation that starts while another one is being profiled (parse_csv
+inside open_file, or a load on the worker thread while a chart is profiled) is just part of the outer profile
+cProfile also only sees the thread it was started on, work handed to a worker thread (the chart renders, see
+render_pipeline.py) is profiled there under its own name
+with profiling off @profiled costs one if
+
+the same file is the report tool:
+    python profiling.py report profiles/load_dataset-20240101_120000_000000.pstat
+    python profiling.py diff old.pstat new.pstat        # what got slower, by cumulative time per function
+    python profiling.py diff load_dataset               # the two latest profiles of an operation
+"""
+
+PROFILE_DIR = "profiles"
+# how deep the speedscope call tree goes, and the smallest share of the total time a call needs to be drawn
+SPEEDSCOPE_MAX_DEPTH = 64
+SPEEDSCOPE_MIN_SHARE = 0.001
+
+# where profiles are written, None while profiling is off
+_profile_dir = None
+# held while a profile is running, cProfile cant run two at once even on different threads
+_active = threading.Lock()
+
+
+def enable(profile_dir=PROFILE_DIR):
+    global _profile_dir
+    os.makedirs(profile_dir, exist_ok=True)
+    _profile_dir = profile_dir
+    logger.info(f"Profiling enabled, profiles are written to {profile_dir}")
+
+
+def disable():
+    global _profile_dir
+    _profile_dir = None
+
+
+def is_enabled():
+    return _profile_dir is not None
+
+
+@contextmanager
+def profile(name, wait=False):
+    # profile the block and write <name>-<timestamp>.pstat/.speedscope.json, does nothing while profiling is off or
+    # another profile is running, unless wait is set, then it waits for that one to finish (for worker threads like
+    # the chart renders, several running at once are profiled one after the other rather than only the first)
+    if _profile_dir is None or not _active.acquire(blocking=wait):
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # something else is already profiling (e.g. python -m cProfile main.py --profile)
+        _active.release()
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _active.release()
+        write_profile(profiler, name, _profile_dir)
+
+
+def profiled(name=None):
+    # decorator version of profile(), named after the function by default
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profile_dir is None:
+                return func(*args, **kwargs)
+            with profile(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def write_profile(profiler, name, profile_dir=PROFILE_DIR):
+    # write the pstat and speedscope files, returns the pstat path
+    base = os.path.join(profile_dir, f"{name}-{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}")
+    try:
+        profiler.dump_stats(base + ".pstat")
+        stats = pstats.Stats(profiler)
+        with open(base + ".speedscope.json", "w") as f:
+            json.dump(speedscope_profile(stats, name), f)
+    except (OSError, TypeError) as e:
+        logger.warning(f"Could not write the {name} profile: {str(e)}")
+        return None
+    logger.info(f"Profile of {name} written to {base}.pstat ({stats.total_tt:.3f}s)")
+    return base + ".pstat"
+
+
+def function_name(func):
+    filename, line, name = func
+    if filename == "~":
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def speedscope_profile(stats, name):
+    # cProfile only keeps caller -> callee totals, not whole stacks, so the call tree is rebuilt from the roots down
+    # with each callee's time split in proportion to how much of its caller's time is on this path, this is an
+    # approximation for functions reached from many places but the hot paths come out right
+    frames, frame_index = [], {}
+    callees = defaultdict(list)
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees[caller].append((func, edge[3]))
+    roots = [func for func, value in stats.stats.items() if not value[4]]
+    total = sum(stats.stats[root][3] for root in roots)
+    min_duration = total * SPEEDSCOPE_MIN_SHARE
+    events = []
+
+    def frame(func):
+        if func not in frame_index:
+            frame_index[func] = len(frames)
+            frames.append({"name": function_name(func), "file": func[0], "line": func[1]})
+        return frame_index[func]
+
+    def walk(func, at, duration, stack):
+        events.append({"type": "O", "frame": frame(func), "at": at})
+        cumulative = stats.stats[func][3]
+        scale = duration / cumulative if cumulative else 0
+        child_at = at
+        if len(stack) < SPEEDSCOPE_MAX_DEPTH:
+            for callee, edge_time in sorted(callees[func], key=lambda item: -item[1]):
+                child = min(edge_time * scale, at + duration - child_at)
+                if callee in stack or child < min_duration:
+                    continue
+                walk(callee, child_at, child, stack | {callee})
+                child_at += child
+        events.append({"type": "C", "frame": frame(func), "at": at + duration})
+
+    at = 0.0
+    for root in sorted(roots, key=lambda func: -stats.stats[func][3]):
+        duration = stats.stats[root][3]
+        if duration >= min_duration:
+            walk(root, at, duration, {root})
+            at += duration
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "profiling.py",
+        "shared": {"frames": frames},
+        "profiles": [{"type": "evented", "name": name, "unit": "seconds", "startValue": 0, "endValue": at,
+                      "events": events}],
+    }
+
+
+def cumulative_times(path):
+    # {function: cumulative seconds} from a pstat file
+    stats = pstats.Stats(path)
+    return {function_name(func): value[3] for func, value in stats.stats.items()}
+
+
+def diff_profiles(old_path, new_path):
+    # [(function, old seconds, new seconds)] for every function in either profile, biggest slowdown first
+    old, new = cumulative_times(old_path), cumulative_times(new_path)
+    rows = [(func, old.get(func, 0.0), new.get(func, 0.0)) for func in set(old) | set(new)]
+    return sorted(rows, key=lambda row: row[1] - row[2])
+
+
+def latest_profiles(name, profile_dir=PROFILE_DIR, count=2):
+    # the newest pstat files for an operation, oldest first
+    paths = sorted(glob.glob(os.path.join(profile_dir, glob.escape(name) + "-*.pstat")))
+    return paths[-count:]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Look at and compare the profiles written by main.py --profile.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    report = commands.add_parser("report", help="the slowest functions of one profile")
+    report.add_argument("profile", help="pstat file")
+    report.add_argument("-n", type=int, default=30, help="how many functions to show")
+    diff = commands.add_parser("diff", help="compare two profiles by cumulative time per function")
+    diff.add_argument("profiles", nargs="+", help="old and new pstat files, or an operation name for its latest two")
+    diff.add_argument("-n", type=int, default=30, help="how many functions to show")
+    diff.add_argument("--dir", default=PROFILE_DIR, help="where to look for an operation's profiles")
+    args = parser.parse_args(argv)
+
+    if args.command == "report":
+        pstats.Stats(args.profile).sort_stats("cumulative").print_stats(args.n)
+        return 0
+
+    if len(args.profiles) == 1:
+        paths = latest_profiles(args.profiles[0], args.dir)
+        if len(paths) < 2:
+            parser.error(f"need two profiles of {args.profiles[0]} in {args.dir}, found {len(paths)}")
+    elif len(args.profiles) == 2:
+        paths = args.profiles
+    else:
+        parser.error("give two pstat files or one operation name")
+    old_path, new_path = paths
+    print(f"old: {old_path}\nnew: {new_path}\n")
+    print(f"{'old (s)':>10} {'new (s)':>10} {'change (s)':>11} {'change':>8}  function")
+    for func, old, new in diff_profiles(old_path, new_path)[:args.n]:
+        change = f"{(new - old) / old:+.0%}" if old else "new"
+        print(f"{old:10.4f} {new:10.4f} {new - old:+11.4f} {change:>8}  {func}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
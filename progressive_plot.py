@@ -0,0 +1,161 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+"""
+Progressive rendering for big line and scatter plots
+plotting every point of a dense series is slow and zooming into it just magnifies the overplotted pixels, so instead:
+- the x column is sorted once, that sorted copy is the index every redraw queries
+- only the points in the visible x range are looked up (two binary searches) and then downsampled to roughly one
+  bucket per pixel of the axes, LTTB for lines (keeps the shape of the line) and min/max per bucket for scatter plots
+  (keeps the envelope/outliers)
+- on pan/zoom the lookup and downsampling runs on a worker thread and the result is handed back to tk with after(), so
+  dragging around stays smooth, a newer zoom always wins over one that is still being worked out
+"""
+
+# below this many points the normal seaborn plot is fine
+PROGRESSIVE_THRESHOLD = 5000
+# wait this long (ms) after the last pan/zoom event before re-querying, dragging fires lots of them
+DEBOUNCE_MS = 50
+# how often (ms) tk checks if the worker has finished
+POLL_MS = 15
+
+# the downsampling is numpy so it releases the gil for the heavy bits, two threads is plenty
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="progressive-plot")
+
+
+def lttb(x, y, n_out):
+    # largest triangle three buckets, returns the indices of the n_out points that best keep the shape of the line
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    # the middle points are split into n_out - 2 buckets, one point is picked from each
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # the average of the next bucket is the third corner of the triangle
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        if next_end <= next_start:
+            next_end = next_start + 1
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # pick the point in this bucket that makes the biggest triangle with the previous pick and the next average
+        areas = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous]) -
+                       (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(areas)) if end > start else start
+        indices[i + 1] = previous
+    return indices
+
+
+def minmax_buckets(x, y, n_buckets):
+    # split the (sorted) x range into n_buckets and keep the lowest and highest point of each, returns the indices
+    n = len(x)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    edges = np.linspace(x[0], x[-1], n_buckets + 1)
+    starts = np.unique(np.searchsorted(x, edges[:-1], side="left"))
+    starts = starts[starts < n]
+    # reduceat gives the min/max value of each bucket, then the first point that hits it is the one kept
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+    lowest = np.minimum.reduceat(y, starts)[bucket]
+    highest = np.maximum.reduceat(y, starts)[bucket]
+    is_low = np.flatnonzero(y == lowest)
+    is_high = np.flatnonzero(y == highest)
+    low = is_low[np.unique(bucket[is_low], return_index=True)[1]]
+    high = is_high[np.unique(bucket[is_high], return_index=True)[1]]
+    return np.union1d(low, high)
+
+
+class ProgressiveRenderer:
+    def __init__(self, ax, canvas, x, y, kind="line"):
+        self.ax = ax
+        self.canvas = canvas
+        self.widget = canvas.get_tk_widget()
+        self.kind = kind
+
+        # the sorted index, nan rows cant be placed on the x axis so they are dropped
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        keep = ~(np.isnan(x) | np.isnan(y))
+        order = np.argsort(x[keep], kind="stable")
+        self.x = x[keep][order]
+        self.y = y[keep][order]
+
+        if kind == "line":
+            self.artist = ax.plot([], [], color='blue', linewidth=1)[0]
+        else:
+            self.artist = ax.scatter([], [], color='darkblue', s=8, alpha=0.7)
+
+        # generation goes up on every zoom so a slow result from an older zoom is thrown away
+        self._generation = 0
+        self._pending = None
+        self._callback = ax.callbacks.connect('xlim_changed', self._on_limits_changed)
+
+    def render(self):
+        # the first draw happens straight away over the full range and sets the axes limits
+        if len(self.x):
+            pad_y = (self.y.max() - self.y.min()) * 0.05 or 1
+            self.ax.set_xlim(self.x[0], self.x[-1])
+            self.ax.set_ylim(self.y.min() - pad_y, self.y.max() + pad_y)
+            # setting the limits counts as a zoom, no need to query it again
+            if self._pending is not None:
+                self.widget.after_cancel(self._pending)
+                self._pending = None
+            self._apply(self._query(self.x[0], self.x[-1], self._buckets()))
+
+    def disconnect(self):
+        # stop listening for zooms and drop anything still being worked out
+        self.ax.callbacks.disconnect(self._callback)
+        self._generation += 1
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+            self._pending = None
+
+    def _buckets(self):
+        # roughly one bucket per pixel across the axes
+        return max(int(self.ax.bbox.width), 100)
+
+    def _on_limits_changed(self, ax):
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+        self._pending = self.widget.after(DEBOUNCE_MS, self._start_query)
+
+    def _start_query(self):
+        self._pending = None
+        self._generation += 1
+        low, high = self.ax.get_xlim()
+        future = _executor.submit(self._query, low, high, self._buckets())
+        self.widget.after(POLL_MS, self._poll, future, self._generation)
+
+    def _query(self, low, high, buckets):
+        # runs on the worker thread, find the visible range with two binary searches then downsample it
+        start = max(np.searchsorted(self.x, low, side="left") - 1, 0)
+        end = min(np.searchsorted(self.x, high, side="right") + 1, len(self.x))
+        xs, ys = self.x[start:end], self.y[start:end]
+        if self.kind == "line":
+            keep = lttb(xs, ys, 2 * buckets)
+        else:
+            keep = minmax_buckets(xs, ys, buckets)
+        return xs[keep], ys[keep]
+
+    def _poll(self, future, generation):
+        if not future.done():
+            self.widget.after(POLL_MS, self._poll, future, generation)
+            return
+        if generation != self._generation or not self.widget.winfo_exists():
+            # a newer zoom has started (or the window is gone), this result is out of date
+            return
+        self._apply(future.result())
+        self.canvas.draw_idle()
+
+    def _apply(self, points):
+        xs, ys = points
+        if self.kind == "line":
+            self.artist.set_data(xs, ys)
+        else:
+            self.artist.set_offsets(np.column_stack([xs, ys]))
@@ -0,0 +1,217 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+"""
+SQL query tracing, echo=True prints every statement but not how long it took or how often the same query runs
+trace_engine(engine) adds SQLAlchemy before/after_cursor_execute listeners that:
+- normalize each statement to its shape (literals and parameters become ?, IN (...) and multi row VALUES lists are
+  collapsed to one, whitespace squashed) so SELECT ... WHERE banana_id = 5 and = 6 are counted as the same query
+- add up count, total/mean/max time and rows per shape, and which function outside SQLAlchemy ran it (mostly a
+  DatabaseHandler method), that is what shows the ORM paths sending hundreds of small queries
+- keep the last SLOW_QUERIES statements slower than the threshold with their parameters, the EXPLAIN plan is only asked
+  for when they are looked at (running it inside the listener would share the connection/transaction being timed)
+the stats and the slow queries are in the CRUD window's Scripts list ("Query statistics", "Slow queries")
+"""
+
+# statements slower than this are kept with their parameters and plan
+SLOW_QUERY_SECONDS = float(os.environ.get("SLOW_QUERY_SECONDS", 0.1))
+SLOW_QUERIES = 50
+# shapes listed in the stats, busiest (by total time) first
+TOP_SHAPES = 25
+MAX_PARAMETER_CHARS = 500
+# EXPLAIN for each dialect, anything else isnt explained
+EXPLAIN_PREFIX = {"postgresql": "EXPLAIN ", "sqlite": "EXPLAIN QUERY PLAN ", "mysql": "EXPLAIN "}
+EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PARAMETERS = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+|\?")
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_VALUES_ROWS = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+_WHITESPACE = re.compile(r"\s+")
+# frames from these are skipped when looking for what ran a statement
+_SKIP_CALLERS = ("sqlalchemy", "query_trace.py", "latency.py", "contextlib.py")
+
+
+def normalize(statement):
+    # the shape of a statement, the same for every run whatever the values
+    shape = _COMMENTS.sub(" ", statement)
+    shape = _STRINGS.sub("?", shape)
+    shape = _PARAMETERS.sub("?", shape)
+    shape = _NUMBERS.sub("?", shape)
+    shape = _IN_LISTS.sub("IN (?)", shape)
+    shape = _VALUES_ROWS.sub(r"\1", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def caller():
+    # "file.py:function" of the first frame outside SQLAlchemy, e.g. database.py:sync_bananas
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        # SQLAlchemy also runs code it generated with exec, those frames have filenames like <string>
+        if not filename.startswith("<") and not any(skip in filename for skip in _SKIP_CALLERS):
+            return f"{os.path.basename(filename)}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class StatementStats:
+    # the totals of one statement shape
+    def __init__(self, shape):
+        self.shape = shape
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.errors = 0
+        self.callers = Counter()
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {"shape": self.shape, "count": self.count, "total": self.total, "mean": self.mean, "max": self.max,
+                "rows": self.rows, "errors": self.errors, "callers": dict(self.callers.most_common())}
+
+
+class SlowQuery:
+    def __init__(self, statement, parameters, seconds, rows, origin):
+        self.statement = statement
+        self.parameters = parameters
+        self.seconds = seconds
+        self.rows = rows
+        self.caller = origin
+        self.time = datetime.now()
+        # the EXPLAIN output as text, filled in by QueryTracer.explain
+        self.plan = None
+
+
+class QueryTracer:
+    def __init__(self, engine, threshold=SLOW_QUERY_SECONDS, max_slow=SLOW_QUERIES):
+        self.engine = engine
+        self.threshold = threshold
+        self.stats = {}
+        self.slow_queries = deque(maxlen=max_slow)
+        self._lock = threading.Lock()
+
+    def record(self, statement, parameters, seconds, rows=0, error=False, origin=None):
+        shape = normalize(statement)
+        origin = origin or "unknown"
+        with self._lock:
+            stats = self.stats.get(shape)
+            if stats is None:
+                stats = self.stats[shape] = StatementStats(shape)
+            stats.count += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            stats.rows += max(rows, 0)
+            stats.errors += int(error)
+            stats.callers[origin] += 1
+            if seconds >= self.threshold and not error:
+                self.slow_queries.append(SlowQuery(statement, parameters, seconds, rows, origin))
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self.slow_queries.clear()
+
+    def top(self, limit=TOP_SHAPES, key="total"):
+        # the busiest shapes, by total time (or count/mean/max)
+        with self._lock:
+            stats = list(self.stats.values())
+        return sorted(stats, key=lambda item: getattr(item, key), reverse=True)[:limit]
+
+    def explain(self, slow_query):
+        # the plan of a slow query (run on its own connection, the query itself isnt run again), cached on it
+        if slow_query.plan is not None:
+            return slow_query.plan
+        prefix = EXPLAIN_PREFIX.get(self.engine.dialect.name)
+        verb = slow_query.statement.lstrip().split(None, 1)[0].lower() if slow_query.statement.strip() else ""
+        if prefix is None or verb not in EXPLAINABLE:
+            slow_query.plan = "(no plan for this statement)"
+            return slow_query.plan
+        parameters = slow_query.parameters
+        # an executemany is explained with its first row
+        if isinstance(parameters, list):
+            parameters = parameters[0] if parameters else ()
+        try:
+            with self.engine.connect() as conn:
+                conn = conn.execution_options(query_trace_skip=True)
+                rows = conn.exec_driver_sql(prefix + slow_query.statement, parameters or ()).fetchall()
+            slow_query.plan = "\n".join(" ".join(str(value) for value in row) for row in rows)
+        except Exception as e:
+            slow_query.plan = f"(EXPLAIN failed: {str(e)})"
+            logger.error(f"An error occurred while explaining a slow query: {str(e)}")
+        return slow_query.plan
+
+    def stats_text(self, limit=TOP_SHAPES):
+        # the stats as the text shown in the scripts window
+        top = self.top(limit)
+        if not top:
+            return "No queries run yet."
+        lines = [f"{'count':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9} {'rows':>9}  statement"]
+        for stats in top:
+            lines.append(f"{stats.count:>7} {stats.total:>9.3f} {stats.mean * 1000:>9.2f} {stats.max * 1000:>9.2f} "
+                         f"{stats.rows:>9}  {stats.shape}")
+            callers = ", ".join(f"{name} x{count}" for name, count in stats.callers.most_common(3))
+            lines.append(f"{'':>47}  from {callers}")
+        return "\n".join(lines)
+
+    def slow_text(self):
+        # the slow queries, newest first, with their plans
+        with self._lock:
+            slow_queries = list(self.slow_queries)
+        if not slow_queries:
+            return f"No queries slower than {self.threshold * 1000:.0f} ms."
+        sections = []
+        for slow_query in reversed(slow_queries):
+            parameters = repr(slow_query.parameters)
+            if len(parameters) > MAX_PARAMETER_CHARS:
+                parameters = parameters[:MAX_PARAMETER_CHARS] + "..."
+            sections.append(f"{slow_query.time:%H:%M:%S} {slow_query.seconds * 1000:.1f} ms, {slow_query.rows} rows, "
+                            f"from {slow_query.caller}\n{slow_query.statement.strip()}\nparameters: {parameters}\n"
+                            f"plan:\n{self.explain(slow_query)}")
+        return "\n\n".join(sections)
+
+
+def trace_engine(engine, threshold=SLOW_QUERY_SECONDS):
+    # add the tracing listeners to a SQLAlchemy engine, returns the QueryTracer holding the stats
+    from sqlalchemy import event
+
+    tracer = QueryTracer(engine, threshold)
+
+    def skipped(conn):
+        return conn.get_execution_options().get("query_trace_skip", False)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not skipped(conn):
+            conn.info.setdefault("query_trace_start", []).append((time.perf_counter(), caller()))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not skipped(conn):
+            start, origin = conn.info["query_trace_start"].pop()
+            tracer.record(statement, parameters, time.perf_counter() - start, cursor.rowcount, origin=origin)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        conn = context.connection
+        starts = conn.info.get("query_trace_start") if conn is not None and not skipped(conn) else None
+        if starts:
+            start, origin = starts.pop()
+            tracer.record(context.statement or "", context.parameters, time.perf_counter() - start, error=True,
+                          origin=origin)
+
+    return tracer
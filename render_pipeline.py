@@ -0,0 +1,100 @@
+import base64
+import io
+import logging
+import os
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+import calibration
+import profiling
+from latency import measure
+
+logger = logging.getLogger(__name__)
+
+"""
+Chart rendering off the tk thread
+building a seaborn chart and rasterising it can take a good few seconds on a big file, doing that on the tk thread froze
+the whole app, and with several headers selected the charts were drawn one after the other
+now the chart is built and rasterised (Agg, straight to a PNG) on a worker thread, while that happens the window shows a
+"Rendering..." placeholder, when the image is ready it is handed back to tk with after() and swapped into the
+placeholder, several charts render at the same time (one per worker)
+the figure is thrown away once it has been turned into an image so nothing builds up in memory
+only plain Figures are used (no pyplot) as pyplot isnt safe to use from more than one thread
+"""
+
+# how often (ms) tk checks whether a chart has finished
+POLL_MS = 30
+
+
+class RenderPipeline:
+    def __init__(self, root, max_workers=None):
+        self.root = root
+        # as many threads as this machine's cores usefully run at once (see calibration.py)
+        max_workers = max_workers or calibration.setting("workers", min(4, os.cpu_count() or 1))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chart-render")
+        # graph window -> the image labels shown in it
+        self.labels = {}
+
+    def submit(self, graph_window, build_figure, description):
+        # render build_figure() in the background and show it in graph_window, description is used for the
+        # placeholder and any error message e.g. "histogram of Size"
+        placeholder = tk.Label(graph_window, text=f"Rendering {description}...", width=60, height=12,
+                               relief=tk.GROOVE)
+        placeholder.pack(padx=5, pady=5)
+        if graph_window not in self.labels:
+            self.labels[graph_window] = []
+            # forget the window's labels when it is closed, <Destroy> also fires for every child widget so the handler
+            # checks it is the window itself
+            graph_window.bind("<Destroy>", lambda event, window=graph_window: self._on_destroy(event, window),
+                              add="+")
+        self.labels[graph_window].append(placeholder)
+        # timed per chart type, e.g. chart.histogram (see latency.py)
+        name = "chart." + description.split(" of ")[0].replace(" ", "_")
+        future = self.executor.submit(self.render_png, build_figure, name)
+        self.root.after(POLL_MS, self._poll, future, placeholder, description)
+        return future
+
+    def clear(self, graph_window):
+        # remove the images from a window that is about to be drawn into again, the window keeps its (now empty) entry
+        # so <Destroy> isnt bound again on the next submit
+        for label in self.labels.get(graph_window, []):
+            if label.winfo_exists():
+                label.destroy()
+        if graph_window in self.labels:
+            self.labels[graph_window] = []
+
+    def _on_destroy(self, event, graph_window):
+        if event.widget is graph_window:
+            self.labels.pop(graph_window, None)
+
+    @staticmethod
+    def render_png(build_figure, name="chart"):
+        # runs on a worker thread, build the figure and rasterise it with Agg, with --profile each render is profiled
+        # under the chart's name (the @profiled graph methods only see the tk side, which just submits this)
+        with measure(name), profiling.profile(name, wait=True):
+            fig = build_figure()
+            FigureCanvasAgg(fig)
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png")
+            return buffer.getvalue()
+
+    def _poll(self, future, placeholder, description):
+        if not future.done():
+            self.root.after(POLL_MS, self._poll, future, placeholder, description)
+            return
+        if not placeholder.winfo_exists():
+            # the window was closed before the chart finished
+            return
+        try:
+            png = future.result()
+        except Exception as e:
+            placeholder.config(text=f"An error occurred while creating the {description}: {str(e)}", fg="red")
+            logger.error(f"An error occurred while creating the {description}: {str(e)}")
+            return
+        image = tk.PhotoImage(data=base64.b64encode(png))
+        # width/height were in text units for the placeholder, 0 lets the label fit the image
+        placeholder.config(image=image, text="", width=0, height=0, relief=tk.FLAT)
+        # tk doesnt hold a reference to the image so the label has to
+        placeholder.image = image
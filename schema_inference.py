@@ -0,0 +1,144 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+"""
+Memory compact dtypes for loaded data
+read_csv gives every decimal column float64, every whole number int64 and every text column a python object per cell,
+which is a lot of memory for what the files actually hold (banana_quality is 7 sig fig floats and a Good/Bad column)
+compact_dtypes() goes over the columns once after loading:
+- floats become float32 if every value survives the round trip to float32 within float_rtol (a relative error of 1e-6
+  is about what 7 significant figures need), otherwise they stay float64
+- ints are shrunk to the smallest int type that holds their range
+- text columns with few distinct values compared to their length become category (dictionary encoded in the Arrow
+  cache too), free text like names is left alone
+it hands back the new DataFrame and a report of the memory saved per column
+append_rows() adds rows parsed later (e.g. appended to the file) without losing those dtypes, AppendedRows does the same
+for rows that keep arriving a few at a time, each lot is only cast when it comes in and they are all joined on in one
+concat when the whole DataFrame is needed, so an append costs as much as the rows it adds rather than the whole dataset
+"""
+
+FLOAT_RTOL = 1e-6
+# a text column becomes a category when it has fewer distinct values than this share of its rows
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _float_fits_float32(values, rtol):
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return True
+    # anything past float32's range cant be stored at all
+    if np.abs(finite).max() > np.finfo(np.float32).max:
+        return False
+    round_trip = finite.astype(np.float32).astype(np.float64)
+    return bool(np.all(np.abs(round_trip - finite) <= rtol * np.abs(finite)))
+
+
+def compact_dtypes(df, float_rtol=FLOAT_RTOL, category_max_ratio=CATEGORY_MAX_RATIO):
+    # returns (compacted DataFrame, report) where report is {column: (old dtype, new dtype, bytes before, bytes after)}
+    before = df.memory_usage(deep=True, index=False)
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        dtype = series.dtype
+        if pd.api.types.is_bool_dtype(dtype):
+            pass
+        elif pd.api.types.is_float_dtype(dtype):
+            if dtype == np.float64 and _float_fits_float32(series.to_numpy(), float_rtol):
+                series = series.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(dtype):
+            series = pd.to_numeric(series, downcast="integer")
+        elif dtype == object or pd.api.types.is_string_dtype(dtype):
+            # only text columns that repeat a lot are worth a category, the check uses the hash table pandas builds
+            # anyway so it is a single pass
+            unique = series.nunique(dropna=True)
+            if len(series) and unique < category_max_ratio * len(series):
+                series = series.astype("category")
+        columns[column] = series
+
+    compacted = pd.DataFrame(columns, index=df.index)
+    after = compacted.memory_usage(deep=True, index=False)
+    report = {column: (str(df[column].dtype), str(compacted[column].dtype), int(before[column]), int(after[column]))
+              for column in df.columns}
+    return compacted, report
+
+
+def log_report(report, name=""):
+    # log the memory saved per column and the total
+    total_before = sum(row[2] for row in report.values())
+    total_after = sum(row[3] for row in report.values())
+    for column, (old_dtype, new_dtype, bytes_before, bytes_after) in report.items():
+        if old_dtype != new_dtype:
+            logger.info(f"{name} {column}: {old_dtype} -> {new_dtype}, {bytes_before / 1024:.1f} KB -> "
+                        f"{bytes_after / 1024:.1f} KB")
+    if total_after:
+        logger.info(f"{name} memory: {total_before / 1024 / 1024:.2f} MB -> {total_after / 1024 / 1024:.2f} MB "
+                    f"({total_before / total_after:.1f}x smaller)")
+
+
+def conform_rows(dtypes, rows):
+    # rows cast to dtypes ({column: dtype}) wherever nothing is lost, a categorical dtype in dtypes is replaced with
+    # one that has rows' new labels added to its categories, anything that doesnt fit is left for pandas to upcast
+    rows = rows.copy()
+    for column in rows.columns:
+        dtype = dtypes.get(column)
+        new = rows[column]
+        if dtype is None:
+            continue
+        if isinstance(dtype, pd.CategoricalDtype):
+            extra = pd.Index(new.dropna().unique()).difference(dtype.categories)
+            if len(extra):
+                dtype = dtypes[column] = pd.CategoricalDtype(dtype.categories.append(extra), ordered=dtype.ordered)
+            rows[column] = new.astype(dtype)
+        elif pd.api.types.is_bool_dtype(dtype) or not pd.api.types.is_numeric_dtype(new) \
+                or pd.api.types.is_bool_dtype(new.dtype):
+            pass
+        elif dtype == np.float32:
+            if _float_fits_float32(new.to_numpy(dtype=np.float64), FLOAT_RTOL):
+                rows[column] = new.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(dtype) and pd.api.types.is_integer_dtype(new.dtype):
+            info = np.iinfo(dtype)
+            if len(new) == 0 or (new.min() >= info.min and new.max() <= info.max):
+                rows[column] = new.astype(dtype)
+    return rows
+
+
+class AppendedRows:
+    # rows being added to the end of a DataFrame a lot at a time, e.g. a csv that is still being written to
+    def __init__(self, df):
+        self.df = df
+        # the dtypes the rows are cast to, categories grow as new labels turn up
+        self.dtypes = dict(df.dtypes)
+        # rows added since the last frame(), already cast
+        self.chunks = []
+
+    def add(self, rows):
+        # cast the rows and keep them for the next frame(), returns the cast rows
+        rows = conform_rows(self.dtypes, rows)
+        self.chunks.append(rows)
+        return rows
+
+    def frame(self):
+        # the DataFrame with everything added so far on the end
+        if self.chunks:
+            frames = [self.df] + self.chunks
+            # the earlier pieces have fewer categories than the last, they all need the same ones or concat gives up
+            # and makes the column object
+            for column, dtype in self.dtypes.items():
+                if isinstance(dtype, pd.CategoricalDtype):
+                    frames = [frame if frame[column].dtype == dtype
+                              else frame.assign(**{column: frame[column].astype(dtype)}) for frame in frames]
+            self.df = pd.concat(frames, ignore_index=True)
+            self.chunks = []
+        return self.df
+
+
+def append_rows(df, rows):
+    # df with rows added on the end, rows are cast to df's dtypes wherever nothing is lost (new labels are added to the
+    # categories) so the result stays compact, if they dont fit pandas upcasts the column like it normally would
+    appended = AppendedRows(df)
+    appended.add(rows)
+    return appended.frame()
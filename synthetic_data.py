@@ -0,0 +1,231 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+"""
+Synthetic data for testing at scale, everything was only ever tried on the 16k rows of banana_quality.csv
+generate_bananas() makes banana_quality shaped rows (the csv columns, so they load/sync like the real file) and
+generate_rdms() rdm shaped ones, both a chunk at a time as Arrow record batches so any number of rows can be streamed
+with the memory of one chunk, every column of a chunk is drawn in one numpy/Arrow call so it runs at millions of rows a
+second (writing the file is the slow part, Arrow's csv writer is still a few million rows a second)
+the banana distribution is fitted from the real file (fit_bananas):
+- "fitted" (default) draws each Quality class from a multivariate normal with that class's means and covariance, so the
+  spread, the correlations between the columns and the Good/Bad split all match the real data
+- "independent" uses each column's own mean/std with no correlation, "uniform" spreads each column evenly over its
+  real min..max
+the rdm table has no real data to fit, its services/ports/types/availability are drawn from RDM_* below
+write_csv()/write_parquet() stream the batches to a file, load_bananas()/load_rdms() bulk load them through
+DatabaseHandler (COPY on postgres), e.g.
+    python synthetic_data.py bananas 10000000 --output bananas_10m.parquet
+    python synthetic_data.py rdm 1000000 --database-url sqlite:///synthetic.db
+"""
+
+BANANA_TEMPLATE = "banana_quality.csv"
+BANANA_COLUMNS = ["Size", "Weight", "Sweetness", "Softness", "HarvestTime", "Ripeness", "Acidity"]
+QUALITIES = ["Bad", "Good"]
+DISTRIBUTIONS = ("fitted", "independent", "uniform")
+CHUNK_ROWS = 1_000_000
+
+RDM_SERVICES = ["auth", "billing", "inventory", "search", "reporting", "gateway", "scheduler", "storage"]
+RDM_SERVICE_TYPES = ["web", "database", "cache", "queue", "auth", "storage"]
+# (port, chance)
+RDM_PORTS = [(80, 0.3), (443, 0.3), (5432, 0.15), (6379, 0.1), (8080, 0.1), (22, 0.05)]
+RDM_AVAILABILITY = [("available", 0.85), ("degraded", 0.1), ("unavailable", 0.05)]
+
+
+def clean_bananas(df):
+    # the rows worth fitting to, the bundled csv ends in test rows (12,12,12..., 69696969,...) with a made up Quality
+    # that would drag the means/ranges miles off
+    numeric = df[BANANA_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    valid = df["Quality"].isin(QUALITIES) & np.isfinite(numeric).all(axis=1)
+    cleaned = df[valid].copy()
+    cleaned[BANANA_COLUMNS] = numeric[valid].astype(np.float64)
+    return cleaned
+
+
+def fit_bananas(df):
+    # the statistics generate_bananas draws from, as a dict so it can be tweaked before generating
+    df = clean_bananas(df)
+    numeric = df[BANANA_COLUMNS]
+    quality = df["Quality"].astype(str)
+    profile = {"columns": BANANA_COLUMNS, "min": numeric.min().to_numpy(), "max": numeric.max().to_numpy(),
+               "mean": numeric.mean().to_numpy(), "std": numeric.std().to_numpy(), "classes": {}}
+    for label in QUALITIES:
+        rows = numeric[quality == label]
+        if len(rows) < 2:
+            continue
+        profile["classes"][label] = {
+            "share": len(rows) / len(numeric),
+            "mean": rows.mean().to_numpy(),
+            # the cholesky factor of the covariance turns independent normals into correlated ones
+            "cholesky": np.linalg.cholesky(np.cov(rows.to_numpy(), rowvar=False)
+                                           + np.eye(len(BANANA_COLUMNS)) * 1e-9),
+        }
+    return profile
+
+
+def banana_profile(template=BANANA_TEMPLATE):
+    return fit_bananas(pd.read_csv(template))
+
+
+def _choice(rng, values, count, chances=None):
+    # count values picked at random as an Arrow array, the picking is done on indexes so no python strings are made
+    indexes = rng.choice(len(values), size=count, p=chances)
+    return pc.take(pa.array(values), pa.array(indexes))
+
+
+def generate_bananas(rows, profile=None, distribution="fitted", good_share=None, seed=None, chunk_rows=CHUNK_ROWS,
+                     start_id=1):
+    # yield record batches of banana_quality shaped rows (the csv columns), rows in total
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution: {distribution}, expected one of {', '.join(DISTRIBUTIONS)}")
+    profile = profile or banana_profile()
+    if good_share is None:
+        good_share = profile["classes"].get("Good", {}).get("share", 0.5)
+    rng = np.random.default_rng(seed)
+    width = len(profile["columns"])
+    for start in range(0, rows, chunk_rows):
+        count = min(chunk_rows, rows - start)
+        good = rng.random(count) < good_share
+        if distribution == "fitted":
+            values = np.empty((count, width), dtype=np.float64)
+            for label, mask in (("Good", good), ("Bad", ~good)):
+                stats = profile["classes"][label]
+                normals = rng.standard_normal((int(mask.sum()), width))
+                values[mask] = normals @ stats["cholesky"].T + stats["mean"]
+        elif distribution == "independent":
+            values = rng.normal(profile["mean"], profile["std"], size=(count, width))
+        else:
+            values = rng.uniform(profile["min"], profile["max"], size=(count, width))
+        # the real file is 7 significant figures, float32 holds that (and is what the app compacts it to anyway)
+        values = values.astype(np.float32)
+        arrays = [pa.array(values[:, i]) for i in range(width)]
+        arrays.append(pc.take(pa.array(QUALITIES), pa.array(good.astype(np.int8))))
+        arrays.append(pa.array(np.arange(start_id + start, start_id + start + count, dtype=np.int64)))
+        yield pa.RecordBatch.from_arrays(arrays, names=profile["columns"] + ["Quality", "banana_id"])
+
+
+def generate_rdms(rows, seed=None, chunk_rows=CHUNK_ROWS, services=RDM_SERVICES, service_types=RDM_SERVICE_TYPES,
+                  ports=RDM_PORTS, availability=RDM_AVAILABILITY, instances=100):
+    # yield record batches of rdm shaped rows (no id, the table makes those), rows in total
+    rng = np.random.default_rng(seed)
+    port_values, port_chances = zip(*ports)
+    states, state_chances = zip(*availability)
+    for start in range(0, rows, chunk_rows):
+        count = min(chunk_rows, rows - start)
+        # e.g. billing-17, on a 10.x.x.x address
+        names = pc.binary_join_element_wise(_choice(rng, services, count),
+                                            pc.cast(pa.array(rng.integers(1, instances + 1, count)), pa.string()), "-")
+        octets = [pc.cast(pa.array(rng.integers(low, 255, count, dtype=np.int16)), pa.string())
+                  for low in (0, 0, 1)]
+        ip_addresses = pc.binary_join_element_wise(pa.array(["10"] * count, pa.string()), *octets, ".")
+        yield pa.RecordBatch.from_arrays([
+            names,
+            ip_addresses,
+            _choice(rng, list(port_values), count, np.array(port_chances) / sum(port_chances)),
+            _choice(rng, service_types, count),
+            _choice(rng, list(states), count, np.array(state_chances) / sum(state_chances)),
+        ], names=["service_name", "ip_address", "port", "service_type", "resource_availability"])
+
+
+def _write(batches, path, open_writer):
+    # stream batches to path through a writer, written next to it and renamed so a half written file never exists
+    temp_path = f"{path}.tmp"
+    writer = None
+    rows = 0
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = open_writer(temp_path, batch.schema)
+            writer.write(batch)
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError("No rows to write")
+    os.replace(temp_path, path)
+    return rows
+
+
+def write_csv(batches, path):
+    # returns the rows written
+    return _write(batches, path, pacsv.CSVWriter)
+
+
+def write_parquet(batches, path):
+    return _write(batches, path, pq.ParquetWriter)
+
+
+def write_file(batches, path):
+    # csv or parquet by the extension
+    if path.lower().endswith(".parquet"):
+        return write_parquet(batches, path)
+    return write_csv(batches, path)
+
+
+def load_bananas(db_handler, batches):
+    # add the rows to banana_quality a chunk at a time (staged and upserted like syncing a file), returns rows written
+    written = 0
+    for batch in batches:
+        written += db_handler.sync_bananas(batch.to_pandas(), delete_missing=False)[0]
+    return written
+
+
+def load_rdms(db_handler, batches):
+    return sum(db_handler.bulk_insert_rdms(batch.to_pandas()) for batch in batches)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic banana_quality or rdm data.")
+    parser.add_argument("table", choices=["bananas", "rdm"], help="which table's shape to generate")
+    parser.add_argument("rows", type=int, help="number of rows")
+    parser.add_argument("--output", help="csv or parquet file to write (by its extension)")
+    parser.add_argument("--database-url", help="bulk load the rows into this database instead")
+    parser.add_argument("--seed", type=int, default=None, help="random seed, for the same data every time")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="rows generated at a time")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="fitted", help="banana distribution")
+    parser.add_argument("--good-share", type=float, help="share of Good bananas (default the template's)")
+    parser.add_argument("--template", default=BANANA_TEMPLATE, help="the file the banana statistics are fitted from")
+    args = parser.parse_args(argv)
+    if not args.output and not args.database_url:
+        parser.error("give --output and/or --database-url")
+
+    logging.basicConfig(level=logging.INFO)
+
+    def batches():
+        if args.table == "bananas":
+            return generate_bananas(args.rows, banana_profile(args.template), args.distribution, args.good_share,
+                                    args.seed, args.chunk_rows)
+        return generate_rdms(args.rows, args.seed, args.chunk_rows)
+
+    if args.output:
+        start = time.perf_counter()
+        rows = write_file(batches(), args.output)
+        elapsed = time.perf_counter() - start
+        print(f"Wrote {rows} rows to {args.output} in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+    if args.database_url:
+        from database import DatabaseHandler
+        db_handler = DatabaseHandler(args.database_url)
+        # the statement log would be longer than the data
+        db_handler.engine.echo = False
+        start = time.perf_counter()
+        rows = load_bananas(db_handler, batches()) if args.table == "bananas" else load_rdms(db_handler, batches())
+        elapsed = time.perf_counter() - start
+        print(f"Loaded {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import json
+import logging
+import logging.handlers
+import os
+import shutil
+import tempfile
+import unittest
+
+import audit
+
+"""
+Tests for the audit log, every test writes to its own temp folder and shuts the writer thread down after
+"""
+
+
+class AuditTests(unittest.TestCase):
+    def setUp(self):
+        audit.shutdown()
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "audit.log")
+
+    def tearDown(self):
+        audit.shutdown()
+        shutil.rmtree(self.folder)
+
+    def read_lines(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def test_setup_twice_writes_each_event_once(self):
+        audit_logger = audit.setup(self.path)
+        # every window calls setup, only the first one adds a handler
+        self.assertIs(audit.setup(self.path), audit_logger)
+        audit.setup(self.path)
+        queue_handlers = [handler for handler in audit_logger.handlers
+                          if isinstance(handler, logging.handlers.QueueHandler)]
+        self.assertEqual(len(queue_handlers), 1)
+        audit_logger.info("User clicked 'Create' button")
+        audit.shutdown()
+        lines = self.read_lines()
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].endswith(" - User clicked 'Create' button"))
+
+    def test_events_are_written_off_the_calling_thread(self):
+        audit_logger = audit.setup(self.path)
+        self.assertTrue(any(isinstance(handler, logging.handlers.QueueHandler) for handler in audit_logger.handlers))
+        for i in range(500):
+            audit_logger.info(f"event {i}")
+        audit.shutdown()
+        self.assertEqual(self.read_lines()[-1].split(" - ")[1], "event 499")
+
+    def test_json_lines_can_be_queried(self):
+        audit_logger = audit.setup(self.path, json_lines=True)
+        audit_logger.info("User opened file: banana_quality.csv", extra={"audit": {"rows": 8000}})
+        audit_logger.info("User uploaded data to PostgreSQL")
+        audit.shutdown()
+        event = json.loads(self.read_lines()[0])
+        self.assertEqual(event["message"], "User opened file: banana_quality.csv")
+        self.assertEqual(event["rows"], 8000)
+        events = list(audit.read_events(self.path, contains="uploaded"))
+        self.assertEqual([event["message"] for event in events], ["User uploaded data to PostgreSQL"])
+        self.assertEqual(list(audit.read_events(self.path, since="2999-01-01")), [])
+
+    def test_rotation_keeps_the_events_in_order(self):
+        audit_logger = audit.setup(self.path, max_bytes=2000, backup_count=20, fsync_every=10)
+        for i in range(200):
+            audit_logger.info(f"event {i}")
+        audit.shutdown()
+        files = audit.audit_files(self.path)
+        self.assertGreater(len(files), 1)
+        self.assertTrue(all(os.path.getsize(name) <= 2000 for name in files))
+        messages = [event["message"] for event in audit.read_events(self.path)]
+        self.assertEqual(messages, [f"event {i}" for i in range(200)])
+
+    def test_plain_lines_parse(self):
+        event = audit.parse_line("2024-03-01 12:00:00,123 - User clicked 'Visualize' button")
+        self.assertEqual(event, {"time": "2024-03-01 12:00:00.123", "message": "User clicked 'Visualize' button"})
+
+
+if __name__ == '__main__':
+    unittest.main()
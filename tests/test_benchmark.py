@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import benchmark
+
+"""
+Tests for the benchmark harness, the suite itself takes minutes so it only runs with RUN_BENCHMARKS=1 set, e.g.
+    RUN_BENCHMARKS=1 python -m pytest tests/test_benchmark.py
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class BenchTests(unittest.TestCase):
+    def test_rounds_and_setup(self):
+        calls = []
+        bench = benchmark.Bench(rounds=3)
+        result = bench(lambda x: x * 2, 21, setup=lambda: calls.append(1))
+        self.assertEqual(result, 42)
+        # the warm up isnt timed but is set up like the rounds
+        self.assertEqual(len(calls), 4)
+        stats = bench.stats()
+        self.assertEqual(stats["rounds"], 3)
+        self.assertLessEqual(stats["min"], stats["median"])
+        self.assertLessEqual(stats["median"], stats["max"])
+
+    def test_time_budget_stops_early(self):
+        bench = benchmark.Bench(rounds=1000, max_seconds=0.05, warmup=False)
+        bench(lambda: sum(range(200000)))
+        self.assertLess(bench.stats()["rounds"], 1000)
+
+
+class ResultsTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_compare(self):
+        old = {"results": [{"benchmark": "csv_load_cold", "dataset": "vgsales", "median": 0.2},
+                           {"benchmark": "chart_heatmap", "dataset": "vgsales", "median": 0.1},
+                           {"benchmark": "db_resync", "dataset": "vgsales", "skipped": "not banana_quality shaped"}]}
+        new = {"results": [{"benchmark": "csv_load_cold", "dataset": "vgsales", "median": 0.1},
+                           {"benchmark": "chart_heatmap", "dataset": "vgsales", "median": 0.15}]}
+        rows = benchmark.compare(old, new)
+        self.assertEqual([(row[0], round(row[4])) for row in rows], [("chart_heatmap", 50), ("csv_load_cold", -50)])
+
+    def test_save_and_find(self):
+        path = benchmark.save([{"benchmark": "dtype_inference", "dataset": "vgsales", "median": 0.01}], self.folder)
+        data = benchmark.load_run(path)
+        self.assertEqual(data["results"][0]["benchmark"], "dtype_inference")
+        if data["commit"]:
+            self.assertEqual(benchmark.find_run(data["commit"][:7], self.folder), path)
+        with self.assertRaises(FileNotFoundError):
+            benchmark.find_run("not-a-commit", self.folder)
+
+    def test_synthetic_bananas(self):
+        path = benchmark.synthetic_bananas(2500, os.path.join(self.folder, "bananas.csv"),
+                                           template=os.path.join(ROOT, "banana_quality.csv"), chunk_rows=1000)
+        data = benchmark.pd.read_csv(path)
+        self.assertEqual(len(data), 2500)
+        self.assertEqual(list(data["banana_id"]), list(range(1, 2501)))
+        self.assertEqual(set(data["Quality"]), {"Good", "Bad"})
+
+
+@unittest.skipUnless(os.environ.get("RUN_BENCHMARKS"), "set RUN_BENCHMARKS=1 to run the benchmark suite")
+class BenchmarkSuiteTests(unittest.TestCase):
+    def test_suite_on_the_bundled_datasets(self):
+        folder = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        try:
+            os.chdir(ROOT)
+            results = benchmark.run(rounds=1, folder=folder)
+            path = benchmark.save(results, folder)
+        finally:
+            os.chdir(cwd)
+        errors = [result for result in results if "error" in result]
+        self.assertEqual(errors, [])
+        timed = {(result["benchmark"], result["dataset"]) for result in results if "median" in result}
+        self.assertIn(("db_bulk_insert", "banana_quality"), timed)
+        self.assertIn(("chart_heatmap", "vgsales"), timed)
+        self.assertTrue(os.path.exists(path))
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import calibration
+
+"""
+Tests for the hardware calibration, the full run takes a couple of seconds
+"""
+
+
+class TuneTests(unittest.TestCase):
+    def test_settings_from_results(self):
+        settings = calibration.tune({"csv_rows_s": 1_234_567, "gemm_gflops": 40.0,
+                                     "thread_scaling": {"1": 100.0, "2": 190.0, "4": 260.0, "8": 270.0}})
+        self.assertEqual(settings["csv_chunk_rows"], 300_000)
+        # 4 threads get over 90% of the best, 8 dont add enough
+        self.assertEqual(settings["workers"], 4)
+        self.assertEqual(calibration.tune({"csv_rows_s": 10.0})["csv_chunk_rows"], calibration.MIN_CHUNK_ROWS)
+        self.assertEqual(calibration.tune({}), {})
+
+
+class CalibrateTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "calibration.json")
+
+    def tearDown(self):
+        calibration._settings = None
+        shutil.rmtree(self.folder)
+
+    def test_calibrate_is_cached(self):
+        first = calibration.calibrate(self.folder, path=self.path)
+        for name in ("gemm_gflops", "memory_gb_s", "thread_scaling", "csv_rows_s", "file_io", "db_round_trip_s"):
+            self.assertIn(name, first["results"])
+        self.assertGreater(first["results"]["gemm_gflops"], 0)
+        self.assertGreaterEqual(first["settings"]["workers"], 1)
+        # only the cache and the json are left in the folder
+        self.assertEqual(os.listdir(self.folder), ["calibration.json"])
+        self.assertEqual(calibration.calibrate(self.folder, path=self.path)["time"], first["time"])
+        self.assertEqual(calibration.setting("workers"), first["settings"]["workers"])
+        self.assertTrue(calibration.describe(first))
+
+    def test_other_machines_calibration_isnt_used(self):
+        calibration.save({"fingerprint": dict(calibration.fingerprint(), cpus=-1), "time": "2024-01-01T00:00:00",
+                          "results": {}, "settings": {}}, self.path)
+        self.assertIsNone(calibration.load(self.path))
+        with open(self.path) as f:
+            self.assertEqual(json.load(f)["fingerprint"]["cpus"], -1)
+
+    def test_mlp_batch_size(self):
+        calibration._settings = {}
+        self.assertEqual(calibration.mlp_batch_size(7, (150, 75, 25), 8000), "auto")
+        calibration._settings = {"gemm_gflops": 20.0}
+        batch_size = calibration.mlp_batch_size(7, (150, 75, 25), 8000)
+        self.assertEqual(batch_size & (batch_size - 1), 0)
+        self.assertGreaterEqual(batch_size, calibration.MIN_BATCH_SIZE)
+        self.assertEqual(calibration.mlp_batch_size(7, (150, 75, 25), 40), 40)
+
+
+if __name__ == '__main__':
+    unittest.main()
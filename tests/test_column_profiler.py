@@ -0,0 +1,75 @@
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from column_profiler import ColumnProfiler
+
+"""
+Tests for the column profiler behind the graph suggestions
+"""
+
+# 100ms target x 2.5 for slower machines (about 90ms measured on a desktop), see test_million_rows
+MILLION_ROWS_SECONDS = 0.25
+
+
+class ColumnProfilerTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        x = rng.normal(size=5000)
+        self.data = pd.DataFrame({
+            'x': x,
+            'y': 2 * x + rng.normal(scale=0.1, size=5000),
+            'skewed': rng.exponential(size=5000),
+            'quality': rng.choice(['Good', 'Bad'], size=5000),
+            'rating': rng.integers(1, 6, size=5000),
+        })
+        self.data.loc[:499, 'skewed'] = np.nan
+
+    # the basic stats should match what pandas works out
+    def test_numeric_profile(self):
+        profile = ColumnProfiler().profile(self.data, ['x', 'skewed'])
+        self.assertAlmostEqual(profile['x']['mean'], self.data['x'].mean())
+        self.assertAlmostEqual(profile['skewed']['null_ratio'], 0.1)
+        self.assertAlmostEqual(profile['skewed']['skew'], self.data['skewed'].skew(), places=2)
+        self.assertEqual(profile['x']['kind'], 'numeric')
+
+    # strings and small integer ranges are categories
+    def test_categorical_detection(self):
+        profile = ColumnProfiler().profile(self.data, ['quality', 'rating'])
+        self.assertEqual(profile['quality']['kind'], 'categorical')
+        self.assertEqual(profile['quality']['unique'], 2)
+        self.assertEqual(profile['rating']['kind'], 'categorical')
+
+    # x and y are strongly correlated so a scatter plot should be recommended
+    def test_recommendations(self):
+        charts, suggestions = ColumnProfiler().recommend(self.data, ['x', 'y'])
+        self.assertIn("scatter plot", charts)
+        self.assertTrue(any("strong positive correlation" in suggestion for suggestion in suggestions))
+
+    # profiles are cached per column until the data changes
+    def test_cache(self):
+        profiler = ColumnProfiler()
+        first = profiler.profile(self.data, ['x'])['x']
+        self.assertIs(profiler.profile(self.data, ['x', 'y'])['x'], first)
+        profiler.invalidate(['x'])
+        self.assertIsNot(profiler.profile(self.data, ['x'])['x'], first)
+
+    # the target is 100ms for a million rows over a few columns on a desktop, the bound here is 2.5x that because
+    # shared CI runners are that much slower, it is the best of 3 warm runs (each with an empty cache) so the first
+    # call's one-off numpy/pandas setup isnt counted
+    def test_million_rows(self):
+        rng = np.random.default_rng(1)
+        data = pd.DataFrame(rng.normal(size=(1_000_000, 4)), columns=['a', 'b', 'c', 'd'])
+        ColumnProfiler().recommend(data, ['a', 'b', 'c', 'd'])
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            ColumnProfiler().recommend(data, ['a', 'b', 'c', 'd'])
+            times.append(time.perf_counter() - start)
+        self.assertLess(min(times), MILLION_ROWS_SECONDS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import pandas as pd
+
+from csv_reader import read_csv, read_csv_chunked, LoadCancelled
+
+"""
+Tests for the multithreaded csv reader, threshold=0 and a small block size force the arrow path on small files so the
+result can be compared with pandas
+"""
+
+
+class ReadCsvTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    # the test csv comes out the same as pd.read_csv, split over many blocks
+    def test_matches_pandas(self):
+        path = os.path.join(os.path.dirname(__file__), "banana_quality.csv")
+        pd.testing.assert_frame_equal(read_csv(path, threshold=0, block_size=64 * 1024), pd.read_csv(path))
+
+    # dates stay text, empty strings are missing and an empty column is float64 like pandas
+    def test_pandas_dtypes(self):
+        path = os.path.join(self.folder, "dates.csv")
+        with open(path, "w") as f:
+            f.write("Name,Released,Empty,Year\nWii Sports,2006-11-19,,2006\n,2008-04-27,,N/A\n")
+        pd.testing.assert_frame_equal(read_csv(path, threshold=0), pd.read_csv(path))
+
+    # something arrow cant handle (a quoted newline) still loads through pandas
+    def test_fallback(self):
+        path = os.path.join(self.folder, "quoted.csv")
+        with open(path, "w") as f:
+            f.write('Name,Year\n"two\nlines",2006\nplain,2007\n')
+        pd.testing.assert_frame_equal(read_csv(path, threshold=0), pd.read_csv(path))
+
+    # reading a piece at a time gives the same frame, with progress after each piece and the first piece as the preview
+    def test_chunked(self):
+        path = os.path.join(os.path.dirname(__file__), "banana_quality.csv")
+        reports = []
+        for threshold in (0, float("inf")):
+            df = read_csv_chunked(path, progress=lambda *report: reports.append(report), threshold=threshold,
+                                  block_size=64 * 1024, chunk_rows=3000)
+            pd.testing.assert_frame_equal(df, pd.read_csv(path))
+            self.assertEqual(reports[-1][2], len(df))
+            self.assertIsNotNone(reports[0][3])
+            self.assertTrue(all(report[3] is None for report in reports[1:]))
+            reports.clear()
+
+    def test_chunked_cancel(self):
+        path = os.path.join(os.path.dirname(__file__), "banana_quality.csv")
+        cancel = threading.Event()
+        cancel.set()
+        with self.assertRaises(LoadCancelled):
+            read_csv_chunked(path, cancel=cancel, threshold=float("inf"), chunk_rows=1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
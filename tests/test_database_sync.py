@@ -0,0 +1,64 @@
+import os
+import time
+import unittest
+
+import pandas as pd
+from sqlalchemy import select
+
+from database import DatabaseHandler
+from models import Banana
+
+"""
+Tests for syncing a csv into banana_quality, uses an in memory sqlite database like the other database tests, the
+COPY path is postgres only so only the executemany staging is covered here
+"""
+
+
+def bananas(rows):
+    columns = ["Size", "Weight", "Sweetness", "Softness", "HarvestTime", "Ripeness", "Acidity", "Quality", "banana_id"]
+    return pd.DataFrame(rows, columns=columns)
+
+
+class SyncBananasTests(unittest.TestCase):
+    def setUp(self):
+        self.db_handler = DatabaseHandler("sqlite:///:memory:")
+        self.first = bananas([[1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, "Good", 1],
+                              [1.5, 2.5, 3.5, 4.5, 5.5, 6.5, 7.5, "Bad", 2]])
+
+    def rows(self):
+        with self.db_handler.Session(self.db_handler.engine) as session:
+            return {banana.banana_id: banana for banana in session.scalars(select(Banana))}
+
+    # syncing the same file twice writes nothing the second time
+    def test_resync_writes_nothing(self):
+        self.assertEqual(self.db_handler.sync_bananas(self.first), (2, 0))
+        self.assertEqual(self.db_handler.sync_bananas(self.first), (0, 0))
+
+    # a changed row is updated, a new one inserted and a missing one deleted
+    def test_changes(self):
+        self.db_handler.sync_bananas(self.first)
+        second = bananas([[1.5, 2.5, 3.5, 4.5, 5.5, 6.5, 7.5, "Good", 2],
+                          [9.0, 9.0, 9.0, 9.0, 9.0, 9.0, 9.0, "Bad", 3]])
+        self.assertEqual(self.db_handler.sync_bananas(second), (2, 1))
+        rows = self.rows()
+        self.assertEqual(sorted(rows), [2, 3])
+        self.assertEqual(rows[2].quality, "Good")
+
+    # resyncing the whole bundled file with nothing changed should be quick, the staging table is indexed so the
+    # delete of missing rows isnt a nested loop (it took 9s before)
+    def test_resync_of_the_bundled_file_is_quick(self):
+        data = pd.read_csv(os.path.join(os.path.dirname(__file__), "banana_quality.csv"))
+        data = data[data["Quality"].isin(["Good", "Bad"])].drop_duplicates("banana_id")
+        self.db_handler.engine.echo = False
+        self.db_handler.sync_bananas(data)
+        start = time.perf_counter()
+        self.assertEqual(self.db_handler.sync_bananas(data), (0, 0))
+        self.assertLess(time.perf_counter() - start, 2.0)
+
+    def test_missing_column(self):
+        with self.assertRaises(ValueError):
+            self.db_handler.sync_bananas(self.first.drop(columns=["banana_id"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
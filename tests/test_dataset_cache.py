@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from data_loader import load_csv
+from dataset_cache import DatasetCache, file_fingerprint
+from schema_inference import AppendedRows
+
+"""
+Tests for the Arrow dataset cache, each test works on a copy of the test csv in a temp folder
+"""
+
+
+class DatasetCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.folder, "banana_quality.csv")
+        shutil.copy(os.path.join(os.path.dirname(__file__), "banana_quality.csv"), self.csv_path)
+        self.cache = DatasetCache(os.path.join(self.folder, "cache"))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    # the second load comes from the cache and matches what pandas parsed
+    def test_round_trip(self):
+        first = load_csv(self.csv_path, self.cache)
+        self.assertTrue(self.cache.contains(self.csv_path))
+        second = self.cache.get(self.csv_path)
+        pd.testing.assert_frame_equal(first, second)
+
+    # only the requested columns come back
+    def test_column_selection(self):
+        load_csv(self.csv_path, self.cache)
+        df = self.cache.get(self.csv_path, columns=["Size", "Quality"])
+        self.assertEqual(list(df.columns), ["Size", "Quality"])
+
+    # changing the file means the old entry isnt used and is cleaned up when the new one is written
+    def test_changed_file_invalidates(self):
+        load_csv(self.csv_path, self.cache)
+        with open(self.csv_path, "a") as f:
+            f.write("1,2,3,4,5,6,7,Good,999999\n")
+        self.assertIsNone(self.cache.get(self.csv_path))
+        df = load_csv(self.csv_path, self.cache)
+        self.assertEqual(df["banana_id"].iloc[-1], 999999)
+        self.assertEqual(len(os.listdir(self.cache.cache_dir)), 1)
+
+
+    # appended rows are written on their own next to the cached copy, until there are as many as it had to begin with
+    # and it is all written back into one file
+    def test_appended_rows(self):
+        since = file_fingerprint(self.csv_path)
+        data = load_csv(self.csv_path, self.cache)
+        first_file = self.cache.cache_path(self.csv_path)
+        first_written = os.stat(first_file).st_mtime_ns
+        appended = AppendedRows(data)
+
+        row = pd.DataFrame([[1.5, 2, 3, 4, 5, 6, 7, "Unripe", 20001]], columns=data.columns)
+        for _ in range(2):
+            with open(self.csv_path, "a") as f:
+                f.write("1.5,2,3,4,5,6,7,Unripe,20001\n")
+            fingerprint = file_fingerprint(self.csv_path)
+            self.assertTrue(self.cache.append(self.csv_path, [appended.add(row)], since, fingerprint))
+            since = fingerprint
+        self.assertEqual(os.stat(first_file).st_mtime_ns, first_written)
+        pd.testing.assert_frame_equal(self.cache.get(self.csv_path), appended.frame())
+
+        rows = pd.concat([row] * len(data), ignore_index=True)
+        with open(self.csv_path, "a") as f:
+            f.write("1.5,2,3,4,5,6,7,Unripe,20001\n" * len(data))
+        self.assertTrue(self.cache.append(self.csv_path, [appended.add(rows)], since, file_fingerprint(self.csv_path)))
+        self.assertEqual(os.listdir(self.cache.cache_dir), [os.path.basename(self.cache.cache_path(self.csv_path))])
+        pd.testing.assert_frame_equal(self.cache.get(self.csv_path), appended.frame())
+
+
+if __name__ == '__main__':
+    unittest.main()
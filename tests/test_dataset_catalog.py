@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from dataset_cache import DatasetCache
+from dataset_catalog import DatasetCatalog
+from schema_inference import AppendedRows
+
+"""
+Tests for the dataset catalog, uses two copies of the test csv in a temp folder
+"""
+
+
+class DatasetCatalogTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        source = os.path.join(os.path.dirname(__file__), "banana_quality.csv")
+        self.first = os.path.join(self.folder, "first.csv")
+        self.second = os.path.join(self.folder, "second.csv")
+        shutil.copy(source, self.first)
+        shutil.copy(source, self.second)
+        self.cache = DatasetCache(os.path.join(self.folder, "cache"))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    # registering doesnt load anything, the first get does and the second is the same object
+    def test_lazy_and_resident(self):
+        catalog = DatasetCatalog(self.cache)
+        catalog.register(self.first)
+        self.assertEqual(catalog.names(), ["first.csv"])
+        self.assertFalse(catalog.is_resident(self.first))
+        df = catalog.get(self.first)
+        self.assertIs(catalog.get(self.first), df)
+
+    # over the budget the least recently used dataset is dropped and comes back from the cache
+    def test_eviction(self):
+        catalog = DatasetCatalog(self.cache, memory_budget=1)
+        catalog.get(self.first)
+        catalog.get(self.second)
+        self.assertFalse(catalog.is_resident(self.first))
+        self.assertTrue(catalog.is_resident(self.second))
+        self.assertTrue(self.cache.contains(self.first))
+        self.assertEqual(len(catalog.get(self.first)), len(catalog.get(self.second)))
+
+
+    # growing a dataset only adds the new rows' memory, which comes to what measuring the grown one gives
+    def test_grow(self):
+        catalog = DatasetCatalog(self.cache)
+        df = catalog.get(self.first)
+        appended = AppendedRows(df)
+        rows = appended.add(df.head(100))
+        catalog.grow(self.first, rows)
+        grown = appended.frame()
+        self.assertIs(catalog.get(self.first), df)
+        self.assertEqual(catalog.memory_usage(), int(grown.memory_usage(deep=True).sum()))
+
+
+if __name__ == '__main__':
+    unittest.main()
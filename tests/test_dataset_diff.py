@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from dataset_diff import diff_files
+
+"""
+Tests for the dataset diff, the files are small csvs written to a temp folder
+"""
+
+HEADER = "Size,Weight,Quality,banana_id\n"
+
+
+class DatasetDiffTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write(self, name, text):
+        path = os.path.join(self.folder, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    # one row of each kind, a small chunk size so the rows are spread over several chunks
+    def test_inserted_deleted_modified(self):
+        old = self.write("old.csv", HEADER + "1.5,2,Good,1\n2.5,3,Bad,2\n3.5,4,Good,3\n4.5,5,Good,4\n")
+        new = self.write("new.csv", HEADER + "1.5,2,Good,1\n2.5,3,Good,2\n4.5,5.0,Good,4\n5.5,6,Bad,5\n")
+        diff = diff_files(old, new, chunk_rows=2, partitions=3)
+        self.assertEqual(list(diff.inserted["banana_id"]), [5])
+        self.assertEqual(list(diff.deleted_keys), [3])
+        self.assertEqual(list(diff.modified["banana_id"]), [2])
+        self.assertEqual(diff.modified["Quality"].iloc[0], "Good")
+        self.assertEqual(sorted(diff.upserts()["banana_id"]), [2, 5])
+
+    # a file without banana_id is keyed on its row number
+    def test_row_number_key(self):
+        old = self.write("old.csv", "Size,Weight,Quality\n1.5,2,Good\n2.5,3,Bad\n")
+        new = self.write("new.csv", HEADER + "2.5,3,Bad,2\n")
+        diff = diff_files(old, new)
+        self.assertEqual(list(diff.deleted_keys), [1])
+        self.assertTrue(diff.modified.empty and diff.inserted.empty)
+
+    # the same file has no differences
+    def test_same_file(self):
+        path = os.path.join(os.path.dirname(__file__), "banana_quality.csv")
+        self.assertTrue(diff_files(path, path).is_empty())
+
+    def test_duplicate_keys(self):
+        old = self.write("old.csv", HEADER + "1.5,2,Good,1\n2.5,3,Bad,1\n")
+        with self.assertRaises(ValueError):
+            diff_files(old, old)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from encoding_detection import EncodingDetector
+
+"""
+Tests for the sampled encoding detection, the files are written to a temp folder
+"""
+
+
+class EncodingDetectorTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        # small samples so the test files dont have to be big to have a start, middle and end
+        self.detector = EncodingDetector(sample_bytes=1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write(self, name, data):
+        path = os.path.join(self.folder, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    # a file that is utf-8 all the way through, with a multi byte character where the samples are cut
+    def test_utf8(self):
+        path = self.write("utf8.csv", "Name,Price\n".encode() + "Pokémon,1\n".encode() * 2000)
+        self.assertEqual(self.detector.detect(path), "utf-8")
+
+    def test_bom(self):
+        path = self.write("bom.csv", "Name,Price\nPokémon,1\n".encode("utf-8-sig"))
+        self.assertEqual(self.detector.detect(path), "utf-8-sig")
+
+    # not utf-8 so chardet is asked, on the samples
+    def test_not_utf8(self):
+        path = self.write("latin.csv", "Name,Price\n".encode() + "Pokémon café,1\n".encode("latin-1") * 2000)
+        self.assertNotIn(self.detector.detect(path), ("utf-8", "ascii", None))
+
+    # the answer is remembered until the file changes
+    def test_cached_per_fingerprint(self):
+        path = self.write("cached.csv", b"Name,Price\nWii,1\n")
+        self.detector.detect(path)
+        self.assertEqual(len(self.detector.known), 1)
+        self.detector.detect(path)
+        self.assertEqual(len(self.detector.known), 1)
+        with open(path, "ab") as f:
+            f.write(b"DS,2\n")
+        self.detector.detect(path)
+        self.assertEqual(len(self.detector.known), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from dataset_cache import DatasetCache
+from excel_loader import ExcelWorkbook
+
+"""
+Tests for the Excel loader, uses the housing price workbook from the tests folder
+"""
+
+
+class ExcelWorkbookTests(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(os.path.dirname(__file__), "housing_price_dataset.xlsx")
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    # the streamed sheet should match what read_excel gives
+    def test_matches_read_excel(self):
+        workbook = ExcelWorkbook(self.path)
+        try:
+            df = workbook.load_sheet(workbook.sheet_names[0]).result()
+        finally:
+            workbook.close()
+        expected = pd.read_excel(self.path, sheet_name=0)
+        self.assertEqual(list(df.columns), list(expected.columns))
+        self.assertEqual(len(df), len(expected))
+
+    # a sheet is only parsed once, after that it comes from the cache even for a new workbook object
+    def test_sheet_cached(self):
+        cache = DatasetCache(self.cache_dir)
+        workbook = ExcelWorkbook(self.path, cache)
+        name = workbook.sheet_names[0]
+        first = workbook.read_sheet(name)
+        self.assertIs(workbook.read_sheet(name), first)
+        workbook.close()
+        self.assertTrue(cache.contains(self.path, variant=f"sheet:{name}"))
+
+
+if __name__ == '__main__':
+    unittest.main()
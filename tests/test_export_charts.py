@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+
+from export_charts import build_jobs, output_name, export_charts
+
+"""
+Tests for the headless chart exporter, these dont need a display at all as everything renders through Agg
+"""
+
+
+class ExportChartsTests(unittest.TestCase):
+    # per-column charts get a job per column, pair plot/heatmap get a single job over all of them
+    def test_build_jobs(self):
+        jobs = build_jobs(["Size", "Weight", "Sweetness"], ["histogram", "scatter plot", "heatmap"])
+        self.assertIn(("histogram", ["Weight"]), jobs)
+        self.assertIn(("scatter plot", ["Size", "Sweetness"]), jobs)
+        self.assertIn(("heatmap", ["Size", "Weight", "Sweetness"]), jobs)
+        self.assertEqual(len(jobs), 3 + 2 + 1)
+
+    # file names shouldnt contain spaces or anything odd from the column names
+    def test_output_name(self):
+        self.assertEqual(output_name("banana_quality", "box plot", ["Harvest Time"]),
+                         "banana_quality_box_plot_Harvest_Time")
+
+    # export a couple of charts from the test csv and check the files are actually written
+    def test_export_charts(self):
+        csv_path = os.path.join(os.path.dirname(__file__), "banana_quality.csv")
+        with tempfile.TemporaryDirectory() as output_dir:
+            written = export_charts(csv_path, ["Size", "Weight"], ["histogram", "heatmap"], output_dir,
+                                    formats=["png", "svg"], workers=2)
+            self.assertEqual(len(written), (2 + 1) * 2)
+            for path in written:
+                self.assertTrue(os.path.getsize(path) > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import tkinter as tk
+import unittest
+
+import pandas as pd
+
+from figure_pool import FigurePool
+from main import GraphTheory
+
+"""
+Tests for the figure pool, like the other gui tests these need a display (xvfb on github)
+"""
+
+
+class FigurePoolTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tk.Tk()
+
+    def tearDown(self):
+        self.root.destroy()
+
+    # opening and closing lots of chart windows shouldnt keep making new figures
+    def test_pool_stays_flat(self):
+        graph_theory = GraphTheory()
+        graph_theory.data = pd.DataFrame({'x': [1, 2, 3, 4], 'y': [4, 5, 6, 7]})
+        for _ in range(50):
+            graph_window = tk.Toplevel(self.root)
+            graph_theory.visualize_histogram('x', graph_window)
+            graph_theory.visualize_box_plot('y', graph_window)
+            graph_window.destroy()
+            self.root.update()
+        self.assertLessEqual(len(graph_theory.figure_pool), graph_theory.figure_pool.max_idle)
+        self.assertEqual(graph_theory.figure_pool.slots, {})
+
+    # redrawing a window hands back the same figure and canvas
+    def test_slots_reused(self):
+        pool = FigurePool()
+        graph_window = tk.Toplevel(self.root)
+        pool.begin(graph_window)
+        fig, canvas, reused = pool.acquire(graph_window, (6, 4), 100)
+        pool.end(graph_window)
+        self.assertFalse(reused)
+
+        pool.begin(graph_window)
+        fig_again, canvas_again, reused = pool.acquire(graph_window, (6, 4), 100)
+        pool.end(graph_window)
+        self.assertTrue(reused)
+        self.assertIs(fig, fig_again)
+        self.assertIs(canvas, canvas_again)
+
+    # switching the columns of a scatter plot moves the points instead of re-plotting
+    def test_scatter_updated_in_place(self):
+        graph_theory = GraphTheory()
+        graph_theory.data = pd.DataFrame({'x': [1, 2, 3], 'y': [4, 5, 6], 'z': [7, 8, 9]})
+        graph_window = tk.Toplevel(self.root)
+        graph_theory.visualize_scatter_plot('x', 'y', graph_window)
+        collection = graph_theory.figure_pool.slots[graph_window][0][0].axes[0].collections[0]
+
+        graph_theory.figure_pool.begin(graph_window)
+        graph_theory.visualize_scatter_plot('x', 'z', graph_window)
+        ax = graph_theory.figure_pool.slots[graph_window][0][0].axes[0]
+        self.assertIs(ax.collections[0], collection)
+        self.assertEqual(list(collection.get_offsets()[:, 1]), [7, 8, 9])
+
+
+if __name__ == '__main__':
+    unittest.main()
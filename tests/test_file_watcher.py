@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from data_loader import load_csv
+from dataset_cache import file_fingerprint
+from file_watcher import AppendWatcher, APPENDED, REPLACED, UNCHANGED
+from schema_inference import AppendedRows, append_rows
+
+"""
+Tests for the append watcher, each test works on a copy of the test csv in a temp folder
+"""
+
+
+class AppendWatcherTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.folder, "banana_quality.csv")
+        shutil.copy(os.path.join(os.path.dirname(__file__), "banana_quality.csv"), self.csv_path)
+        self.data = load_csv(self.csv_path)
+        self.watcher = AppendWatcher(self.csv_path, self.data.columns)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def append(self, text):
+        with open(self.csv_path, "a") as f:
+            f.write(text)
+
+    # appended rows are picked up on their own and keep the compact dtypes once added
+    def test_appended_rows(self):
+        self.assertEqual(self.watcher.check(), UNCHANGED)
+        self.append("\n1.5,2,3,4,5,6,7,Bad,999999\n")
+        self.assertEqual(self.watcher.check(), APPENDED)
+        rows = self.watcher.read_appended()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows["banana_id"].iloc[0], 999999)
+
+        data = append_rows(self.data, rows)
+        self.assertEqual(len(data), len(self.data) + 1)
+        self.assertEqual(data["Size"].dtype, np.float32)
+        self.assertIsInstance(data["Quality"].dtype, pd.CategoricalDtype)
+        self.assertEqual(self.watcher.check(), UNCHANGED)
+
+    # a half written line waits until the rest of it arrives
+    def test_partial_line(self):
+        self.append("\n1.5,2,3,4,")
+        self.assertEqual(len(self.watcher.read_appended()), 0)
+        self.append("5,6,7,Good,999999\n")
+        self.assertEqual(len(self.watcher.read_appended()), 1)
+
+    # rows appended while the file is being loaded are picked up once, not lost or read twice
+    def test_rows_appended_while_loading(self):
+        fingerprint = file_fingerprint(self.csv_path)
+        self.append("1.5,2,3,4,5,6,7,Bad,20001\n")
+        data = load_csv(self.csv_path, fingerprint=fingerprint)
+        self.assertEqual(len(data), len(self.data))
+        watcher = AppendWatcher(self.csv_path, data.columns, offset=fingerprint[1])
+        self.assertEqual(watcher.check(), APPENDED)
+        self.assertEqual(list(watcher.read_appended()["banana_id"]), [20001])
+
+    # rows added a lot at a time leave the DataFrame alone until it is asked for, then match adding them all at once
+    def test_appended_rows_joined_later(self):
+        appended = AppendedRows(self.data)
+        first = appended.add(pd.DataFrame([[1.5, 2, 3, 4, 5, 6, 7, "Bad", 20001]], columns=self.data.columns))
+        appended.add(pd.DataFrame([[1.5, 2, 3, 4, 5, 6, 7, "Unripe", 20002]], columns=self.data.columns))
+        self.assertIs(appended.df, self.data)
+        self.assertEqual(first["Size"].dtype, np.float32)
+
+        data = appended.frame()
+        self.assertEqual(len(data), len(self.data) + 2)
+        self.assertIn("Unripe", data["Quality"].cat.categories)
+        self.assertEqual(data["banana_id"].dtype, self.data["banana_id"].dtype)
+        self.assertEqual(list(data["Quality"].iloc[-2:]), ["Bad", "Unripe"])
+        self.assertEqual(appended.chunks, [])
+
+    # rewriting the file isnt mistaken for an append
+    def test_rewritten_file(self):
+        with open(self.csv_path) as f:
+            lines = f.readlines()
+        with open(self.csv_path, "w") as f:
+            f.writelines(lines[:-1] + ["0,0,0,0,0,0,0,Good,1\n", "1,1,1,1,1,1,1,Good,2\n"])
+        self.assertEqual(self.watcher.check(), REPLACED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import latency
+
+"""
+Tests for the latency histograms, values are recorded by hand so the percentiles are known
+"""
+
+
+class LatencyHistogramTests(unittest.TestCase):
+    def test_buckets_cover_every_value(self):
+        for value in list(range(0, 2000)) + [2 ** 20 + 12345, 2 ** 30 - 1, latency.HIGHEST_US]:
+            low, high = latency.bucket_range(latency.bucket_index(value))
+            self.assertLessEqual(low, value)
+            self.assertGreaterEqual(high, value)
+            # buckets are at most about 1.5% wide
+            self.assertLessEqual(high - low, max(value * 0.016, 0))
+
+    def test_percentiles(self):
+        histogram = latency.LatencyHistogram("test")
+        self.assertIsNone(histogram.percentile(50))
+        for ms in range(1, 101):
+            histogram.record(ms / 1000)
+        self.assertAlmostEqual(histogram.percentile(50), 0.050, delta=0.001)
+        self.assertAlmostEqual(histogram.percentile(95), 0.095, delta=0.0015)
+        self.assertAlmostEqual(histogram.percentile(99), 0.099, delta=0.0015)
+        self.assertEqual(histogram.percentile(100), 0.1)
+        self.assertAlmostEqual(histogram.fraction_within(0.0505), 0.50, delta=0.01)
+
+    def test_summary(self):
+        histogram = latency.LatencyHistogram("test")
+        histogram.record(0.002, rows=10, nbytes=100)
+        histogram.record(0.004, rows=5, error=True)
+        summary = histogram.summary()
+        self.assertEqual((summary["count"], summary["rows"], summary["bytes"], summary["errors"]), (2, 15, 100, 1))
+        self.assertAlmostEqual(summary["mean"], 0.003)
+        self.assertEqual((summary["min"], summary["max"]), (0.002, 0.004))
+
+
+class LatencyRegistryTests(unittest.TestCase):
+    def setUp(self):
+        latency.reset()
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        latency.reset()
+        shutil.rmtree(self.folder)
+
+    def test_timed_and_measure(self):
+        @latency.timed("db.show_top_100", rows=len)
+        def show_top_100():
+            return list(range(100))
+
+        show_top_100()
+        show_top_100()
+        with self.assertRaises(ValueError):
+            with latency.measure("load.csv") as span:
+                span.bytes = 1024
+                raise ValueError("bad file")
+        summary = latency.snapshot()["operations"]
+        self.assertEqual(summary["db.show_top_100"]["count"], 2)
+        self.assertEqual(summary["db.show_top_100"]["rows"], 200)
+        self.assertEqual((summary["load.csv"]["errors"], summary["load.csv"]["bytes"]), (1, 1024))
+
+    def test_slo_report(self):
+        for _ in range(98):
+            latency.record("crud.create", 0.01)
+        for _ in range(2):
+            latency.record("crud.create", 1.0)
+        latency.record("upload.sync", 1.0)
+        report = latency.slo_report()
+        self.assertEqual(report["crud.create"]["within"], 98.0)
+        self.assertFalse(report["crud.create"]["met"])
+        self.assertTrue(report["upload.sync"]["met"])
+        # no calls, no verdict
+        self.assertNotIn("crud.delete", report)
+
+    def test_export(self):
+        latency.record("crud.read", 0.02, rows=1)
+        latency.export(self.folder)
+        with open(os.path.join(self.folder, "latency.json")) as f:
+            data = json.load(f)
+        self.assertEqual(data["operations"]["crud.read"]["count"], 1)
+        with open(os.path.join(self.folder, "latency.prom")) as f:
+            text = f.read()
+        self.assertIn('app_operation_latency_seconds_count{operation="crud.read"} 1', text)
+        self.assertIn('app_operation_rows_total{operation="crud.read"} 1', text)
+        self.assertIn('app_slo_within_ratio{operation="crud.read",target_seconds="0.25"} 1.0', text)
+        self.assertEqual(sorted(os.listdir(self.folder)), ["latency.json", "latency.prom"])
+
+
+if __name__ == '__main__':
+    unittest.main()
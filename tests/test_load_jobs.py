@@ -0,0 +1,51 @@
+import threading
+import unittest
+
+from csv_reader import LoadCancelled
+from load_jobs import LoadJob
+
+"""
+Tests for the background load jobs, the load functions here stand in for load_csv
+"""
+
+
+class LoadJobTests(unittest.TestCase):
+    # progress and the preview from the worker can be read while it runs, then the result
+    def test_progress_and_result(self):
+        started = threading.Event()
+        finish = threading.Event()
+
+        def load(progress, cancel):
+            progress(50, 100, 10, "first rows")
+            started.set()
+            finish.wait(5)
+            return "data"
+
+        job = LoadJob("file.csv", load)
+        started.wait(5)
+        self.assertEqual(job.progress, (50, 100, 10))
+        self.assertEqual(job.take_preview(), "first rows")
+        self.assertIsNone(job.take_preview())
+        finish.set()
+        self.assertEqual(job.result(), "data")
+        self.assertFalse(job.cancelled())
+
+    # cancelling sets the event the loader checks
+    def test_cancel(self):
+        started = threading.Event()
+
+        def load(progress, cancel):
+            started.set()
+            cancel.wait(5)
+            raise LoadCancelled()
+
+        job = LoadJob("file.csv", load)
+        started.wait(5)
+        job.cancel()
+        with self.assertRaises(LoadCancelled):
+            job.result()
+        self.assertTrue(job.cancelled())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -30,6 +30,8 @@ class Tests(unittest.TestCase):
     def test_open_csv_file(self, _):
         window = WindowMaker()
         window.open_file()
+        # the file loads in the background
+        window.wait_for_load()
         self.assertIsNotNone(window.data)
 
     # Test pressing the open file button, once again, wont work in a headless env
@@ -38,6 +40,7 @@ class Tests(unittest.TestCase):
         window = WindowMaker()
         button = tk.Button(window.button_frame, text="Open File", command=window.open_file)
         button.invoke()
+        window.wait_for_load()
         self.assertIsNotNone(window.data)
 
     # Test visualizing histogram
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import memory_debug
+
+"""
+Tests for the memory snapshots and reports, the accounting of a running window is left to the Debug menu
+"""
+
+
+class MemorySnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.was_tracing = memory_debug.is_tracing()
+        self.snapshots = memory_debug.MemorySnapshots(max_snapshots=3)
+
+    def tearDown(self):
+        if not self.was_tracing:
+            memory_debug.stop()
+
+    def test_growth_finds_the_allocation(self):
+        self.snapshots.take("before")
+        self.assertEqual(self.snapshots.growth(), [])
+        leak = [bytearray(1024) for _ in range(2000)]
+        self.snapshots.take("after")
+        growth = self.snapshots.growth(limit=5)
+        self.assertTrue(growth)
+        self.assertEqual(growth[0].traceback[0].filename, __file__)
+        self.assertGreater(growth[0].size_diff, 1024 * 1000)
+        del leak
+
+    def test_only_the_last_snapshots_are_kept(self):
+        for label in "abcde":
+            self.snapshots.take(label)
+        self.assertEqual([label for label, _ in self.snapshots.snapshots], ["c", "d", "e"])
+
+
+class ReportTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_report_without_an_app(self):
+        text = memory_debug.report(snapshot=False)
+        self.assertIn("Memory report", text)
+        path = memory_debug.write_report(text, self.folder)
+        with open(path) as f:
+            self.assertEqual(f.read(), text)
+
+    def test_instance_counts(self):
+        class Thing:
+            pass
+
+        things = [Thing() for _ in range(3)]
+        self.assertEqual(memory_debug.instance_counts([Thing]), {"Thing": 3})
+        del things
+
+    def test_signal_handler(self):
+        calls = []
+        if not memory_debug.install_signal_handler(lambda: calls.append(1)):
+            self.skipTest("no SIGUSR1 here")
+        os.kill(os.getpid(), memory_debug.signal.SIGUSR1)
+        self.assertEqual(calls, [1])
+        memory_debug.signal.signal(memory_debug.signal.SIGUSR1, memory_debug.signal.SIG_DFL)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import threading
+import unittest
+
+import numpy as np
+
+import metrics
+
+"""
+Tests for the resource metrics sampler, the ring buffer is mostly filled by hand so the numbers are known
+"""
+
+
+class RingBufferTests(unittest.TestCase):
+    def test_keeps_the_newest_rows_in_order(self):
+        buffer = metrics.RingBuffer(["a", "b"], capacity=4)
+        for i in range(10):
+            buffer.append(float(i), (i, i * 10))
+        self.assertEqual(len(buffer), 4)
+        times, values = buffer.column("b")
+        np.testing.assert_array_equal(times, [6, 7, 8, 9])
+        np.testing.assert_array_equal(values, [60, 70, 80, 90])
+
+    def test_column_of_one_operation(self):
+        buffer = metrics.RingBuffer(["a"], capacity=8)
+        buffer.append(0.0, (1,))
+        buffer.append(1.0, (5,), "training")
+        buffer.append(2.0, (6,), "training")
+        buffer.append(3.0, (2,))
+        np.testing.assert_array_equal(buffer.column("a", "training")[1], [5, 6])
+        self.assertEqual(len(buffer.column("a", "uploading")[1]), 0)
+        self.assertEqual(buffer.operation_names(), ["idle", "training"])
+
+
+class OperationTests(unittest.TestCase):
+    def test_nested_operations(self):
+        self.assertEqual(metrics.current_operation(), "idle")
+        with metrics.operation("parsing"):
+            with metrics.operation("uploading"):
+                self.assertEqual(metrics.current_operation(), "uploading")
+            self.assertEqual(metrics.current_operation(), "parsing")
+        self.assertEqual(metrics.current_operation(), "idle")
+
+    def test_tagged_is_seen_from_other_threads(self):
+        seen = []
+
+        @metrics.tagged("training")
+        def train():
+            thread = threading.Thread(target=lambda: seen.append(metrics.current_operation()))
+            thread.start()
+            thread.join()
+            return 42
+
+        self.assertEqual(train(), 42)
+        self.assertEqual(seen, ["training"])
+
+
+class MetricsSamplerTests(unittest.TestCase):
+    def setUp(self):
+        self.sampler = metrics.MetricsSampler(interval=0.01, capacity=16)
+
+    def fill(self, rows):
+        # rows are (time, cpu, bytes sent, operation)
+        for timestamp, cpu, sent, operation_name in rows:
+            row = [0.0] * len(metrics.FIELDS)
+            row[metrics.FIELDS.index("cpu")] = cpu
+            row[metrics.FIELDS.index("bytes_sent")] = sent
+            self.sampler.buffer.append(timestamp, row, operation_name)
+
+    def test_sample_reads_every_field(self):
+        sample = self.sampler.sample()
+        self.assertEqual(set(sample), set(metrics.FIELDS))
+        self.assertGreater(sample["process_rss"], 0)
+        self.assertEqual(self.sampler.latest()["process_rss"], sample["process_rss"])
+
+    def test_rates_of_a_counter(self):
+        self.fill([(0, 0, 1000, "idle"), (1, 0, 3000, "uploading"), (3, 0, 7000, "uploading"), (4, 0, 7000, "idle")])
+        times, rates = self.sampler.rates("bytes_sent")
+        np.testing.assert_array_equal(times, [1, 3, 4])
+        np.testing.assert_array_equal(rates, [2000, 2000, 0])
+        np.testing.assert_array_equal(self.sampler.series("bytes_sent", "uploading"), [2000, 2000])
+
+    def test_percentiles_and_summary_per_operation(self):
+        self.fill([(i, 90 if i % 2 else 10, 0, "training" if i % 2 else "idle") for i in range(10)])
+        self.assertEqual(self.sampler.percentiles("cpu", (50,), operation_name="training"), {50: 90.0})
+        self.assertEqual(self.sampler.percentiles("cpu", (50,))[50], 50.0)
+        summary = self.sampler.summary("cpu")
+        self.assertEqual(summary["training"], (90.0, 90.0, 90.0))
+        self.assertEqual(summary["idle"][0], 10.0)
+
+    def test_empty_percentiles(self):
+        self.assertEqual(self.sampler.percentiles("cpu", (95,)), {95: None})
+
+    def test_start_and_stop(self):
+        self.sampler.start()
+        threading.Event().wait(0.1)
+        self.sampler.stop()
+        self.assertGreater(len(self.sampler.buffer), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import profiling
+
+"""
+Tests for the profiling mode, profiles are written to a temp folder
+"""
+
+
+@profiling.profiled()
+def busy(n):
+    return sorted(str(i) for i in range(n))
+
+
+@profiling.profiled("outer")
+def outer():
+    return busy(20000)
+
+
+class ProfilingTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        profiling.enable(self.folder)
+
+    def tearDown(self):
+        profiling.disable()
+        shutil.rmtree(self.folder)
+
+    # nothing is written with profiling off
+    def test_disabled(self):
+        profiling.disable()
+        busy(10)
+        self.assertEqual(os.listdir(self.folder), [])
+
+    # a pstat and a speedscope file per call, a profiled call inside another is part of the outer one
+    def test_writes_profiles(self):
+        outer()
+        busy(20000)
+        self.assertEqual(len(profiling.latest_profiles("outer", self.folder)), 1)
+        self.assertEqual(len(profiling.latest_profiles("busy", self.folder)), 1)
+        path = profiling.latest_profiles("busy", self.folder)[0].replace(".pstat", ".speedscope.json")
+        with open(path) as f:
+            events = json.load(f)["profiles"][0]["events"]
+        # opens and closes have to nest for speedscope to load it
+        stack = []
+        for event in events:
+            if event["type"] == "O":
+                stack.append(event["frame"])
+            else:
+                self.assertEqual(stack.pop(), event["frame"])
+        self.assertEqual(stack, [])
+
+    # the diff has every function of both profiles
+    def test_diff(self):
+        busy(1000)
+        busy(50000)
+        old, new = profiling.latest_profiles("busy", self.folder)
+        functions = [row[0] for row in profiling.diff_profiles(old, new)]
+        self.assertTrue(any(function.startswith("busy ") for function in functions))
+        self.assertEqual(profiling.main(["diff", "busy", "--dir", self.folder]), 0)
+
+    # charts are profiled on the render threads, each under its chart type, with the building of the figure in it
+    def test_chart_renders(self):
+        from matplotlib.figure import Figure
+        from render_pipeline import RenderPipeline
+
+        def build_histogram():
+            fig = Figure()
+            fig.add_subplot().hist(range(1000))
+            return fig
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            renders = [executor.submit(RenderPipeline.render_png, build_histogram, "chart.histogram") for _ in range(2)]
+            self.assertTrue(all(render.result() for render in renders))
+        profiles = profiling.latest_profiles("chart.histogram", self.folder, count=10)
+        self.assertEqual(len(profiles), 2)
+        functions = profiling.cumulative_times(profiles[0])
+        self.assertTrue(any(function.startswith("build_histogram ") for function in functions))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+import numpy as np
+
+from progressive_plot import lttb, minmax_buckets
+
+"""
+Tests for the downsampling behind the progressive line/scatter plots, no display needed
+"""
+
+
+class DownsamplingTests(unittest.TestCase):
+    # lttb keeps the first and last point and returns exactly the number of points asked for, in order
+    def test_lttb(self):
+        x = np.arange(100_000, dtype=float)
+        y = np.sin(x / 1000)
+        keep = lttb(x, y, 500)
+        self.assertEqual(len(keep), 500)
+        self.assertEqual(keep[0], 0)
+        self.assertEqual(keep[-1], len(x) - 1)
+        self.assertTrue(np.all(np.diff(keep) > 0))
+
+    # a single spike has to survive the downsampling, thats the whole point of lttb over taking every nth point
+    def test_lttb_keeps_spike(self):
+        x = np.arange(10_000, dtype=float)
+        y = np.zeros(10_000)
+        y[4321] = 100
+        self.assertIn(4321, lttb(x, y, 200))
+
+    # min/max buckets keep the extremes of every bucket
+    def test_minmax_buckets(self):
+        rng = np.random.default_rng(0)
+        x = np.sort(rng.uniform(0, 1, 50_000))
+        y = rng.normal(size=50_000)
+        keep = minmax_buckets(x, y, 100)
+        self.assertLessEqual(len(keep), 200)
+        self.assertIn(int(np.argmax(y)), keep)
+        self.assertIn(int(np.argmin(y)), keep)
+
+    # small inputs are returned untouched
+    def test_small_input(self):
+        x = np.arange(10, dtype=float)
+        self.assertEqual(len(lttb(x, x, 100)), 10)
+        self.assertEqual(len(minmax_buckets(x, x, 100)), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
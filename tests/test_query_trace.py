@@ -0,0 +1,60 @@
+import unittest
+
+import query_trace
+from database import DatabaseHandler
+
+"""
+Tests for the SQL query tracing, on an in memory sqlite database
+"""
+
+
+class NormalizeTests(unittest.TestCase):
+    def test_values_become_placeholders(self):
+        self.assertEqual(query_trace.normalize("SELECT * FROM banana WHERE banana_id = 5 AND quality = 'Good'"),
+                         "SELECT * FROM banana WHERE banana_id = ? AND quality = ?")
+        self.assertEqual(query_trace.normalize("UPDATE rdm SET port=:port WHERE rdm.id = %(id_1)s"),
+                         "UPDATE rdm SET port=? WHERE rdm.id = ?")
+
+    def test_lists_are_collapsed(self):
+        self.assertEqual(query_trace.normalize("SELECT a FROM t WHERE a IN (?, ?, ?)"),
+                         "SELECT a FROM t WHERE a IN (?)")
+        self.assertEqual(query_trace.normalize("INSERT INTO t (a, b)\n  VALUES (1, 'x'), (2, 'y')"),
+                         "INSERT INTO t (a, b) VALUES (?, ?)")
+
+
+class TracerTests(unittest.TestCase):
+    def setUp(self):
+        self.db_handler = DatabaseHandler("sqlite:///:memory:")
+        self.db_handler.engine.echo = False
+        self.tracer = self.db_handler.query_tracer
+        self.tracer.reset()
+
+    def test_statements_are_grouped_by_shape(self):
+        ids = [self.db_handler.create_banana(1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, "Good") for _ in range(3)]
+        for banana_id in ids:
+            self.db_handler.read_banana(banana_id)
+        inserts = [stats for stats in self.tracer.top() if stats.shape.startswith("INSERT INTO banana")]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(inserts[0].count, 3)
+        self.assertEqual(set(inserts[0].callers), {"database.py:create_banana"})
+        # session.refresh in create_banana runs the same SELECT as read_banana
+        reads = [stats for stats in self.tracer.top() if "banana_quality.banana_id = ?" in stats.shape
+                 and stats.shape.startswith("SELECT")]
+        self.assertEqual(len(reads), 1)
+        self.assertEqual(reads[0].callers["database.py:read_banana"], 3)
+        self.assertEqual(reads[0].count, 6)
+        self.assertIn("create_banana", self.tracer.stats_text())
+
+    def test_slow_queries_are_explained(self):
+        self.tracer.threshold = 0.0
+        self.db_handler.count_records()
+        self.assertTrue(self.tracer.slow_queries)
+        text = self.tracer.slow_text()
+        self.assertIn("database.py:count_records", text)
+        self.assertIn("SCAN", text)
+        # explaining isnt traced itself
+        self.assertFalse(any(stats.shape.startswith("EXPLAIN") for stats in self.tracer.top()))
+
+
+if __name__ == '__main__':
+    unittest.main()
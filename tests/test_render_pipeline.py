@@ -0,0 +1,67 @@
+import time
+import tkinter as tk
+import unittest
+
+import pandas as pd
+
+import charts
+from render_pipeline import RenderPipeline
+
+"""
+Tests for rendering charts off the tk thread, needs a display like the other gui tests
+"""
+
+
+class RenderPipelineTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tk.Tk()
+        self.data = pd.DataFrame({'x': range(100), 'y': range(100, 200)})
+
+    def tearDown(self):
+        self.root.destroy()
+
+    def wait_for(self, futures):
+        # keep the event loop going until the workers are done and the images have been swapped in
+        deadline = time.time() + 30
+        while time.time() < deadline and not all(future.done() for future in futures):
+            self.root.update()
+        for _ in range(10):
+            self.root.update()
+            time.sleep(0.05)
+
+    # the placeholder shows up straight away and is replaced with the image when it is ready
+    def test_renders_image(self):
+        pipeline = RenderPipeline(self.root)
+        graph_window = tk.Toplevel(self.root)
+        futures = [pipeline.submit(graph_window, lambda column=column: charts.histogram_figure(self.data, column),
+                                   f"histogram of {column}") for column in ('x', 'y')]
+        labels = pipeline.labels[graph_window]
+        self.assertEqual(len(labels), 2)
+        self.assertTrue(labels[0].cget('text').startswith("Rendering"))
+
+        self.wait_for(futures)
+        for label in labels:
+            self.assertTrue(label.cget('image'))
+
+    # a failing chart shows the error in its placeholder instead of raising
+    def test_error_shown(self):
+        pipeline = RenderPipeline(self.root)
+        graph_window = tk.Toplevel(self.root)
+        future = pipeline.submit(graph_window, lambda: charts.histogram_figure(self.data, 'missing'),
+                                 "histogram of missing")
+        self.wait_for([future])
+        self.assertIn("An error occurred", pipeline.labels[graph_window][0].cget('text'))
+
+    # closing a graph window forgets its labels
+    def test_closed_window_forgotten(self):
+        pipeline = RenderPipeline(self.root)
+        graph_window = tk.Toplevel(self.root)
+        future = pipeline.submit(graph_window, lambda: charts.histogram_figure(self.data, 'x'), "histogram of x")
+        self.wait_for([future])
+        graph_window.destroy()
+        self.root.update()
+        self.assertNotIn(graph_window, pipeline.labels)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from schema_inference import compact_dtypes
+
+"""
+Tests for the dtype compaction that runs after a file is loaded
+"""
+
+
+class CompactDtypesTests(unittest.TestCase):
+    # 7 significant figure floats fit in float32, small ints shrink and a repeated label becomes a category
+    def test_compacts_banana_like_columns(self):
+        df = pd.DataFrame({"Size": [-1.9249682, -2.4097514, -0.3576066, -0.8685236] * 25,
+                           "banana_id": np.arange(100, dtype=np.int64),
+                           "Quality": ["Good", "Bad", "Good", "Good"] * 25})
+        compacted, report = compact_dtypes(df)
+        self.assertEqual(compacted["Size"].dtype, np.float32)
+        self.assertEqual(compacted["banana_id"].dtype, np.int8)
+        self.assertIsInstance(compacted["Quality"].dtype, pd.CategoricalDtype)
+        np.testing.assert_allclose(compacted["Size"], df["Size"], rtol=1e-6)
+        self.assertEqual(list(compacted["Quality"]), list(df["Quality"]))
+        self.assertLess(sum(row[3] for row in report.values()), sum(row[2] for row in report.values()))
+
+    # values that need float64 precision and free text stay as they are
+    def test_leaves_precise_and_unique_columns(self):
+        df = pd.DataFrame({"precise": [0.1234567890123, 1e300, 2.0], "Name": ["a", "b", "c"]})
+        compacted, report = compact_dtypes(df)
+        self.assertEqual(compacted["precise"].dtype, np.float64)
+        self.assertEqual(compacted["Name"].dtype, object)
+        self.assertEqual(report["Name"][0], report["Name"][1])
+
+    # missing values are kept through the conversion
+    def test_nan_kept(self):
+        df = pd.DataFrame({"Year": [2006.0, np.nan, 2008.0]})
+        compacted, _ = compact_dtypes(df)
+        self.assertEqual(compacted["Year"].dtype, np.float32)
+        self.assertTrue(np.isnan(compacted["Year"].iloc[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
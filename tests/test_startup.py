@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import unittest
+
+"""
+Tests that importing main doesnt pull in the heavy libraries, they should only load when first used
+python -X importtime prints every module imported (and how long it took) to stderr, which is what is checked here
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# none of these should be imported until the feature that needs them is used
+LAZY_MODULES = ["sklearn", "seaborn", "matplotlib", "netmiko", "paramiko", "psycopg2", "sqlalchemy", "netifaces",
+                "openpyxl", "chardet"]
+# the libraries the window cant open without, importing them is most of the startup time and how long it takes depends
+# on the machine and how busy it is, so they are the baseline and only what main adds on top of them is checked
+BASELINE_MODULES = ["numpy", "pandas", "pyarrow", "tkinter", "psutil"]
+# what main and its own modules may add on top of the baseline (about 100ms when the machine is idle)
+MAX_OWN_IMPORT_MS = 400
+
+
+def import_times(statement):
+    # {top level package: microseconds (cumulative)} for everything imported by running statement
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT, capture_output=True,
+                            text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        package = name.split(".")[0]
+        times[package] = max(times.get(package, 0), int(cumulative))
+    return times
+
+
+class StartupTests(unittest.TestCase):
+    def test_main_imports_no_heavy_modules(self):
+        times = import_times("import main")
+        loaded = [module for module in LAZY_MODULES if module in times]
+        self.assertEqual(loaded, [])
+        baseline = sum(times.get(module, 0) for module in BASELINE_MODULES)
+        own = (times["main"] - baseline) / 1000
+        self.assertLess(own, MAX_OWN_IMPORT_MS, f"import main took {times['main'] / 1000:.0f} ms, "
+                                                f"{own:.0f} ms of it on top of {', '.join(BASELINE_MODULES)}")
+
+    def test_moved_classes_still_importable_from_main(self):
+        # main.__getattr__ imports them with importlib.import_module, which -X importtime doesnt log, so sys.modules is
+        # checked in the subprocess instead
+        result = subprocess.run([sys.executable, "-c", "import sys\n"
+                                 "from main import GraphTheory, PredictionAlgorithm\n"
+                                 "print('graph_theory' in sys.modules, 'prediction' in sys.modules, "
+                                 "GraphTheory.__module__, PredictionAlgorithm.__module__)"],
+                                cwd=ROOT, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split(), ["True", "True", "graph_theory", "prediction"])
+
+
+if __name__ == '__main__':
+    unittest.main()
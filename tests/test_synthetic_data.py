@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from sqlalchemy import func, select
+
+import synthetic_data
+from database import DatabaseHandler
+from data_loader import load_csv
+from models import RDM
+
+"""
+Tests for the synthetic data generator, the banana statistics are fitted from the bundled banana_quality.csv
+"""
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), "banana_quality.csv")
+
+
+class SyntheticBananaTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # without the junk rows at the end of the file, which is what the profile is fitted to
+        cls.real = synthetic_data.clean_bananas(pd.read_csv(TEMPLATE))
+        cls.profile = synthetic_data.fit_bananas(cls.real)
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def generate(self, rows, **kwargs):
+        batches = synthetic_data.generate_bananas(rows, self.profile, seed=1, **kwargs)
+        return pd.concat([batch.to_pandas() for batch in batches], ignore_index=True)
+
+    def test_shape_and_ids(self):
+        data = self.generate(2500, chunk_rows=1000)
+        self.assertEqual(list(data.columns), list(self.real.columns))
+        self.assertEqual(list(data["banana_id"]), list(range(1, 2501)))
+        self.assertEqual(set(data["Quality"]), {"Good", "Bad"})
+
+    def test_fitted_matches_the_real_statistics(self):
+        data = self.generate(200_000)
+        columns = synthetic_data.BANANA_COLUMNS
+        np.testing.assert_allclose(data[columns].mean(), self.real[columns].mean(), atol=0.05)
+        np.testing.assert_allclose(data[columns].std(), self.real[columns].std(), rtol=0.05)
+        # the columns are correlated like the real ones
+        np.testing.assert_allclose(data[columns].corr(), self.real[columns].corr(), atol=0.05)
+        self.assertAlmostEqual((data["Quality"] == "Good").mean(), (self.real["Quality"] == "Good").mean(),
+                               delta=0.01)
+
+    def test_other_distributions(self):
+        uniform = self.generate(10_000, distribution="uniform", good_share=0.9)
+        self.assertTrue((uniform["Size"] >= self.real["Size"].min() - 1e-5).all())
+        self.assertTrue((uniform["Size"] <= self.real["Size"].max() + 1e-5).all())
+        self.assertAlmostEqual((uniform["Quality"] == "Good").mean(), 0.9, delta=0.02)
+        with self.assertRaises(ValueError):
+            self.generate(10, distribution="bimodal")
+
+    def test_csv_loads_like_the_real_file(self):
+        path = os.path.join(self.folder, "bananas.csv")
+        rows = synthetic_data.write_csv(synthetic_data.generate_bananas(3000, self.profile, seed=1, chunk_rows=1000),
+                                        path)
+        self.assertEqual(rows, 3000)
+        data = load_csv(path)
+        self.assertEqual(len(data), 3000)
+        self.assertEqual(list(data.columns), list(self.real.columns))
+
+    def test_junk_rows_arent_fitted(self):
+        raw = pd.read_csv(TEMPLATE)
+        self.assertLess(len(self.real), len(raw))
+        self.assertLess(self.profile["max"].max(), 100)
+        self.assertEqual(set(self.real["Quality"]), {"Good", "Bad"})
+
+    def test_parquet(self):
+        path = os.path.join(self.folder, "bananas.parquet")
+        synthetic_data.write_file(synthetic_data.generate_bananas(1500, self.profile, seed=1, chunk_rows=1000), path)
+        self.assertEqual(pq.read_metadata(path).num_rows, 1500)
+
+    def test_load_into_the_database(self):
+        db_handler = DatabaseHandler("sqlite:///:memory:")
+        written = synthetic_data.load_bananas(db_handler, synthetic_data.generate_bananas(2000, self.profile, seed=1,
+                                                                                           chunk_rows=500))
+        self.assertEqual(written, 2000)
+        self.assertEqual(db_handler.count_records(), 2000)
+
+
+class SyntheticRdmTests(unittest.TestCase):
+    def test_rdm_rows(self):
+        batches = list(synthetic_data.generate_rdms(2500, seed=1, chunk_rows=1000))
+        data = pd.concat([batch.to_pandas() for batch in batches], ignore_index=True)
+        self.assertEqual(len(data), 2500)
+        self.assertTrue(data["ip_address"].str.fullmatch(r"10\.\d{1,3}\.\d{1,3}\.\d{1,3}").all())
+        self.assertTrue(set(data["port"]).issubset({port for port, _ in synthetic_data.RDM_PORTS}))
+        self.assertTrue(data["service_name"].str.fullmatch(r"[a-z]+-\d+").all())
+
+    def test_load_into_the_database(self):
+        db_handler = DatabaseHandler("sqlite:///:memory:")
+        loaded = synthetic_data.load_rdms(db_handler, synthetic_data.generate_rdms(1200, seed=1, chunk_rows=500))
+        self.assertEqual(loaded, 1200)
+        with db_handler.engine.connect() as conn:
+            self.assertEqual(conn.execute(select(func.count()).select_from(RDM.__table__)).scalar(), 1200)
+
+
+if __name__ == '__main__':
+    unittest.main()
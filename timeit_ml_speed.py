@@ -5,6 +5,8 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.model_selection import train_test_split
 import pandas as pd
+from excel_loader import ExcelWorkbook
+from dataset_cache import DatasetCache
 
 
 columns = []
@@ -15,7 +17,14 @@ excel file provided which was my original testing file but i also wanted to test
 """
 def open_file():
     try:
-        file = pd.read_excel('housing_price_dataset.xlsx', index_col=0)
+        # streamed with openpyxl and cached as Arrow, read_excel took longer than the models on this file
+        workbook = ExcelWorkbook('housing_price_dataset.xlsx', DatasetCache())
+        try:
+            file = workbook.read_sheet(workbook.sheet_names[0])
+        finally:
+            workbook.close()
+        # same as index_col=0
+        file = file.set_index(file.columns[0])
         process_file(file)
     except FileNotFoundError:
         print("File missing, maybe put it in the directory")